@@ -14,7 +14,8 @@ CREATE TABLE IF NOT EXISTS sensor_data (
     soil_moisture1 REAL,
     soil_moisture2 REAL,
     uv_index REAL,
-    timestamp TEXT
+    timestamp TEXT,
+    device_id TEXT
 );
 
 -- Paso 2: Agregar columnas si faltan (si la tabla ya existe)
@@ -27,7 +28,10 @@ ADD COLUMN IF NOT EXISTS humidity2 REAL,
 ADD COLUMN IF NOT EXISTS soil_moisture1 REAL,
 ADD COLUMN IF NOT EXISTS soil_moisture2 REAL,
 ADD COLUMN IF NOT EXISTS uv_index REAL,
-ADD COLUMN IF NOT EXISTS timestamp TEXT;
+ADD COLUMN IF NOT EXISTS timestamp TEXT,
+-- Dispositivo que envio la lectura; lo usan el entrenamiento por dispositivo
+-- (--per-device-models) y las caracteristicas temporales con --source supabase
+ADD COLUMN IF NOT EXISTS device_id TEXT;
 
 -- Paso 3: Crear indice para busquedas rapidas
 CREATE INDEX IF NOT EXISTS idx_sensor_data_timestamp 
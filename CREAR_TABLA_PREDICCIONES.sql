@@ -60,3 +60,23 @@ COMMENT ON COLUMN irrigation_predictions.prediction IS 'Resultado: Regar o No re
 COMMENT ON COLUMN irrigation_predictions.score IS 'Score continuo del modelo de regresión';
 COMMENT ON COLUMN irrigation_predictions.confidence IS 'Confianza de la predicción (0-100%)';
 
+
+-- Columna para enlazar cada predicción con la lectura de sensor_data que la originó.
+-- La usa backfill_predictions.py (upsert) para que re-ejecutar un bloque no duplique filas.
+ALTER TABLE irrigation_predictions
+ADD COLUMN IF NOT EXISTS sensor_data_id BIGINT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_irrigation_predictions_sensor_data_id
+ON irrigation_predictions(sensor_data_id);
+
+-- El upsert del backfill (UPDATE) usa la service_role key, que no pasa por RLS.
+-- No se da UPDATE a anon: esa key es pública y permitiría reescribir predicciones.
+-- Si una versión anterior de este script creó la política, se elimina.
+DROP POLICY IF EXISTS "Allow update for anon users" ON irrigation_predictions;
+
+
+-- Umbral con el que se decidió cada predicción (el del artefacto de modelo si el
+-- script local o el backfill usan uno; 0.5 por defecto). /predict-irrigation lo
+-- informa tal cual.
+ALTER TABLE irrigation_predictions
+ADD COLUMN IF NOT EXISTS threshold REAL;
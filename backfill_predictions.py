@@ -0,0 +1,276 @@
+"""
+Backfill de predicciones de riego sobre todo el historial de `sensor_data`.
+
+Recorre la tabla por rangos de id, puntúa cada bloque de forma vectorizada con
+el mismo modelo de `local_irrigation_predictor.py` (el artefacto de `--model` o
+IRRIGATION_MODEL_PATH si se indica) e inserta los resultados en
+bloque en `irrigation_predictions`. El progreso se guarda en un archivo de
+checkpoint, así que una ejecución interrumpida continúa donde se quedó.
+
+El upsert actualiza filas existentes, algo que RLS no permite con la anon key,
+así que el script usa SUPABASE_SERVICE_ROLE_KEY (en `supabase.env`, nunca en
+Vercel ni en el ESP32).
+
+Uso:
+    python backfill_predictions.py --chunk-size 1000 --workers 4
+    python backfill_predictions.py --model irrigation_model.json --reset
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from local_irrigation_predictor import THRESHOLD, create_prediction_model, load_model_config
+from supabase_utils import (
+    MAX_ROWS_PER_REQUEST,
+    PREDICTIONS_TABLE,
+    create_supabase_client,
+    fetch_id_range,
+    get_max_id,
+    is_unknown_column_error,
+)
+
+FEATURES = ['uv_index', 'temperature2', 'humidity2', 'soil_moisture1', 'soil_moisture2']
+SELECT_COLUMNS = ['id', 'timestamp'] + FEATURES
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Genera predicciones de riego para todo el historial de sensor_data."
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=MAX_ROWS_PER_REQUEST,
+        help=f"Cantidad de ids por bloque (default: {MAX_ROWS_PER_REQUEST}).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Bloques procesados en paralelo (default: 4).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=Path("backfill_checkpoint.json"),
+        help="Archivo donde se guarda el progreso (default: backfill_checkpoint.json).",
+    )
+    parser.add_argument(
+        "--start-id",
+        type=int,
+        default=1,
+        help="Primer id a procesar si no hay checkpoint (default: 1).",
+    )
+    parser.add_argument(
+        "--end-id",
+        type=int,
+        default=None,
+        help="Último id a procesar, inclusivo (default: id máximo actual).",
+    )
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="Ignora el checkpoint existente y empieza desde --start-id.",
+    )
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Artefacto de modelo (default: IRRIGATION_MODEL_PATH o los coeficientes de local_irrigation_predictor).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Puntúa los bloques pero no escribe en Supabase.",
+    )
+    return parser.parse_args()
+
+
+def load_checkpoint(path: Path) -> int | None:
+    """Devuelve el siguiente id pendiente guardado en el checkpoint"""
+    if not path.exists():
+        return None
+    with path.open() as fh:
+        return int(json.load(fh)["next_id"])
+
+
+def save_checkpoint(path: Path, next_id: int) -> None:
+    """Guarda el checkpoint de forma atómica (escritura + rename)"""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w") as fh:
+        json.dump({"next_id": next_id, "updated_at": time.strftime('%Y-%m-%d %H:%M:%S')}, fh)
+    os.replace(tmp_path, path)
+
+
+def score_rows(rows: list[dict], model, threshold: float = THRESHOLD) -> list[dict]:
+    """
+    Puntúa un bloque de lecturas de una sola vez
+
+    Las filas con alguna característica nula se omiten, igual que fallaría la
+    predicción individual con `float(None)`.
+
+    Returns:
+        list: filas listas para insertar en `irrigation_predictions`
+    """
+    if not rows:
+        return []
+
+    X = np.array(
+        [[np.nan if row.get(f) is None else row[f] for f in FEATURES] for row in rows],
+        dtype=float,
+    )
+    valid = ~np.isnan(X).any(axis=1)
+    if not valid.any():
+        return []
+
+    X = X[valid]
+    scores = model.predict(X)
+    confidences = np.round(np.clip((1.0 - np.abs(scores - threshold)) * 100.0, 0.0, 100.0), 2)
+    labels = np.where(scores >= threshold, "Regar", "No regar")
+
+    valid_rows = [row for row, ok in zip(rows, valid) if ok]
+    return [
+        {
+            'sensor_data_id': row['id'],
+            'timestamp': row.get('timestamp') or time.strftime('%Y-%m-%d %H:%M:%S'),
+            'prediction': str(label),
+            'score': float(score),
+            'confidence': float(confidence),
+            'threshold': float(threshold),
+            'uv_index': float(x[0]),
+            'temperature2': float(x[1]),
+            'humidity2': float(x[2]),
+            'soil_moisture1': float(x[3]),
+            'soil_moisture2': float(x[4]),
+        }
+        for row, x, score, confidence, label in zip(valid_rows, X, scores, confidences, labels)
+    ]
+
+
+# False cuando irrigation_predictions aún no tiene la columna threshold
+# (falta ejecutar CREAR_TABLA_PREDICCIONES.sql); se deja de enviar
+_threshold_column = True
+
+
+def upsert_predictions(client, predictions: list[dict]) -> None:
+    """upsert sobre sensor_data_id: re-ejecutar un bloque no duplica filas"""
+    global _threshold_column
+    if not _threshold_column:
+        predictions = [{k: v for k, v in p.items() if k != 'threshold'} for p in predictions]
+    try:
+        client.table(PREDICTIONS_TABLE).upsert(predictions, on_conflict='sensor_data_id').execute()
+    except Exception as e:
+        if 'threshold' not in predictions[0] or not is_unknown_column_error(e, 'threshold'):
+            raise
+        if _threshold_column:
+            _threshold_column = False
+            print("⚠️ La tabla no tiene la columna 'threshold'; ejecuta CREAR_TABLA_PREDICCIONES.sql")
+        upsert_predictions(client, predictions)
+
+
+def process_chunk(client, model, threshold: float, start_id: int, end_id: int, dry_run: bool) -> int:
+    """Obtiene, puntúa e inserta un rango de ids. Devuelve las filas leídas."""
+    rows = fetch_id_range(client, start_id, end_id, SELECT_COLUMNS)
+    predictions = score_rows(rows, model, threshold)
+    if predictions and not dry_run:
+        upsert_predictions(client, predictions)
+    return len(rows)
+
+
+def run_backfill(client, args: argparse.Namespace) -> tuple[int, float]:
+    model_config = load_model_config(args.model)
+    model = create_prediction_model(model_config)
+    threshold = model_config['threshold']
+    print(f"Modelo: {model_config['version']} (umbral {threshold})")
+
+    next_id = None if args.reset else load_checkpoint(args.checkpoint)
+    start_id = next_id if next_id is not None else args.start_id
+    end_id = args.end_id if args.end_id is not None else get_max_id(client)
+
+    if start_id > end_id:
+        print(f"Nada que procesar (siguiente id {start_id}, último id {end_id}).")
+        return 0, 0.0
+
+    ranges = [
+        (lo, min(lo + args.chunk_size, end_id + 1))
+        for lo in range(start_id, end_id + 1, args.chunk_size)
+    ]
+    print(f"Procesando ids {start_id}..{end_id} en {len(ranges)} bloques con {args.workers} workers")
+
+    total_rows = 0
+    started = time.perf_counter()
+    # Bloques terminados fuera de orden; el checkpoint solo avanza sobre el
+    # prefijo contiguo para que reanudar nunca salte un bloque pendiente.
+    finished = set()
+    watermark = 0
+    pending_ranges = iter(ranges)
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        in_flight = {}
+
+        def submit_next() -> None:
+            rng = next(pending_ranges, None)
+            if rng is not None:
+                future = executor.submit(process_chunk, client, model, threshold, rng[0], rng[1], args.dry_run)
+                in_flight[future] = rng
+
+        for _ in range(args.workers * 2):
+            submit_next()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                rng = in_flight.pop(future)
+                total_rows += future.result()
+                finished.add(rng[0])
+                submit_next()
+
+            advanced = False
+            while watermark < len(ranges) and ranges[watermark][0] in finished:
+                finished.discard(ranges[watermark][0])
+                watermark += 1
+                advanced = True
+            if advanced and not args.dry_run:
+                save_checkpoint(args.checkpoint, ranges[watermark - 1][1])
+
+            elapsed = time.perf_counter() - started
+            rate = total_rows / elapsed if elapsed > 0 else 0.0
+            print(f"  {watermark}/{len(ranges)} bloques, {total_rows} filas, {rate:.1f} filas/s")
+
+    elapsed = time.perf_counter() - started
+    return total_rows, elapsed
+
+
+def main() -> None:
+    args = parse_args()
+    if args.chunk_size <= 0 or args.workers <= 0:
+        print("Error: --chunk-size y --workers deben ser positivos", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        client = create_supabase_client(service_role=True)
+        total_rows, elapsed = run_backfill(client, args)
+    except KeyboardInterrupt:
+        print("\nBackfill interrumpido; vuelve a ejecutar el comando para continuar.")
+        sys.exit(1)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    rate = total_rows / elapsed if elapsed > 0 else 0.0
+    print("=== Backfill completado ===")
+    print(f"Filas procesadas: {total_rows}")
+    print(f"Tiempo: {elapsed:.2f} s")
+    print(f"Velocidad: {rate:.1f} filas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark del arranque en frío del servidor (principal_code_simple)
+
+Cada corrida es un proceso nuevo de Python que importa el servidor y atiende
+una petición con el cliente de pruebas de Flask. Se mide:
+    - wall: desde que se lanza el proceso hasta que llega la primera respuesta
+      (incluye el arranque del intérprete; lo que ve una invocación en frío)
+    - import: importar principal_code_simple
+    - first_request: la primera petición (lo que quedó diferido hasta el primer uso)
+    - second_request: una segunda petición igual, ya en caliente
+
+Aparte, una corrida con `python -X importtime` desglosa el import: tiempo
+propio del módulo y tiempo acumulado de cada módulo que importa directamente
+(mediana de todas las corridas).
+
+Uso:
+    python benchmarks/benchmark_cold_start.py
+    python benchmarks/benchmark_cold_start.py --runs 20 --route /latest-data --json arranque.json
+    python benchmarks/benchmark_cold_start.py --env SUPABASE_URL=https://x.supabase.co --env SUPABASE_ANON_KEY=...
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVER_MODULE = 'principal_code_simple'
+
+# Código del proceso hijo: imprime una línea JSON en cuanto tiene la primera respuesta
+CHILD_CODE = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import {SERVER_MODULE} as server
+t1 = time.perf_counter()
+client = server.app.test_client()
+status = client.get(sys.argv[1]).status_code
+t2 = time.perf_counter()
+client.get(sys.argv[1])
+t3 = time.perf_counter()
+print(json.dumps({{'status': status, 'import': t1 - t0, 'first_request': t2 - t1, 'second_request': t3 - t2}}), flush=True)
+"""
+
+
+def child_env(extra):
+    env = dict(os.environ)
+    # Sin archivo de log ni ruido en stderr (la salida de -X importtime va ahí)
+    env.update({'LOG_FILE': '', 'LOG_LEVEL': 'ERROR'})
+    env.update(extra)
+    return env
+
+
+def timed_run(route, env):
+    """Una corrida en frío; devuelve los tiempos en segundos"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', CHILD_CODE, route], cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = proc.stdout.readline()
+    wall = time.perf_counter() - start
+    proc.wait()
+    if not line:
+        raise RuntimeError(f"El proceso hijo terminó sin responder (código {proc.returncode})")
+    result = json.loads(line)
+    result['wall'] = wall
+    return result
+
+
+def parse_importtime(stderr):
+    """
+    Tiempo propio de SERVER_MODULE y acumulado de los módulos que importa
+    directamente, en segundos, a partir de la salida de -X importtime
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((depth, int(self_us), int(cumulative_us), name.strip()))
+
+    # -X importtime escribe cada módulo al terminar de importarlo: los que
+    # importa SERVER_MODULE aparecen justo antes que él, un nivel más adentro
+    for index, (depth, self_us, cumulative_us, name) in enumerate(entries):
+        if name != SERVER_MODULE:
+            continue
+        children = {}
+        for child_depth, _, child_cumulative, child_name in reversed(entries[:index]):
+            if child_depth <= depth:
+                break
+            if child_depth == depth + 1:
+                children[child_name] = child_cumulative / 1e6
+        return {'self': self_us / 1e6, 'cumulative': cumulative_us / 1e6, 'children': children}
+    raise RuntimeError(f"{SERVER_MODULE} no aparece en la salida de -X importtime")
+
+
+def importtime_run(env):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {SERVER_MODULE}'],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falló el import de {SERVER_MODULE}:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def summarize(runs, importtimes, top):
+    timings = {key: statistics.median(run[key] for run in runs)
+               for key in ('wall', 'import', 'first_request', 'second_request')}
+    children = {}
+    for entry in importtimes:
+        for name, seconds in entry['children'].items():
+            children.setdefault(name, []).append(seconds)
+    modules = sorted(((name, statistics.median(values)) for name, values in children.items()),
+                     key=lambda item: item[1], reverse=True)
+    return {
+        'runs': len(runs),
+        'status': runs[0]['status'],
+        'median_seconds': timings,
+        'min_wall_seconds': min(run['wall'] for run in runs),
+        'import_self_seconds': statistics.median(entry['self'] for entry in importtimes),
+        'import_cumulative_seconds': statistics.median(entry['cumulative'] for entry in importtimes),
+        'top_imports': [{'module': name, 'seconds': seconds} for name, seconds in modules[:top]],
+    }
+
+
+def print_summary(summary, route):
+    ms = summary['median_seconds']
+    print(f"\nArranque en frío: {summary['runs']} corridas, GET {route} -> {summary['status']} (medianas)")
+    print(f"  {'primera respuesta (wall)':<28}{ms['wall'] * 1000:>9.1f} ms  (mín {summary['min_wall_seconds'] * 1000:.1f} ms)")
+    print(f"  {'import del servidor':<28}{ms['import'] * 1000:>9.1f} ms")
+    print(f"  {'primera petición':<28}{ms['first_request'] * 1000:>9.1f} ms")
+    print(f"  {'segunda petición':<28}{ms['second_request'] * 1000:>9.1f} ms")
+    print(f"\n-X importtime de {SERVER_MODULE}: {summary['import_cumulative_seconds'] * 1000:.1f} ms acumulado, "
+          f"{summary['import_self_seconds'] * 1000:.1f} ms propio")
+    for entry in summary['top_imports']:
+        print(f"  {entry['module']:<28}{entry['seconds'] * 1000:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del arranque en frío del servidor")
+    parser.add_argument('--runs', type=int, default=10, help="Procesos en frío a medir (default: 10)")
+    parser.add_argument('--route', default='/connection-status',
+                        help="Ruta de la primera petición (default: /connection-status)")
+    parser.add_argument('--top', type=int, default=10, help="Imports directos a mostrar (default: 10)")
+    parser.add_argument('--env', action='append', default=[], metavar='CLAVE=VALOR',
+                        help="Variable de entorno para el servidor (repetible)")
+    parser.add_argument('--json', type=Path, default=None, help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    extra = {}
+    for item in args.env:
+        key, sep, value = item.partition('=')
+        if not sep:
+            parser.error(f"--env espera CLAVE=VALOR: {item}")
+        extra[key] = value
+    env = child_env(extra)
+
+    # Una corrida descartada para compilar los .pyc y calentar la caché de disco
+    timed_run(args.route, env)
+    runs = [timed_run(args.route, env) for _ in range(args.runs)]
+    importtimes = [importtime_run(env) for _ in range(args.runs)]
+
+    summary = summarize(runs, importtimes, args.top)
+    summary['route'] = args.route
+    print_summary(summary, args.route)
+
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2), encoding='utf-8')
+        print(f"\nResultados guardados en: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
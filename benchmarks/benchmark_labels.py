@@ -0,0 +1,98 @@
+"""
+Benchmark de la generación de etiquetas (`ensure_labels`)
+
+Compara la versión vectorizada actual contra la implementación anterior fila
+por fila (reproducida aquí como referencia). La versión anterior solo se mide
+hasta `--legacy-max-rows` filas; para tamaños mayores se extrapola linealmente
+porque tardaría horas.
+
+Uso:
+    python benchmarks/benchmark_labels.py
+    python benchmarks/benchmark_labels.py --sizes 10000 1000000 10000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from linear_regression_sensor_data import PREDICTION_COLUMN, ensure_labels  # noqa: E402
+
+
+def legacy_ensure_labels(df, label_column):
+    """Implementación anterior: un Series por fila con `iloc`"""
+    df_copy = df.copy()
+    df_copy[label_column] = "No regar"
+
+    def is_hundred(value):
+        if pd.isna(value):
+            return False
+        try:
+            return float(value) == 100.0
+        except (TypeError, ValueError):
+            return False
+
+    for idx in range(1, len(df_copy)):
+        if any(is_hundred(df_copy.iloc[idx].get(col)) for col in ("soil_moisture1", "soil_moisture2")):
+            df_copy.at[idx - 1, label_column] = "Regar"
+    return df_copy
+
+
+def make_frame(n_rows, n_devices=10, seed=0):
+    """Lecturas de varios dispositivos cada 5 minutos, intercaladas y ordenadas en el tiempo"""
+    rng = np.random.default_rng(seed)
+    steps = np.arange(n_rows) // n_devices
+    soil1 = rng.uniform(0, 100, n_rows).round(1)
+    soil1[rng.random(n_rows) < 0.02] = 100.0
+    return pd.DataFrame({
+        "device_id": (np.arange(n_rows) % n_devices).astype(str),
+        "timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(steps * 300, unit="s"),
+        "soil_moisture1": soil1,
+        "soil_moisture2": rng.uniform(0, 100, n_rows).round(1),
+    })
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ensure_labels")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=10_000,
+                        help="Tamaño máximo medido con la versión anterior (default: 10000)")
+    args = parser.parse_args()
+
+    # Con un solo dispositivo en orden, ambas versiones deben coincidir
+    check = make_frame(2_000, n_devices=1)
+    if not (ensure_labels(check, PREDICTION_COLUMN)[PREDICTION_COLUMN]
+            .equals(legacy_ensure_labels(check, PREDICTION_COLUMN)[PREDICTION_COLUMN])):
+        print("[ERROR] La versión vectorizada no coincide con la anterior")
+        sys.exit(1)
+
+    legacy_rows = min(args.legacy_max_rows, max(args.sizes))
+    legacy_per_row = time_call(legacy_ensure_labels, make_frame(legacy_rows), PREDICTION_COLUMN) / legacy_rows
+
+    print(f"{'filas':>12} {'vectorizado (s)':>16} {'anterior (s)':>14} {'aceleración':>12}")
+    print("-" * 57)
+    for n_rows in args.sizes:
+        df = make_frame(n_rows)
+        vectorized = time_call(ensure_labels, df, PREDICTION_COLUMN)
+        if n_rows <= args.legacy_max_rows:
+            legacy = time_call(legacy_ensure_labels, df, PREDICTION_COLUMN)
+            legacy_text = f"{legacy:.3f}"
+        else:
+            legacy = legacy_per_row * n_rows
+            legacy_text = f"~{legacy:.0f}"
+        print(f"{n_rows:>12} {vectorized:>16.3f} {legacy_text:>14} {legacy / vectorized:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark del predictor de riego (ns por predicción)
+
+Mide:
+    - IrrigationPredictor.predict / predict_from_dict (API de diccionarios)
+    - IrrigationPredictor.predict_fast / predict_fast_from_dict (ruta rápida)
+    - IrrigationPredictor.predict_batch (lote con la ruta rápida)
+    - backfill_predictions.score_rows (lote vectorizado con numpy/scikit-learn)
+    - local_irrigation_predictor.predict_irrigation (scikit-learn, una fila)
+
+Uso:
+    python benchmarks/benchmark_predictor.py
+    python benchmarks/benchmark_predictor.py --pyperf   # si pyperf está instalado
+"""
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from irrigation_predictor import IrrigationPredictor  # noqa: E402
+
+BATCH_SIZE = 1000
+
+
+def make_rows(n, seed=0):
+    """Genera `n` lecturas de sensor aleatorias"""
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i + 1,
+            'timestamp': '2025-01-01 00:00:00',
+            'uv_index': rng.uniform(0, 10),
+            'temperature2': rng.uniform(15, 35),
+            'humidity2': rng.uniform(30, 90),
+            'soil_moisture1': rng.uniform(0, 100),
+            'soil_moisture2': rng.uniform(0, 100),
+        }
+        for i in range(n)
+    ]
+
+
+def build_cases():
+    """
+    Devuelve una lista de (nombre, función sin argumentos, predicciones por llamada)
+
+    Los casos que dependen de paquetes opcionales (numpy, scikit-learn) se
+    omiten si no están instalados.
+    """
+    predictor = IrrigationPredictor()
+    rows = make_rows(BATCH_SIZE)
+    row = rows[0]
+    args = (row['uv_index'], row['temperature2'], row['humidity2'],
+            row['soil_moisture1'], row['soil_moisture2'])
+
+    cases = [
+        ('predict', lambda: predictor.predict(*args), 1),
+        ('predict_from_dict', lambda: predictor.predict_from_dict(row), 1),
+        ('predict_fast', lambda: predictor.predict_fast(*args), 1),
+        ('predict_fast_from_dict', lambda: predictor.predict_fast_from_dict(row), 1),
+        (f'predict_batch[{BATCH_SIZE}]', lambda: predictor.predict_batch(rows), BATCH_SIZE),
+    ]
+
+    try:
+        import local_irrigation_predictor as local
+        from backfill_predictions import score_rows
+
+        model = local.get_prediction_model()
+        cases.append((f'score_rows[{BATCH_SIZE}] (numpy)', lambda: score_rows(rows, model), BATCH_SIZE))
+        cases.append(('local predict_irrigation (sklearn)', lambda: local.predict_irrigation(row), 1))
+    except ImportError as e:
+        print(f"[INFO] Casos de scikit-learn omitidos: {e}")
+
+    return cases
+
+
+def run_timeit(cases, repeat):
+    print(f"{'caso':<40} {'ns/predicción':>15}")
+    print("-" * 56)
+    for name, func, per_call in cases:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number))
+        ns_per_prediction = best / number / per_call * 1e9
+        print(f"{name:<40} {ns_per_prediction:>15.1f}")
+
+
+def run_pyperf(cases):
+    import pyperf
+
+    runner = pyperf.Runner()
+    for name, func, per_call in cases:
+        runner.bench_func(name, func, inner_loops=per_call)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark del predictor de riego")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeticiones de timeit (default: 5)")
+    parser.add_argument('--pyperf', action='store_true', help="Usar pyperf en lugar de timeit")
+    args, remaining = parser.parse_known_args()
+
+    cases = build_cases()
+    if args.pyperf:
+        # pyperf procesa sus propios argumentos de línea de comandos
+        sys.argv = [sys.argv[0]] + remaining
+        run_pyperf(cases)
+    else:
+        run_timeit(cases, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark del entrenamiento y la predicción sobre datos simulados
+
+Para cada tamaño genera un CSV con `simulate_sensor_data.py` y mide, por fase,
+el tiempo y (con --memory) el pico de memoria:
+    - load: `load_dataset` sin caché, y con la caché .npy ya creada
+    - label: `ensure_labels`
+    - fit: `prepare_training_data` + pipeline de scikit-learn
+    - fit_streaming: `iter_training_batches` + `SufficientStatistics` (modo --streaming)
+    - score_sklearn: predicción vectorizada del pipeline sobre todas las filas
+    - score_predictor: `IrrigationPredictor.predict_batch` (Python puro)
+    - score_local: `local_irrigation_predictor` vía `backfill_predictions.score_rows`
+
+Las dos últimas trabajan sobre diccionarios por fila; se miden hasta
+`--row-api-max-rows` filas y se extrapolan linealmente por encima.
+
+Uso:
+    python benchmarks/benchmark_training.py
+    python benchmarks/benchmark_training.py --sizes 10000 1000000 10000000 --memory
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import Namespace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from irrigation_predictor import IrrigationPredictor  # noqa: E402
+from linear_regression_sensor_data import (  # noqa: E402
+    DEFAULT_FEATURES,
+    DEVICE_COLUMN,
+    PREDICTION_COLUMN,
+    SufficientStatistics,
+    _csv_columns,
+    build_pipeline,
+    ensure_labels,
+    iter_csv_chunks,
+    iter_training_batches,
+    load_dataset,
+    prepare_training_data,
+)
+from simulate_sensor_data import write_csv  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def training_args(csv_path, chunk_size):
+    """Argumentos equivalentes a la línea de comandos de linear_regression_sensor_data"""
+    return Namespace(
+        csv_path=csv_path, features=list(DEFAULT_FEATURES), prediction_column=PREDICTION_COLUMN,
+        temporal_features=False, test_size=0.2, random_state=42, chunk_size=chunk_size,
+    )
+
+
+def measure(func, memory):
+    """Ejecuta `func` y devuelve (resultado, segundos, pico en MB o None)"""
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def fit_streaming(args):
+    stats = None
+    for _, X, y, test, _ in iter_training_batches(
+        iter_csv_chunks(args.csv_path, args.chunk_size, _csv_columns(args)), args
+    ):
+        if stats is None:
+            stats = SufficientStatistics(X.shape[1])
+        stats.update(X[~test], y[~test])
+    return stats.solve()
+
+
+def run_size(n_rows, args, workdir):
+    csv_path = workdir / f"sim_{n_rows}.csv"
+    cache_dir = workdir / "dataset_cache"
+    _, simulate_seconds, _ = measure(lambda: write_csv(csv_path, n_rows, args.devices, args.seed), False)
+
+    train_args = training_args(csv_path, args.chunk_size)
+    columns = _csv_columns(train_args)
+    text_columns = (DEVICE_COLUMN, PREDICTION_COLUMN)
+    phases = {}
+
+    def phase(name, func, rows=n_rows):
+        result, seconds, peak = measure(func, args.memory)
+        phases[name] = {'seconds': seconds * n_rows / rows, 'peak_mb': peak, 'extrapolated': rows < n_rows}
+        return result
+
+    df = phase('load', lambda: load_dataset(csv_path, columns, None, text_columns))
+    load_dataset(csv_path, columns, cache_dir, text_columns)
+    phase('load_cached', lambda: load_dataset(csv_path, columns, cache_dir, text_columns))
+    df = phase('label', lambda: ensure_labels(df, PREDICTION_COLUMN))
+
+    def fit():
+        X, y, _ = prepare_training_data(df, list(DEFAULT_FEATURES), PREDICTION_COLUMN)
+        return X, build_pipeline().fit(X, y)
+
+    X, model = phase('fit', fit)
+    phase('fit_streaming', lambda: fit_streaming(train_args))
+    phase('score_sklearn', lambda: model.predict(X))
+
+    row_count = min(n_rows, args.row_api_max_rows)
+    rows = df.head(row_count)[['id', 'timestamp'] + list(DEFAULT_FEATURES)].to_dict('records')
+    predictor = IrrigationPredictor()
+    phase('score_predictor', lambda: predictor.predict_batch(rows), row_count)
+    try:
+        import local_irrigation_predictor as local
+        from backfill_predictions import score_rows
+
+        local_model = local.get_prediction_model()
+        phase('score_local', lambda: score_rows(rows, local_model), row_count)
+    except ImportError as e:
+        print(f"[INFO] score_local omitido: {e}")
+
+    if not args.keep_files:
+        csv_path.unlink()
+    return {'rows': n_rows, 'simulate_seconds': simulate_seconds, 'phases': phases}
+
+
+def print_results(results):
+    print(f"{'filas':>12} {'fase':<16} {'tiempo (s)':>12} {'filas/s':>14} {'pico MB':>9}")
+    print("-" * 67)
+    for result in results:
+        n_rows = result['rows']
+        for name, data in result['phases'].items():
+            seconds = data['seconds']
+            prefix = '~' if data['extrapolated'] else ''
+            peak = f"{data['peak_mb']:.1f}" if data['peak_mb'] is not None else '-'
+            print(f"{n_rows:>12} {name:<16} {prefix + f'{seconds:.3f}':>12} "
+                  f"{n_rows / seconds if seconds else float('inf'):>14,.0f} {peak:>9}")
+        print()
+    if resource is not None:
+        # ru_maxrss: KB en Linux, bytes en macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scale = 2**20 if sys.platform == 'darwin' else 2**10
+        print(f"RSS máximo del proceso: {maxrss / scale:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de entrenamiento y predicción con datos simulados")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help="Filas por corrida (default: 10000 100000 1000000)")
+    parser.add_argument('--devices', type=int, default=10, help="Dispositivos simulados (default: 10)")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla del simulador (default: 0)")
+    parser.add_argument('--chunk-size', type=int, default=100_000,
+                        help="Filas por bloque en fit_streaming (default: 100000)")
+    parser.add_argument('--row-api-max-rows', type=int, default=100_000,
+                        help="Filas medidas con las APIs por diccionario (default: 100000)")
+    parser.add_argument('--memory', action='store_true',
+                        help="Mide el pico de memoria por fase con tracemalloc (hace más lentas las fases)")
+    parser.add_argument('--workdir', type=Path, default=None,
+                        help="Carpeta para los CSV generados (default: carpeta temporal)")
+    parser.add_argument('--keep-files', action='store_true', help="No borra los CSV generados")
+    parser.add_argument('--json', type=Path, default=None, help="Guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = []
+        for n_rows in args.sizes:
+            print(f"[INFO] {n_rows} filas...")
+            results.append(run_size(n_rows, args, workdir))
+
+    print_results(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Resultados guardados en: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Simulador vectorizado de lecturas de sensores para varios dispositivos
+
+A diferencia de `generate_dummy_data` (test_scripts/test_dummy_data.py), que
+genera lecturas uniformes independientes, aquí cada dispositivo produce una
+serie temporal coherente:
+    - temperatura y UV con ciclo diario (UV cero de noche, días nublados)
+    - humedad relativa que baja cuando sube la temperatura
+    - humedad de suelo que se seca más rápido con calor y sol
+    - riegos que devuelven la humedad de suelo a 100 al cruzar un umbral
+      propio de cada dispositivo (lo que usa la regla de etiquetado)
+
+Las lecturas se generan por bloques de pasos de tiempo (todos los
+dispositivos a la vez, intercalados como llegarían al servidor), así que se
+pueden escribir de 10k a 100M filas con memoria acotada.
+
+Uso:
+    python benchmarks/simulate_sensor_data.py --rows 1000000 --devices 10 -o sim.csv
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'id', 'device_id', 'timestamp', 'temperature1', 'humidity1', 'temperature2',
+    'humidity2', 'soil_moisture1', 'soil_moisture2', 'uv_index',
+]
+INTERVAL_SECONDS = 300
+START = '2025-01-01 00:00:00'
+# Filas generadas por bloque (se ajusta a un múltiplo del número de dispositivos)
+CHUNK_ROWS = 1_000_000
+
+
+class _DeviceProfiles:
+    """Parámetros fijos por dispositivo (clima local, suelo, umbral de riego)"""
+
+    def __init__(self, n_devices, rng):
+        self.temp_offset = rng.normal(0.0, 2.0, n_devices)
+        self.dry_rate = rng.uniform(0.04, 0.12, n_devices)      # % por lectura a 22 °C
+        self.irrigation_at = rng.uniform(25.0, 45.0, n_devices)  # humedad que dispara el riego
+        self.deep_ratio = rng.uniform(0.5, 0.8, n_devices)       # sensor 2 más profundo: se seca menos
+        # Pérdida acumulada desde el último riego, al inicio del siguiente bloque
+        self.loss_since_irrigation = rng.uniform(0.0, 100.0 - self.irrigation_at)
+
+
+def iter_simulated_chunks(n_rows, n_devices=10, seed=0, chunk_rows=CHUNK_ROWS,
+                          interval=INTERVAL_SECONDS, start=START):
+    """
+    Genera el dataset simulado por bloques de DataFrame
+
+    Args:
+        n_rows: filas totales (se redondea hacia arriba a pasos completos)
+        n_devices: dispositivos que reportan en cada paso
+        seed: semilla del generador
+        chunk_rows: filas aproximadas por bloque
+        interval: segundos entre lecturas de un dispositivo
+        start: fecha de la primera lectura
+    """
+    rng = np.random.default_rng(seed)
+    profiles = _DeviceProfiles(n_devices, rng)
+    n_steps = -(-n_rows // n_devices)
+    steps_per_chunk = max(1, chunk_rows // n_devices)
+    start_seconds = pd.Timestamp(start).value // 10**9
+    # Nubosidad por día (escala el UV y un poco la temperatura)
+    n_days = n_steps * interval // 86400 + 2
+    cloud = rng.beta(4.0, 2.0, n_days)
+    devices = np.arange(n_devices)
+
+    for first_step in range(0, n_steps, steps_per_chunk):
+        steps = np.arange(first_step, min(first_step + steps_per_chunk, n_steps))
+        seconds = start_seconds + steps * interval
+        hour = (seconds % 86400) / 3600.0
+        day_cloud = cloud[(steps * interval) // 86400][:, None]
+        shape = (len(steps), n_devices)
+
+        # Ciclo diario: máximo de temperatura ~15 h, UV entre 6 y 18 h
+        temp2 = (22.0 + 6.0 * np.sin(2 * np.pi * (hour - 9.0) / 24.0))[:, None] * (0.85 + 0.15 * day_cloud)
+        temp2 = temp2 + profiles.temp_offset + rng.normal(0.0, 0.4, shape)
+        uv = np.clip(10.0 * np.sin(np.pi * (hour - 6.0) / 12.0), 0.0, None)[:, None] * day_cloud
+        uv = np.clip(uv + rng.normal(0.0, 0.2, shape) * (uv > 0), 0.0, 11.0)
+        hum2 = np.clip(65.0 - 1.8 * (temp2 - 22.0) + rng.normal(0.0, 3.0, shape), 10.0, 100.0)
+
+        # Secado: pérdida acumulada por dispositivo; cada riego la reinicia
+        rate = profiles.dry_rate * np.clip(1.0 + 0.05 * (temp2 - 22.0) + 0.08 * uv, 0.2, None)
+        loss = np.cumsum(rate, axis=0) + profiles.loss_since_irrigation
+        base = np.zeros(shape)
+        irrigated = np.zeros(shape, dtype=bool)
+        budget = 100.0 - profiles.irrigation_at
+        for d in devices:
+            column = loss[:, d]
+            target = budget[d]
+            # `loss` es creciente: cada riego se encuentra con una búsqueda binaria
+            i = np.searchsorted(column, target)
+            while i < len(column):
+                irrigated[i, d] = True
+                base[i, d] = column[i]
+                target = column[i] + budget[d]
+                i = np.searchsorted(column, target, side='left')
+        base = np.maximum.accumulate(base, axis=0)
+        drained = loss - base
+        profiles.loss_since_irrigation = drained[-1].copy()
+
+        soil1 = np.clip(100.0 - drained + rng.normal(0.0, 0.5, shape), 0.0, 100.0).round(1)
+        soil2 = np.clip(100.0 - drained * profiles.deep_ratio + rng.normal(0.0, 0.5, shape), 0.0, 100.0).round(1)
+        soil1[irrigated] = 100.0
+        soil2[irrigated] = 100.0
+
+        ids = first_step * n_devices + np.arange(1, soil1.size + 1)
+        frame = pd.DataFrame({
+            'id': ids,
+            'device_id': np.tile(devices, len(steps)).astype(str),
+            'timestamp': pd.to_datetime(np.repeat(seconds, n_devices), unit='s'),
+            'temperature1': (temp2 + rng.normal(0.3, 0.5, shape)).round(1).ravel(),
+            'humidity1': np.clip(hum2 + rng.normal(-2.0, 2.0, shape), 0.0, 100.0).round(1).ravel(),
+            'temperature2': temp2.round(1).ravel(),
+            'humidity2': hum2.round(1).ravel(),
+            'soil_moisture1': soil1.ravel(),
+            'soil_moisture2': soil2.ravel(),
+            'uv_index': uv.round(1).ravel(),
+        }, columns=COLUMNS)
+
+        remaining = n_rows - first_step * n_devices
+        yield frame.iloc[:remaining] if remaining < len(frame) else frame
+
+
+def simulate_frame(n_rows, n_devices=10, seed=0):
+    """Dataset simulado completo en memoria"""
+    return pd.concat(iter_simulated_chunks(n_rows, n_devices, seed), ignore_index=True)
+
+
+def write_csv(path, n_rows, n_devices=10, seed=0, chunk_rows=CHUNK_ROWS):
+    """Escribe el dataset simulado en `path` bloque a bloque"""
+    path = Path(path)
+    with path.open('w', encoding='utf-8', newline='') as fh:
+        header = True
+        for chunk in iter_simulated_chunks(n_rows, n_devices, seed, chunk_rows):
+            chunk.to_csv(fh, index=False, header=header, date_format='%Y-%m-%d %H:%M:%S')
+            header = False
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de lecturas de sensores para varios dispositivos")
+    parser.add_argument('--rows', type=int, default=100_000, help="Filas a generar (default: 100000)")
+    parser.add_argument('--devices', type=int, default=10, help="Dispositivos simulados (default: 10)")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla (default: 0)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"Filas por bloque al escribir (default: {CHUNK_ROWS})")
+    parser.add_argument('-o', '--output', type=Path, default=Path('simulated_sensor_data.csv'),
+                        help="CSV de salida (default: simulated_sensor_data.csv)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write_csv(args.output, args.rows, args.devices, args.seed, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    print(f"{args.rows} filas ({args.devices} dispositivos) en {args.output} "
+          f"[{elapsed:.1f} s, {args.rows / elapsed:,.0f} filas/s]")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Estado de conexión de cada dispositivo según su propio ritmo de envío
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Al recibir una lectura se actualizan, en O(1), las estadísticas de llegada
+del dispositivo:
+    - intervalo típico entre lecturas (EWMA)
+    - jitter (EWMA de la desviación absoluta respecto a ese intervalo)
+    - lecturas perdidas (huecos de varios intervalos) y disponibilidad
+      (recibidas / (recibidas + perdidas))
+y se fijan ahí mismo los instantes en que el dispositivo pasa a `late` y a
+`disconnected`. Consultar el estado es solo comparar la hora actual con esos
+dos instantes, así que servir todos los dispositivos cuesta O(1) por
+dispositivo y ninguna consulta modifica el estado.
+
+Hasta conocer el ritmo de un dispositivo se asume DEVICE_EXPECTED_INTERVAL
+(300 s, el del firmware actual): desconectado tras 1.4 intervalos = 420 s, la
+ventana fija que se usaba antes. Los primeros WARMUP_INTERVALS intervalos
+reemplazan ese valor (media simple); después se usa la EWMA y se detectan
+huecos. Las lecturas extra se ignoran en ambas fases desde el primer
+intervalo medido.
+
+El `device_id` lo envía el cliente, así que se guardan a lo sumo
+MAX_TRACKED_DEVICES dispositivos: al superar el límite se descarta el que lleva
+más tiempo sin comunicarse (LRU).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from irrigation_predictor import MAX_TRACKED_DEVICES
+
+DEVICE_EXPECTED_INTERVAL = float(os.getenv('DEVICE_EXPECTED_INTERVAL', '300'))
+LIVENESS_ALPHA = float(os.getenv('LIVENESS_ALPHA', '0.2'))
+# Intervalos (más 3 jitters) sin lecturas antes de considerar desconectado
+LIVENESS_TOLERANCE = float(os.getenv('LIVENESS_TOLERANCE', '1.4'))
+WARMUP_INTERVALS = 4
+MIN_INTERVAL = 1.0
+# Un hueco mayor a GAP_FACTOR intervalos cuenta lecturas perdidas
+GAP_FACTOR = 1.5
+# Lecturas más seguidas que esta fracción del intervalo (p. ej. pedidas desde
+# /request-data) no cambian el ritmo estimado
+EXTRA_SAMPLE_FRACTION = 0.5
+
+STATUSES = ('connected', 'late', 'disconnected')
+
+
+class _DeviceArrivals:
+    """Estadísticas de llegada de un dispositivo"""
+
+    __slots__ = ('first_seen', 'last_sample', 'last_seen', 'received', 'missed',
+                 'measured', 'interval', 'jitter', 'late_at', 'offline_at')
+
+    def __init__(self, now, interval):
+        self.first_seen = now
+        self.last_sample = now
+        self.last_seen = now
+        self.received = 1
+        self.missed = 0
+        self.measured = 0
+        self.interval = interval
+        self.jitter = 0.0
+        self._schedule()
+
+    def _schedule(self):
+        self.late_at = self.last_seen + self.interval + self.jitter
+        self.offline_at = self.last_seen + self.interval * LIVENESS_TOLERANCE + 3 * self.jitter
+
+    def sample(self, now, alpha):
+        elapsed = now - self.last_sample
+        self.received += 1
+        if self.measured and elapsed < self.interval * EXTRA_SAMPLE_FRACTION:
+            # Lectura extra (reintento, /request-data): cuenta como recibida pero
+            # no es un intervalo. Antes del primer intervalo medido no hay ritmo
+            # propio con qué comparar, así que esa primera medida se acepta
+            pass
+        elif self.measured < WARMUP_INTERVALS:
+            # Media simple: el primer intervalo medido reemplaza el valor asumido
+            self.measured += 1
+            if self.measured > 1:
+                self.jitter += (abs(elapsed - self.interval) - self.jitter) / (self.measured - 1)
+            self.interval = max(MIN_INTERVAL, self.interval + (elapsed - self.interval) / self.measured)
+        else:
+            # Un hueco de k intervalos son k - 1 lecturas perdidas; el ritmo se
+            # actualiza con el intervalo por lectura para que el hueco no lo infle
+            steps = round(elapsed / self.interval) if elapsed > self.interval * GAP_FACTOR else 1
+            self.missed += steps - 1
+            interval = elapsed / steps
+            self.jitter += alpha * (abs(interval - self.interval) - self.jitter)
+            self.interval = max(MIN_INTERVAL, self.interval + alpha * (interval - self.interval))
+        self.last_sample = now
+        self.last_seen = max(self.last_seen, now)
+        self._schedule()
+
+    def contact(self, now):
+        self.last_seen = max(self.last_seen, now)
+        self._schedule()
+
+    def status(self, now):
+        if now >= self.offline_at:
+            return 'disconnected'
+        if now >= self.late_at:
+            return 'late'
+        return 'connected'
+
+
+class DeviceLivenessTracker:
+    """Estadísticas de llegada y estado de conexión de todos los dispositivos"""
+
+    def __init__(self, expected_interval=DEVICE_EXPECTED_INTERVAL, alpha=LIVENESS_ALPHA,
+                 max_devices=MAX_TRACKED_DEVICES):
+        self.expected_interval = expected_interval
+        self.alpha = alpha
+        self.max_devices = max(1, int(max_devices))
+        self._devices = OrderedDict()
+        self._lock = threading.Lock()
+        self.last_device = None
+        self.evictions = 0
+
+    def record(self, device_id, now=None):
+        """Registra una lectura del dispositivo (se llama al recibir datos)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            arrivals = self._devices.get(device_id)
+            if arrivals is None:
+                self._add(device_id, _DeviceArrivals(now, self.expected_interval))
+            else:
+                arrivals.sample(now, self.alpha)
+                self._devices.move_to_end(device_id)
+            self.last_device = device_id
+
+    def contact(self, device_id, now=None):
+        """Registra un contacto sin lectura (p. ej. respuesta a /communication-test)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            arrivals = self._devices.get(device_id)
+            if arrivals is None:
+                arrivals = _DeviceArrivals(now, self.expected_interval)
+                arrivals.received = 0
+                self._add(device_id, arrivals)
+            else:
+                arrivals.contact(now)
+                self._devices.move_to_end(device_id)
+            self.last_device = device_id
+
+    def status(self, device_id, now=None):
+        """Estado y estadísticas del dispositivo (None si nunca se comunicó)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            arrivals = self._devices.get(device_id)
+            if arrivals is None:
+                return None
+            return self._status(device_id, arrivals, now)
+
+    def all_statuses(self, now=None):
+        """Estado de todos los dispositivos y conteo por estado"""
+        now = time.time() if now is None else now
+        with self._lock:
+            devices = [self._status(device_id, arrivals, now) for device_id, arrivals in self._devices.items()]
+        summary = dict.fromkeys(STATUSES, 0)
+        for device in devices:
+            summary[device['status']] += 1
+        return devices, summary
+
+    def __len__(self):
+        with self._lock:
+            return len(self._devices)
+
+    def _add(self, device_id, arrivals):
+        self._devices[device_id] = arrivals
+        if len(self._devices) > self.max_devices:
+            self._devices.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _status(device_id, arrivals, now):
+        expected = arrivals.received + arrivals.missed
+        return {
+            'device_id': device_id,
+            'status': arrivals.status(now),
+            'last_seen': arrivals.last_seen,
+            'seconds_since_last_seen': round(now - arrivals.last_seen, 1),
+            'expected_interval': round(arrivals.interval, 1),
+            'jitter': round(arrivals.jitter, 1),
+            'received': arrivals.received,
+            'missed': arrivals.missed,
+            'uptime_ratio': round(arrivals.received / expected, 4) if expected else None,
+            'late_after': arrivals.late_at,
+            'disconnected_after': arrivals.offline_at,
+            'tracked_seconds': round(arrivals.last_seen - arrivals.first_seen, 1),
+        }
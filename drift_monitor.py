@@ -0,0 +1,161 @@
+"""
+Monitor de deriva de las entradas del modelo de riego
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+El artefacto del modelo (`--save-model` de linear_regression_sensor_data.py)
+guarda, por característica, los cortes por cuantiles y la proporción de filas
+de entrenamiento en cada bin. El servidor cuenta en qué bin cae cada lectura
+en vivo, por dispositivo, sobre una ventana de las últimas DRIFT_WINDOW
+lecturas: al entrar una lectura se suma su bin y se resta el de la que sale,
+así que cada actualización cuesta O(1) (más una búsqueda binaria en ~10 cortes).
+
+Al consultar se calculan, por característica:
+    - PSI (population stability index): < 0.1 estable, < 0.25 moderada, más = deriva
+    - KS sobre los histogramas: máxima diferencia entre las distribuciones acumuladas
+
+Hay ventanas para a lo sumo MAX_TRACKED_DEVICES dispositivos (LRU por última
+lectura).
+"""
+
+import math
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from irrigation_predictor import MAX_TRACKED_DEVICES
+
+DRIFT_WINDOW = int(os.getenv('DRIFT_WINDOW', '288'))   # ~1 día con lecturas cada 5 minutos
+PSI_MODERATE = 0.1
+PSI_DRIFT = 0.25
+# Evita log(0) en bins vacíos
+EPSILON = 1e-4
+
+
+class _FeatureWindow:
+    """Conteo por bin de las últimas `window` lecturas de una característica"""
+
+    __slots__ = ('edges', 'counts', 'ring', 'size', 'pos')
+
+    def __init__(self, edges, window):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.ring = array('H', [0]) * window
+        self.size = 0
+        self.pos = 0
+
+    def add(self, value):
+        index = bisect_right(self.edges, value)
+        ring = self.ring
+        if self.size == len(ring):
+            self.counts[ring[self.pos]] -= 1
+        else:
+            self.size += 1
+        ring[self.pos] = index
+        self.counts[index] += 1
+        self.pos = (self.pos + 1) % len(ring)
+
+
+def population_stability_index(expected, actual):
+    """PSI entre dos listas de proporciones por bin"""
+    psi = 0.0
+    for e, a in zip(expected, actual):
+        e = max(e, EPSILON)
+        a = max(a, EPSILON)
+        psi += (a - e) * math.log(a / e)
+    return psi
+
+
+def ks_statistic(expected, actual):
+    """KS entre dos histogramas con los mismos bins"""
+    cum_e = cum_a = 0.0
+    statistic = 0.0
+    for e, a in zip(expected, actual):
+        cum_e += e
+        cum_a += a
+        statistic = max(statistic, abs(cum_a - cum_e))
+    return statistic
+
+
+def _status(psi):
+    if psi < PSI_MODERATE:
+        return 'stable'
+    if psi < PSI_DRIFT:
+        return 'moderate'
+    return 'drift'
+
+
+class DriftMonitor:
+    """Ventanas de lecturas por dispositivo comparadas contra la referencia del modelo"""
+
+    def __init__(self, reference, window=DRIFT_WINDOW, max_devices=MAX_TRACKED_DEVICES):
+        """
+        Args:
+            reference: dict característica -> {'edges': [...], 'proportions': [...]}
+            window: lecturas recientes consideradas por dispositivo
+            max_devices: dispositivos con ventana en memoria
+        """
+        self.reference = {
+            name: (list(ref['edges']), list(ref['proportions']))
+            for name, ref in reference.items()
+        }
+        self.window = window
+        self.max_devices = max(1, int(max_devices))
+        self._devices = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def update(self, device_id, reading):
+        """Registra una lectura del dispositivo"""
+        with self._lock:
+            windows = self._devices.get(device_id)
+            if windows is None:
+                windows = {name: _FeatureWindow(edges, self.window)
+                           for name, (edges, _) in self.reference.items()}
+                self._devices[device_id] = windows
+                if len(self._devices) > self.max_devices:
+                    self._devices.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._devices.move_to_end(device_id)
+            for name, feature_window in windows.items():
+                value = reading.get(name)
+                if value is not None:
+                    feature_window.add(value)
+
+    def scores(self, device_id):
+        """PSI y KS por característica del dispositivo (None si no hay lecturas)"""
+        with self._lock:
+            windows = self._devices.get(device_id)
+            if windows is None:
+                return None
+            # Copia de los conteos: el cálculo se hace fuera del lock
+            snapshot = [(name, w.size, list(w.counts)) for name, w in windows.items()]
+        features = {}
+        worst = 0.0
+        for name, size, counts in snapshot:
+            if not size:
+                continue
+            expected = self.reference[name][1]
+            actual = [count / size for count in counts]
+            psi = population_stability_index(expected, actual)
+            worst = max(worst, psi)
+            features[name] = {
+                'psi': round(psi, 4),
+                'ks': round(ks_statistic(expected, actual), 4),
+                'status': _status(psi),
+            }
+        samples = max((size for _, size, _ in snapshot), default=0)
+        return {
+            'device_id': device_id,
+            'samples': samples,
+            'window': self.window,
+            'max_psi': round(worst, 4),
+            'status': _status(worst),
+            'features': features,
+        }
+
+    def devices(self):
+        with self._lock:
+            return list(self._devices)
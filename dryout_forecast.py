@@ -0,0 +1,168 @@
+"""
+Pronóstico de secado del suelo por dispositivo
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Cada sensor de humedad de suelo tiene un suavizado de Holt (nivel + tendencia)
+que se actualiza en O(1) con cada lectura, admitiendo intervalos irregulares.
+Con el nivel y la tendencia se estima cuándo la humedad cruzará el umbral de
+sequedad. El pronóstico se calcula al recibir la lectura y queda en caché, así
+que consultarlo no cuesta nada.
+
+Se guardan los modelos de a lo sumo MAX_TRACKED_DEVICES dispositivos; al
+superarlo se descarta el que lleva más tiempo sin lecturas.
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from irrigation_predictor import MAX_TRACKED_DEVICES, SOIL_COLUMNS
+
+DRYOUT_THRESHOLD = float(os.getenv('DRYOUT_THRESHOLD', '30.0'))
+LEVEL_ALPHA = 0.5
+TREND_BETA = 0.3
+# Más allá de este horizonte la tendencia es demasiado débil para pronosticar:
+# el sensor se reporta como 'stable'
+DRYOUT_MAX_HORIZON_DAYS = float(os.getenv('DRYOUT_MAX_HORIZON_DAYS', '30'))
+# Un aumento mayor a esto entre lecturas se considera riego: se reinicia la tendencia
+IRRIGATION_JUMP = 20.0
+# Intervalo mínimo (minutos) para actualizar la tendencia: lecturas más seguidas
+# (p. ej. /request-data justo antes del envío regular) dividirían el cambio de
+# nivel por un dt casi nulo
+MIN_TREND_MINUTES = 1.0
+
+
+class HoltForecaster:
+    """Suavizado exponencial doble (Holt) para una serie con tiempos irregulares"""
+
+    __slots__ = ('alpha', 'beta', 'level', 'trend', 'last_timestamp')
+
+    def __init__(self, alpha=LEVEL_ALPHA, beta=TREND_BETA):
+        self.alpha = alpha
+        self.beta = beta
+        self.level = None
+        self.trend = 0.0          # cambio por minuto
+        self.last_timestamp = None
+
+    def update(self, timestamp, value):
+        """Agrega una lectura (timestamp en segundos epoch)"""
+        value = float(value)
+        if self.level is None or value - self.level > IRRIGATION_JUMP:
+            self.level = value
+            self.trend = 0.0
+            self.last_timestamp = timestamp
+            return
+
+        dt = (timestamp - self.last_timestamp) / 60.0
+        if dt < MIN_TREND_MINUTES:
+            # Lectura repetida, desordenada o demasiado cercana: solo corrige el
+            # nivel; la tendencia se actualiza con la próxima lectura espaciada
+            self.level = self.alpha * value + (1.0 - self.alpha) * self.level
+            return
+
+        previous_level = self.level
+        self.level = self.alpha * value + (1.0 - self.alpha) * (previous_level + self.trend * dt)
+        self.trend = self.beta * (self.level - previous_level) / dt + (1.0 - self.beta) * self.trend
+        self.last_timestamp = timestamp
+
+    def forecast(self, threshold, max_horizon_days=DRYOUT_MAX_HORIZON_DAYS):
+        """
+        Estima cuándo el nivel cruzará `threshold`
+
+        Returns:
+            dict con el nivel, la tendencia, los minutos restantes y el estado:
+            'dry' (ya está por debajo), 'drying' (bajando) o 'stable'
+            (sin bajar, o cruzaría después de `max_horizon_days` días)
+        """
+        if self.level is None:
+            return None
+
+        result = {
+            'level': round(self.level, 2),
+            'trend_per_minute': round(self.trend, 4),
+            'minutes_to_threshold': None,
+            'estimated_time': None,
+            'status': 'stable',
+        }
+        if self.level <= threshold:
+            result['minutes_to_threshold'] = 0.0
+            result['estimated_time'] = _format_timestamp(self.last_timestamp)
+            result['status'] = 'dry'
+        elif self.trend < 0:
+            minutes = (self.level - threshold) / -self.trend
+            if not minutes <= max_horizon_days * 24 * 60:
+                return result
+            result['minutes_to_threshold'] = round(minutes, 1)
+            result['estimated_time'] = _format_timestamp(self.last_timestamp + minutes * 60.0)
+            result['status'] = 'drying'
+        return result
+
+
+def _format_timestamp(seconds):
+    """Fecha local del instante (None si no es representable)"""
+    if not math.isfinite(seconds):
+        return None
+    try:
+        return datetime.fromtimestamp(seconds).strftime('%Y-%m-%d %H:%M:%S')
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+class DryoutForecaster:
+    """Pronósticos de secado por dispositivo, recalculados solo al llegar una lectura"""
+
+    def __init__(self, threshold=DRYOUT_THRESHOLD, columns=SOIL_COLUMNS, max_devices=MAX_TRACKED_DEVICES):
+        self.threshold = threshold
+        self.columns = tuple(columns)
+        self.max_devices = max(1, int(max_devices))
+        self._models = OrderedDict()
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def update(self, device_id, timestamp, reading):
+        """Actualiza los modelos del dispositivo y su pronóstico en caché"""
+        with self._lock:
+            models = self._models.get(device_id)
+            if models is None:
+                models = {col: HoltForecaster() for col in self.columns}
+                self._models[device_id] = models
+                if len(self._models) > self.max_devices:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._cache.pop(evicted, None)
+                    self.evictions += 1
+            else:
+                self._models.move_to_end(device_id)
+            for col in self.columns:
+                value = reading.get(col)
+                if value is not None:
+                    models[col].update(timestamp, value)
+            self._cache[device_id] = self._build(device_id, models, self.threshold)
+
+    def forecast(self, device_id, threshold=None):
+        """
+        Pronóstico del dispositivo
+
+        Con el umbral por defecto devuelve el valor en caché; con otro umbral
+        lo calcula en O(1) desde el nivel y la tendencia actuales.
+        """
+        with self._lock:
+            if threshold is None or threshold == self.threshold:
+                return self._cache.get(device_id)
+            models = self._models.get(device_id)
+            if models is None:
+                return None
+            return self._build(device_id, models, threshold)
+
+    def devices(self):
+        with self._lock:
+            return list(self._models)
+
+    def _build(self, device_id, models, threshold):
+        return {
+            'device_id': device_id,
+            'threshold': threshold,
+            'sensors': {col: models[col].forecast(threshold) for col in self.columns},
+        }
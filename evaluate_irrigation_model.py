@@ -0,0 +1,221 @@
+"""
+Evaluación continua del modelo de riego sobre todo el historial.
+
+Lee `sensor_data` (CSV o Supabase) por bloques, genera la etiqueta real con la
+regla de humedad 100 (la fila previa a un riego es `Regar`), puntúa cada bloque
+de forma vectorizada con los coeficientes de `IrrigationPredictor` y acumula:
+    - matriz de confusión
+    - bins de calibración (score medio vs. tasa real de riego por bin)
+    - exactitud por día
+
+Solo se guardan contadores, así que la memoria no crece con el historial
+(salvo una entrada por día evaluado). El resultado es un reporte JSON compacto.
+
+Uso:
+    python evaluate_irrigation_model.py --csv-path sensor_data_rows.csv
+    python evaluate_irrigation_model.py --source supabase --model irrigation_model.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from irrigation_predictor import DEFAULT_FEATURES, IrrigationPredictor, load_model_artifact
+from linear_regression_sensor_data import (
+    TIMESTAMP_COLUMN,
+    add_temporal_features,
+    iter_labeled_chunks,
+    iter_source_chunks,
+)
+from temporal_features import TemporalFeatureTracker
+
+# Columna con la etiqueta derivada de la regla (no se confunde con `prediccion` del CSV)
+TRUTH_COLUMN = "etiqueta_regla"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Evalúa el modelo de riego sobre todo el historial, por bloques."
+    )
+    parser.add_argument("--source", choices=("csv", "supabase"), default="csv",
+                        help="Origen de los datos (default: csv).")
+    parser.add_argument("--csv-path", type=Path, default=Path("sensor_data_rows.csv"),
+                        help="Ruta al CSV con los datos del sensor (default: sensor_data_rows.csv).")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="Filas por bloque al leer el CSV (default: 100000).")
+    parser.add_argument("--page-size", type=int, default=1000,
+                        help="Ids por página al leer de Supabase (default: 1000).")
+    parser.add_argument("--fetch-workers", type=int, default=4,
+                        help="Páginas de Supabase descargadas en paralelo (default: 4).")
+    parser.add_argument("--cache-dir", type=Path, default=Path(".supabase_cache"),
+                        help="Caché local de páginas de Supabase (default: .supabase_cache).")
+    parser.add_argument("--model", type=Path, default=None,
+                        help="Artefacto de modelo a evaluar (default: coeficientes de irrigation_predictor.py).")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Umbral de decisión (default: el del modelo).")
+    parser.add_argument("--bins", type=int, default=10,
+                        help="Bins de calibración entre score 0 y 1 (default: 10).")
+    parser.add_argument("--output", type=Path, default=Path("evaluation_report.json"),
+                        help="Reporte JSON (default: evaluation_report.json).")
+    return parser.parse_args()
+
+
+def day_numbers(timestamps: pd.Series) -> np.ndarray:
+    """
+    Día (desde 1970-01-01) de cada timestamp; NaN si no se puede interpretar
+
+    Un timestamp inválido solo queda fuera del reporte por día: no se usa la
+    cadencia fija de `_timestamp_seconds`, que inventaría fechas de 1970.
+    """
+    parsed = pd.to_datetime(timestamps, errors="coerce")
+    seconds = parsed.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    return np.where(parsed.isna().to_numpy(), np.nan, np.floor(seconds / 86400))
+
+
+class EvaluationAccumulator:
+    """Contadores de evaluación que se actualizan bloque a bloque"""
+
+    def __init__(self, threshold: float, n_bins: int) -> None:
+        self.threshold = threshold
+        self.n_bins = n_bins
+        self.confusion = np.zeros((2, 2), dtype=np.int64)   # [real, predicho]
+        self.squared_error = 0.0
+        self.bin_count = np.zeros(n_bins, dtype=np.int64)
+        self.bin_score = np.zeros(n_bins)
+        self.bin_positive = np.zeros(n_bins)
+        self.days: dict[int, list[int]] = {}
+
+    def update(self, scores: np.ndarray, y: np.ndarray, days: np.ndarray | None) -> None:
+        """`days` viene de `day_numbers` (las filas con NaN no cuentan por día)"""
+        predicted = (scores >= self.threshold).astype(np.int64)
+        actual = y.astype(np.int64)
+        self.confusion += np.bincount(actual * 2 + predicted, minlength=4).reshape(2, 2)
+        self.squared_error += float(np.sum((scores - y) ** 2))
+
+        # Scores fuera de [0, 1] caen en el primer o último bin
+        bins = np.clip((scores * self.n_bins).astype(np.int64), 0, self.n_bins - 1)
+        self.bin_count += np.bincount(bins, minlength=self.n_bins)
+        self.bin_score += np.bincount(bins, weights=scores, minlength=self.n_bins)
+        self.bin_positive += np.bincount(bins, weights=y, minlength=self.n_bins)
+
+        if days is not None:
+            valid = ~np.isnan(days)
+            unique_days, inverse = np.unique(days[valid].astype(np.int64), return_inverse=True)
+            rows = np.bincount(inverse, minlength=len(unique_days))
+            correct = np.bincount(inverse, weights=(predicted == actual)[valid], minlength=len(unique_days))
+            for day, n, c in zip(unique_days.tolist(), rows.tolist(), correct.tolist()):
+                entry = self.days.setdefault(day, [0, 0])
+                entry[0] += n
+                entry[1] += int(c)
+
+    def report(self) -> dict:
+        (tn, fp), (fn, tp) = self.confusion.tolist()
+        total = tn + fp + fn + tp
+        precision = tp / (tp + fp) if tp + fp else None
+        recall = tp / (tp + fn) if tp + fn else None
+        f1 = 2 * tp / (2 * tp + fp + fn) if tp + fp + fn else None
+        calibration = [
+            {
+                "bin": [i / self.n_bins, (i + 1) / self.n_bins],
+                "rows": int(self.bin_count[i]),
+                "mean_score": round(float(self.bin_score[i] / self.bin_count[i]), 4),
+                "positive_rate": round(float(self.bin_positive[i] / self.bin_count[i]), 4),
+            }
+            for i in range(self.n_bins)
+            if self.bin_count[i]
+        ]
+        per_day = [
+            {
+                "date": str(np.datetime64(day, "D")),
+                "rows": rows,
+                "accuracy": round(correct / rows, 4),
+            }
+            for day, (rows, correct) in sorted(self.days.items())
+        ]
+        return {
+            "rows": total,
+            "threshold": self.threshold,
+            "confusion_matrix": {"tn": tn, "fp": fp, "fn": fn, "tp": tp},
+            "accuracy": (tn + tp) / total if total else None,
+            "precision": precision,
+            "recall": recall,
+            "f1": f1,
+            "mse": self.squared_error / total if total else None,
+            "calibration": calibration,
+            "per_day": per_day,
+        }
+
+
+def main() -> None:
+    args = parse_args()
+    try:
+        if args.model:
+            artifact = load_model_artifact(args.model)
+            predictor = IrrigationPredictor.from_artifact(artifact)
+        else:
+            predictor = IrrigationPredictor()
+    except (OSError, ValueError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    temporal_names = list(predictor.temporal_coefficients)
+    weights = np.array(predictor.coefficients + [predictor.temporal_coefficients[n] for n in temporal_names])
+    columns = list(DEFAULT_FEATURES) + temporal_names
+    threshold = args.threshold if args.threshold is not None else predictor.threshold
+    accumulator = EvaluationAccumulator(threshold, args.bins)
+    tracker = TemporalFeatureTracker() if temporal_names else None
+
+    # Columnas que piden iter_source_chunks / _supabase_columns
+    args.features = list(DEFAULT_FEATURES)
+    args.prediction_column = TRUTH_COLUMN
+    args.temporal_features = bool(temporal_names)
+
+    try:
+        for chunk in iter_labeled_chunks(iter_source_chunks(args), TRUTH_COLUMN):
+            if tracker is not None:
+                chunk = add_temporal_features(chunk, tracker)
+            subset = chunk[columns + [TRUTH_COLUMN]].dropna()
+            if subset.empty:
+                continue
+            X = subset[columns].to_numpy(dtype=float)
+            y = (subset[TRUTH_COLUMN] == "Regar").to_numpy(dtype=float)
+            scores = X @ weights + predictor.intercept
+
+            days = None
+            if TIMESTAMP_COLUMN in chunk.columns:
+                days = day_numbers(chunk.loc[subset.index, TIMESTAMP_COLUMN])
+            accumulator.update(scores, y, days)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    report = {"model_version": predictor.version, "features": columns, **accumulator.report()}
+    with args.output.open("w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, ensure_ascii=False)
+
+    if not report["rows"]:
+        print("No hay filas con todas las características para evaluar.")
+        return
+
+    cm = report["confusion_matrix"]
+    print("=== Evaluación del modelo de riego ===")
+    print(f"Modelo: {predictor.version} | umbral: {threshold}")
+    print(f"Filas evaluadas: {report['rows']}")
+    print(f"Exactitud: {report['accuracy']:.4f} | MSE: {report['mse']:.4f}")
+    if report["f1"] is not None:
+        precision = report["precision"] if report["precision"] is not None else float("nan")
+        recall = report["recall"] if report["recall"] is not None else float("nan")
+        print(f"Precisión: {precision:.4f} | Recall: {recall:.4f} | F1: {report['f1']:.4f}")
+    print(f"Matriz de confusión: TN={cm['tn']} FP={cm['fp']} FN={cm['fn']} TP={cm['tp']}")
+    print(f"Días evaluados: {len(report['per_day'])}")
+    print(f"Reporte guardado en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,11 @@ Módulo ligero para hacer predicciones de riego usando regresión lineal
 Versión optimizada sin dependencias pesadas para Vercel
 """
 
+import json
+import os
+from collections import namedtuple
+from datetime import datetime
+
 # Coeficientes del modelo entrenado (extraídos del último entrenamiento)
 MODEL_COEFFICIENTS = {
     'intercept': 0.0267,
@@ -13,22 +18,168 @@ MODEL_COEFFICIENTS = {
     'soil_moisture2': -0.0309
 }
 
+# Coeficientes de las características temporales (ver temporal_features.py).
+# Vacío mientras el modelo en producción no se entrene con --temporal-features.
+TEMPORAL_COEFFICIENTS = {}
+
 DEFAULT_FEATURES = ['uv_index', 'temperature2', 'humidity2', 'soil_moisture1', 'soil_moisture2']
 THRESHOLD = 0.5
 
+# Sensores de humedad de suelo y valor que indica que se acaba de regar
+SOIL_COLUMNS = ('soil_moisture1', 'soil_moisture2')
+IRRIGATION_MOISTURE = 100.0
+# Identificador usado cuando el ESP32 no envía `device_id` (firmware actual)
+DEFAULT_DEVICE_ID = 'esp32'
+# Límite de dispositivos con estado en memoria en cada tracker (LRU): el
+# `device_id` lo envía el cliente
+MAX_TRACKED_DEVICES = int(os.getenv('MAX_TRACKED_DEVICES', '10000'))
+
+
+def is_irrigation_reading(reading):
+    """
+    True si algún sensor de suelo de la lectura vale IRRIGATION_MOISTURE
+
+    Es la regla de etiquetado: la lectura anterior del mismo dispositivo es
+    `Regar`. La usan el modelo en línea y la evaluación en sombra;
+    `ensure_labels` aplica la misma regla vectorizada al entrenar.
+    """
+    return any(reading.get(col) == IRRIGATION_MOISTURE for col in SOIL_COLUMNS)
+
+# Resultado compacto de la ruta rápida (tupla inmutable, sin __dict__ por instancia)
+PredictionResult = namedtuple('PredictionResult', ['prediction', 'score', 'confidence', 'threshold'])
+
 class IrrigationPredictor:
     """Clase ligera para predecir si se debe regar o no (sin dependencias pesadas)"""
     
-    def __init__(self):
-        self.coefficients = [
-            MODEL_COEFFICIENTS['uv_index'],
-            MODEL_COEFFICIENTS['temperature2'],
-            MODEL_COEFFICIENTS['humidity2'],
-            MODEL_COEFFICIENTS['soil_moisture1'],
-            MODEL_COEFFICIENTS['soil_moisture2']
-        ]
-        self.intercept = MODEL_COEFFICIENTS['intercept']
-        self.threshold = THRESHOLD
+    def __init__(self, coefficients=None, intercept=None, threshold=None, version=None, reference=None):
+        """
+        Args:
+            coefficients: dict característica -> coeficiente (sobre valores sin escalar).
+                Las características de DEFAULT_FEATURES que falten valen 0 y las de
+                TEMPORAL_COEFFICIENTS se usan en predict_with_temporal.
+                Por defecto, MODEL_COEFFICIENTS.
+            intercept: intercepto (por defecto el de MODEL_COEFFICIENTS)
+            threshold: umbral de decisión (por defecto THRESHOLD)
+            version: identificador del modelo (informativo)
+            reference: histogramas de las características de entrenamiento
+                (para drift_monitor.py), o None
+        """
+        if coefficients is None:
+            coefficients = MODEL_COEFFICIENTS
+            temporal = TEMPORAL_COEFFICIENTS
+        else:
+            temporal = {name: coef for name, coef in coefficients.items()
+                        if name not in DEFAULT_FEATURES and name != 'intercept'}
+        if intercept is None:
+            intercept = coefficients.get('intercept', 0.0)
+        self.coefficients = [float(coefficients.get(name, 0.0)) for name in DEFAULT_FEATURES]
+        self.intercept = float(intercept)
+        self.threshold = float(threshold) if threshold is not None else THRESHOLD
+        self.version = version or 'default'
+        self.reference = reference
+        # Coeficientes desempaquetados para la ruta rápida (evita indexar la lista)
+        (self._w_uv, self._w_temp, self._w_hum,
+         self._w_soil1, self._w_soil2) = self.coefficients
+        self.temporal_coefficients = {name: float(coef) for name, coef in temporal.items()}
+    
+    @classmethod
+    def from_artifact(cls, artifact):
+        """Crea un predictor desde un artefacto de modelo (dict de load_model_artifact)"""
+        return cls(
+            coefficients=artifact['coefficients'],
+            intercept=artifact['intercept'],
+            threshold=artifact.get('threshold'),
+            version=artifact.get('version'),
+            reference=artifact.get('reference')
+        )
+    
+    def predict_fast(self, uv_index, temperature2, humidity2, soil_moisture1, soil_moisture2):
+        """
+        Ruta rápida de predicción: sin listas temporales ni diccionarios
+        
+        Espera valores numéricos (int/float). A diferencia de `predict`, no
+        convierte con float() ni captura errores: un valor inválido lanza
+        TypeError.
+        
+        Returns:
+            PredictionResult: (prediction, score, confidence, threshold), con
+            la confianza sin redondear
+        """
+        score = (self.intercept
+                 + self._w_uv * uv_index
+                 + self._w_temp * temperature2
+                 + self._w_hum * humidity2
+                 + self._w_soil1 * soil_moisture1
+                 + self._w_soil2 * soil_moisture2)
+        return self._result_from_score(score)
+    
+    def _result_from_score(self, score):
+        """Convierte un score continuo en PredictionResult"""
+        threshold = self.threshold
+        if score >= threshold:
+            confidence = (1.0 - (score - threshold)) * 100.0
+            prediction = "Regar"
+        else:
+            confidence = (1.0 - (threshold - score)) * 100.0
+            prediction = "No regar"
+        if not confidence >= 0.0:  # también cubre NaN
+            confidence = 0.0
+        return PredictionResult(prediction, score, confidence, threshold)
+    
+    def predict_with_temporal(self, sensor_data, temporal_features):
+        """
+        Predicción con las características instantáneas más las temporales
+        
+        Args:
+            sensor_data: dict con las lecturas actuales
+            temporal_features: dict de TemporalFeatureTracker (pendiente, EWMA, mín/máx)
+        
+        Returns:
+            PredictionResult
+        """
+        get = sensor_data.get
+        score = (self.intercept
+                 + self._w_uv * get('uv_index', 0)
+                 + self._w_temp * get('temperature2', 0)
+                 + self._w_hum * get('humidity2', 0)
+                 + self._w_soil1 * get('soil_moisture1', 0)
+                 + self._w_soil2 * get('soil_moisture2', 0))
+        if temporal_features:
+            for name, coef in self.temporal_coefficients.items():
+                score += coef * temporal_features.get(name, 0.0)
+        return self._result_from_score(score)
+    
+    def predict_fast_from_dict(self, sensor_data):
+        """Ruta rápida desde un diccionario con los datos del sensor"""
+        get = sensor_data.get
+        return self.predict_fast(
+            get('uv_index', 0),
+            get('temperature2', 0),
+            get('humidity2', 0),
+            get('soil_moisture1', 0),
+            get('soil_moisture2', 0)
+        )
+    
+    def predict_batch(self, rows):
+        """
+        Predice una secuencia de diccionarios con la ruta rápida
+        
+        Returns:
+            list: un PredictionResult por fila
+        """
+        predict_fast = self.predict_fast
+        results = []
+        append = results.append
+        for row in rows:
+            get = row.get
+            append(predict_fast(
+                get('uv_index', 0),
+                get('temperature2', 0),
+                get('humidity2', 0),
+                get('soil_moisture1', 0),
+                get('soil_moisture2', 0)
+            ))
+        return results
     
     def predict(self, uv_index, temperature2, humidity2, soil_moisture1, soil_moisture2):
         """
@@ -49,35 +200,21 @@ class IrrigationPredictor:
             }
         """
         try:
-            # Convertir a float
-            values = [
+            # y = intercept + coef1*x1 + coef2*x2 + ... (misma cuenta que la ruta rápida)
+            result = self.predict_fast(
                 float(uv_index),
                 float(temperature2),
                 float(humidity2),
                 float(soil_moisture1),
                 float(soil_moisture2)
-            ]
-            
-            # Calcular el score usando la fórmula: y = intercept + coef1*x1 + coef2*x2 + ...
-            # Esto es equivalente a: score = intercept + sum(coef[i] * values[i] for i in range(5))
-            score = self.intercept
-            for i in range(len(self.coefficients)):
-                score += self.coefficients[i] * values[i]
-            
-            # Determinar si se debe regar
-            prediction = "Regar" if score >= self.threshold else "No regar"
-            
-            # Calcular confianza (distancia al umbral)
-            # Normalizar la distancia: cuanto más lejos del umbral, menos confianza
-            distance_from_threshold = abs(score - self.threshold)
-            # Convertir distancia a porcentaje de confianza (máximo 100%)
-            confidence = min(100.0, max(0.0, (1.0 - distance_from_threshold) * 100.0))
+            )
             
+            # Confianza: distancia al umbral convertida a porcentaje (máximo 100%)
             return {
-                'prediction': prediction,
-                'score': float(score),
-                'confidence': round(confidence, 2),
-                'threshold': self.threshold
+                'prediction': result.prediction,
+                'score': float(result.score),
+                'confidence': round(result.confidence, 2),
+                'threshold': result.threshold
             }
         except (ValueError, TypeError) as e:
             return {
@@ -113,12 +250,66 @@ class IrrigationPredictor:
             sensor_data.get('soil_moisture2', 0)
         )
 
+def save_model_artifact(path, features, coefficients, intercept, threshold, metrics=None, **extra):
+    """
+    Guarda un modelo entrenado como JSON (formato que lee load_model_artifact)
+    
+    Args:
+        path: archivo de salida
+        features: lista de características usadas
+        coefficients: coeficientes sobre valores sin escalar, en el orden de `features`
+        intercept: intercepto sobre valores sin escalar
+        threshold: umbral de decisión
+        metrics: dict opcional con métricas de validación
+        **extra: campos adicionales a guardar tal cual
+    
+    Returns:
+        dict: el artefacto guardado
+    """
+    artifact = {
+        'version': datetime.now().strftime('%Y%m%d%H%M%S'),
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'features': list(features),
+        'intercept': float(intercept),
+        'coefficients': {name: float(coef) for name, coef in zip(features, coefficients)},
+        'threshold': float(threshold),
+        'metrics': metrics or {}
+    }
+    artifact.update(extra)
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(artifact, fh, indent=2, ensure_ascii=False)
+    return artifact
+
+def load_model_artifact(path):
+    """
+    Lee un artefacto de modelo guardado con save_model_artifact
+    
+    Raises:
+        ValueError: si faltan campos obligatorios
+    """
+    with open(path, encoding='utf-8') as fh:
+        artifact = json.load(fh)
+    missing = [key for key in ('features', 'intercept', 'coefficients') if key not in artifact]
+    if missing:
+        raise ValueError(f"Artefacto de modelo inválido, faltan: {', '.join(missing)}")
+    return artifact
+
 # Instancia global del predictor
 _predictor_instance = None
 
 def get_predictor():
-    """Obtiene la instancia global del predictor"""
+    """
+    Obtiene la instancia global del predictor
+    
+    Si la variable de entorno IRRIGATION_MODEL_PATH apunta a un artefacto de
+    modelo (p. ej. el generado por tune_irrigation_model.py) se usan sus
+    coeficientes y umbral; si no, los coeficientes por defecto.
+    """
     global _predictor_instance
     if _predictor_instance is None:
-        _predictor_instance = IrrigationPredictor()
+        model_path = os.getenv('IRRIGATION_MODEL_PATH')
+        if model_path and os.path.exists(model_path):
+            _predictor_instance = IrrigationPredictor.from_artifact(load_model_artifact(model_path))
+        else:
+            _predictor_instance = IrrigationPredictor()
     return _predictor_instance
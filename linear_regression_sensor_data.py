@@ -11,23 +11,46 @@ El modelo utiliza cinco características por defecto:
 
 La columna objetivo (`prediccion`) se puede proporcionar en el CSV o generar
 automáticamente aplicando la misma regla que en `tagging_watering_prediction.py`.
+
+Con `--streaming` el CSV se lee por bloques y solo se acumulan XᵀX, Xᵀy y la
+media/varianza de cada característica, así que la memoria no crece con el
+historial; los coeficientes son los mismos que daría el pipeline en memoria.
+`--save-model` y `--per-device-models` también funcionan en este modo: los
+histogramas de referencia salen de una muestra uniforme de tamaño fijo.
+
+Con `--source supabase` los datos se leen directamente de la tabla
+`sensor_data` (paginada por id, en paralelo y con caché local de páginas) en
+lugar de un CSV exportado a mano.
+
+El CSV se lee solo con las columnas necesarias y tipos explícitos (motor
+pyarrow si está instalado). El resultado ya parseado queda en
+`--dataset-cache-dir` como matriz `.npy` que se abre con memory-map, así que
+las ejecuciones siguientes sobre el mismo archivo no vuelven a parsearlo.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import itertools
+import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Iterable, Iterator, List, Sequence
 
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LinearRegression
+from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 
+from irrigation_predictor import DEFAULT_DEVICE_ID, IRRIGATION_MOISTURE, SOIL_COLUMNS, save_model_artifact
+from temporal_features import TEMPORAL_FEATURES, TemporalFeatureTracker
+
 DEFAULT_FEATURES: Sequence[str] = (
     "uv_index",
     "temperature2",
@@ -36,6 +59,23 @@ DEFAULT_FEATURES: Sequence[str] = (
     "soil_moisture2",
 )
 PREDICTION_COLUMN = "prediccion"
+DEVICE_COLUMN = "device_id"
+TIMESTAMP_COLUMN = "timestamp"
+ID_COLUMN = "id"
+# Número de fila global que se agrega en modo streaming si el CSV no tiene `id`
+ROW_NUMBER_COLUMN = "_row_number"
+# Cadencia de envío del ESP32; se usa si el CSV no trae timestamps válidos
+DEFAULT_INTERVAL_SECONDS = 300
+# Columnas de texto; el resto se lee como float64
+TEXT_COLUMNS = (DEVICE_COLUMN, PREDICTION_COLUMN)
+# Bytes leídos del inicio y del final del CSV para detectar cambios
+SIGNATURE_BLOCK_BYTES = 1 << 20
+# Bins por característica de los histogramas de referencia (monitor de deriva)
+REFERENCE_BINS = 10
+# Filas muestreadas en modo --streaming para los histogramas de referencia
+# (global y por grupo de --per-device-models)
+REFERENCE_SAMPLE_SIZE = 50_000
+GROUP_REFERENCE_SAMPLE_SIZE = 2_000
 LABEL_MAP = {"No regar": 0.0, "Regar": 1.0}
 REVERSE_LABEL_MAP = {0.0: "No regar", 1.0: "Regar"}
 
@@ -47,12 +87,35 @@ def parse_args() -> argparse.Namespace:
             "acciones de riego basadas en lecturas de sensores."
         )
     )
+    parser.add_argument(
+        "--source",
+        choices=("csv", "supabase"),
+        default="csv",
+        help=(
+            "Origen de los datos: el CSV exportado o la tabla `sensor_data` de "
+            "Supabase paginada por id (default: csv)."
+        ),
+    )
     parser.add_argument(
         "--csv-path",
         type=Path,
         default=Path("sensor_data_rows.csv"),
         help="Ruta al archivo CSV con los datos del sensor (default: sensor_data_rows.csv).",
     )
+    parser.add_argument(
+        "--dataset-cache-dir",
+        type=Path,
+        default=Path(".dataset_cache"),
+        help=(
+            "Carpeta donde se guarda el CSV ya parseado (matriz .npy); se reutiliza "
+            "mientras el archivo no cambie (default: .dataset_cache)."
+        ),
+    )
+    parser.add_argument(
+        "--no-dataset-cache",
+        action="store_true",
+        help="Parsea siempre el CSV sin usar ni escribir la caché.",
+    )
     parser.add_argument(
         "--features",
         nargs="+",
@@ -75,6 +138,14 @@ def parse_args() -> argparse.Namespace:
             "en la fila previa a cuando soil_moisture1 o soil_moisture2 valen 100."
         ),
     )
+    parser.add_argument(
+        "--temporal-features",
+        action="store_true",
+        help=(
+            "Agrega características temporales por dispositivo (pendiente, EWMA, "
+            "mín/máx de soil_moisture1/2 en la ventana reciente)."
+        ),
+    )
     parser.add_argument(
         "--test-size",
         type=float,
@@ -93,6 +164,79 @@ def parse_args() -> argparse.Namespace:
         default=0.5,
         help="Umbral para convertir la predicción continua en `Regar`/`No regar` (default: 0.5).",
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help=(
+            "Entrena leyendo el CSV por bloques y acumulando XᵀX/Xᵀy (memoria "
+            "constante). La partición train/test se hace por hash de cada fila."
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Filas por bloque en modo --streaming (default: 100000).",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=1000,
+        help="Ids por página al leer de Supabase (default: 1000).",
+    )
+    parser.add_argument(
+        "--fetch-workers",
+        type=int,
+        default=4,
+        help="Páginas de Supabase descargadas en paralelo (default: 4).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=Path(".supabase_cache"),
+        help=(
+            "Carpeta donde se guardan las páginas ya descargadas de Supabase; "
+            "las siguientes ejecuciones solo piden las filas nuevas (default: .supabase_cache)."
+        ),
+    )
+    parser.add_argument(
+        "--save-model",
+        type=Path,
+        default=None,
+        help=(
+            "Guarda el modelo entrenado como artefacto JSON (coeficientes, umbral, "
+            "métricas e histogramas de referencia para el monitor de deriva)."
+        ),
+    )
+    parser.add_argument(
+        "--per-device-models",
+        type=Path,
+        default=None,
+        help=(
+            "Carpeta donde guardar un modelo por dispositivo (o por --group-column), "
+            "entrenados en paralelo; el servidor los lee con IRRIGATION_MODELS_DIR."
+        ),
+    )
+    parser.add_argument(
+        "--group-column",
+        default=DEVICE_COLUMN,
+        help=(
+            "Columna que agrupa las filas para --per-device-models, p. ej. una zona "
+            "(default: device_id)."
+        ),
+    )
+    parser.add_argument(
+        "--min-group-rows",
+        type=int,
+        default=100,
+        help="Filas mínimas para entrenar el modelo de un grupo (default: 100).",
+    )
+    parser.add_argument(
+        "--model-workers",
+        type=int,
+        default=None,
+        help="Procesos para entrenar los modelos por grupo (default: número de CPUs).",
+    )
     parser.add_argument(
         "--save-predictions",
         type=Path,
@@ -105,11 +249,136 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def load_dataset(csv_path: Path) -> pd.DataFrame:
+def _csv_engine() -> str:
+    """`pyarrow` (lectura multihilo) si está instalado; si no, el motor C de pandas"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "c"
+    return "pyarrow"
+
+
+def _csv_read_options(
+    csv_path: Path, columns: Sequence[str] | None, text_columns: Sequence[str] = TEXT_COLUMNS
+) -> dict:
+    """
+    `usecols` y `dtype` para `pd.read_csv`: solo las columnas pedidas que
+    existan en el encabezado, con tipos explícitos para no inferirlos
+    """
+    if columns is None:
+        return {}
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = [col for col in header if col in set(columns)]
+    dtype = {
+        col: (str if col in text_columns else "float64")
+        for col in usecols
+        if col != TIMESTAMP_COLUMN
+    }
+    return {"usecols": usecols, "dtype": dtype}
+
+
+def _file_signature(csv_path: Path) -> dict:
+    """Tamaño, mtime y hash del inicio y final del archivo (invalida la caché)"""
+    stat = csv_path.stat()
+    digest = hashlib.sha1()
+    with csv_path.open("rb") as fh:
+        digest.update(fh.read(SIGNATURE_BLOCK_BYTES))
+        if stat.st_size > SIGNATURE_BLOCK_BYTES:
+            fh.seek(max(SIGNATURE_BLOCK_BYTES, stat.st_size - SIGNATURE_BLOCK_BYTES))
+            digest.update(fh.read())
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+
+def _encode_frame(df: pd.DataFrame) -> tuple[np.ndarray, dict]:
+    """
+    Codifica el DataFrame en una matriz float64 (una columna por columna):
+    lo que no es numérico (texto y timestamps tal como vienen del CSV) como
+    códigos de categoría, con NaN para los vacíos
+    """
+    matrix = np.empty((len(df), len(df.columns)), dtype=np.float64, order="F")
+    categories = {}
+    for j, col in enumerate(df.columns):
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            codes, uniques = pd.factorize(df[col])
+            matrix[:, j] = np.where(codes < 0, np.nan, codes)
+            categories[col] = [v.item() if hasattr(v, "item") else v for v in uniques]
+        else:
+            matrix[:, j] = df[col].to_numpy(dtype=np.float64)
+    return matrix, categories
+
+
+def _decode_frame(
+    matrix: np.ndarray, columns: List[str], categories: dict, dtypes: dict
+) -> pd.DataFrame:
+    """Inversa de `_encode_frame`: mismas columnas y mismos dtypes que `pd.read_csv`"""
+    data = {}
+    for j, col in enumerate(columns):
+        values = matrix[:, j]
+        if col in categories:
+            lookup = np.array(categories[col] + [np.nan], dtype=object)
+            codes = np.where(np.isnan(values), -1, values).astype(np.int64)
+            values = lookup[codes]
+        data[col] = pd.Series(values, copy=False).astype(pd.api.types.pandas_dtype(dtypes[col]))
+    return pd.DataFrame(data, columns=columns)
+
+
+def load_dataset(
+    csv_path: Path,
+    columns: Sequence[str] | None = None,
+    cache_dir: Path | None = None,
+    text_columns: Sequence[str] = TEXT_COLUMNS,
+) -> pd.DataFrame:
+    """
+    Lee el CSV con solo las columnas `columns` y tipos explícitos (float64,
+    salvo `text_columns`)
+
+    Con `cache_dir`, el resultado se guarda como una matriz `.npy` (más sus
+    metadatos) y las siguientes ejecuciones la abren con memory-map en lugar de
+    volver a parsear el CSV, mientras el archivo no cambie (tamaño, mtime y hash).
+    El DataFrame devuelto es una copia en memoria con los mismos dtypes que la
+    lectura sin caché; el memory-map solo evita tener la matriz y el DataFrame
+    a la vez en memoria.
+    """
     if not csv_path.exists():
         raise FileNotFoundError(f"No se encontró el archivo CSV en {csv_path!s}")
 
-    return pd.read_csv(csv_path)
+    read_options = _csv_read_options(csv_path, columns, text_columns)
+    if cache_dir is None:
+        return pd.read_csv(csv_path, engine=_csv_engine(), **read_options)
+
+    key = hashlib.sha1(
+        f"{csv_path.resolve()}|{','.join(columns or ['*'])}".encode()
+    ).hexdigest()[:12]
+    matrix_path = cache_dir / f"{key}.npy"
+    meta_path = cache_dir / f"{key}.json"
+    signature = _file_signature(csv_path)
+
+    if matrix_path.exists() and meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("signature") == signature and "dtypes" in meta:
+            matrix = np.load(matrix_path, mmap_mode="r")
+            return _decode_frame(matrix, meta["columns"], meta["categories"], meta["dtypes"])
+
+    df = pd.read_csv(csv_path, engine=_csv_engine(), **read_options)
+    matrix, categories = _encode_frame(df)
+    dtypes = {col: str(dtype) for col, dtype in df.dtypes.items()}
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: una ejecución interrumpida no deja una caché a medias
+    tmp_matrix = matrix_path.with_suffix(".npy.tmp")
+    with tmp_matrix.open("wb") as fh:
+        np.save(fh, matrix)
+    os.replace(tmp_matrix, matrix_path)
+    tmp_meta = meta_path.with_suffix(".json.tmp")
+    tmp_meta.write_text(
+        json.dumps(
+            {"signature": signature, "columns": list(df.columns), "categories": categories, "dtypes": dtypes}
+        ),
+        encoding="utf-8",
+    )
+    os.replace(tmp_meta, meta_path)
+
+    return _decode_frame(matrix, list(df.columns), categories, dtypes)
 
 
 def ensure_labels(df: pd.DataFrame, label_column: str) -> pd.DataFrame:
@@ -126,23 +395,97 @@ def ensure_labels(df: pd.DataFrame, label_column: str) -> pd.DataFrame:
         return df_copy
 
     df_copy = df.copy()
-    df_copy[label_column] = "No regar"
+    n_rows = len(df_copy)
 
-    soil_cols = ["soil_moisture1", "soil_moisture2"]
-    for idx in range(1, len(df_copy)):
-        if any(_is_moisture_hundred(df_copy.iloc[idx].get(col)) for col in soil_cols):
-            df_copy.at[idx - 1, label_column] = "Regar"
+    # Filas donde algún sensor de suelo vale exactamente 100 (misma regla que
+    # irrigation_predictor.is_irrigation_reading, vectorizada)
+    hit = np.zeros(n_rows, dtype=bool)
+    for col in SOIL_COLUMNS:
+        if col in df_copy.columns:
+            hit |= pd.to_numeric(df_copy[col], errors="coerce").to_numpy(dtype=float) == IRRIGATION_MOISTURE
 
+    # En orden (dispositivo, timestamp), la fila previa a un 100 se marca `Regar`,
+    # siempre que ambas filas sean del mismo dispositivo
+    order, device_codes, _ = _temporal_order(df_copy)
+    sorted_hit = hit[order]
+    sorted_devices = device_codes[order]
+    regar_sorted = np.zeros(n_rows, dtype=bool)
+    if n_rows > 1:
+        regar_sorted[:-1] = sorted_hit[1:] & (sorted_devices[:-1] == sorted_devices[1:])
+    regar = np.empty(n_rows, dtype=bool)
+    regar[order] = regar_sorted
+
+    df_copy[label_column] = np.where(regar, "Regar", "No regar")
     return df_copy
 
 
-def _is_moisture_hundred(value: object) -> bool:
-    if pd.isna(value):
-        return False
-    try:
-        return float(value) == 100.0
-    except (TypeError, ValueError):
-        return False
+def _timestamp_seconds(df: pd.DataFrame) -> np.ndarray:
+    """Segundos epoch de cada fila, o una cadencia fija si no hay timestamps válidos"""
+    if TIMESTAMP_COLUMN in df.columns:
+        parsed = pd.to_datetime(df[TIMESTAMP_COLUMN], errors="coerce")
+        if parsed.notna().all():
+            return parsed.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    return np.arange(len(df), dtype=float) * DEFAULT_INTERVAL_SECONDS
+
+
+def _temporal_order(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Orden estable de las filas por (dispositivo, timestamp)
+
+    Returns:
+        (posiciones ordenadas, código de dispositivo por fila, segundos por fila)
+    """
+    seconds = _timestamp_seconds(df)
+    device_codes, _ = pd.factorize(_device_ids(df))
+    return np.lexsort((seconds, device_codes)), device_codes, seconds
+
+
+def _device_ids(df: pd.DataFrame) -> np.ndarray:
+    """
+    Dispositivo de cada fila como lo identifica el servidor
+
+    Las lecturas sin `device_id` (NULL en Supabase, vacío en el CSV) son las que
+    el servidor registró con `DEFAULT_DEVICE_ID`, así que se agrupan con él.
+    """
+    if DEVICE_COLUMN not in df.columns:
+        return np.full(len(df), DEFAULT_DEVICE_ID, dtype=object)
+    return df[DEVICE_COLUMN].astype(object).where(df[DEVICE_COLUMN].notna(), DEFAULT_DEVICE_ID).to_numpy()
+
+
+def add_temporal_features(
+    df: pd.DataFrame, tracker: TemporalFeatureTracker | None = None
+) -> pd.DataFrame:
+    """
+    Agrega las columnas de `TEMPORAL_FEATURES` reproduciendo el historial de
+    cada dispositivo en orden temporal con el mismo `TemporalFeatureTracker`
+    que usa el servidor, para que entrenamiento e inferencia coincidan.
+
+    Al procesar por bloques se pasa el mismo `tracker` a cada bloque para que
+    las ventanas continúen entre bloques.
+    """
+    df_copy = df.copy()
+    order, _, seconds = _temporal_order(df_copy)
+    devices = _device_ids(df_copy)
+
+    if "soil_moisture1" not in df_copy.columns or "soil_moisture2" not in df_copy.columns:
+        raise ValueError("Se requieren soil_moisture1 y soil_moisture2 para las características temporales.")
+    soil1 = pd.to_numeric(df_copy["soil_moisture1"], errors="coerce").to_numpy(dtype=float)
+    soil2 = pd.to_numeric(df_copy["soil_moisture2"], errors="coerce").to_numpy(dtype=float)
+
+    if tracker is None:
+        tracker = TemporalFeatureTracker()
+    values = np.zeros((len(df_copy), len(TEMPORAL_FEATURES)))
+    for pos in order:
+        features = tracker.update(
+            devices[pos],
+            seconds[pos],
+            {"soil_moisture1": soil1[pos], "soil_moisture2": soil2[pos]},
+        )
+        values[pos] = [features[name] for name in TEMPORAL_FEATURES]
+
+    for i, name in enumerate(TEMPORAL_FEATURES):
+        df_copy[name] = values[:, i]
+    return df_copy
 
 
 def validate_features(df: pd.DataFrame, features: Iterable[str]) -> List[str]:
@@ -162,6 +505,19 @@ def prepare_training_data(
     if subset.empty:
         raise ValueError("No quedan filas después de eliminar NaN en características/etiquetas.")
 
+    X, y, subset = _extract_xy(subset, features, label_column)
+    if len(np.unique(y)) < 2:
+        raise ValueError(
+            "Se requiere al menos dos clases (`Regar` y `No regar`) para entrenar el modelo."
+        )
+    return X, y, subset
+
+
+def _extract_xy(
+    subset: pd.DataFrame, features: List[str], label_column: str
+) -> tuple[np.ndarray, np.ndarray, pd.DataFrame]:
+    """Normaliza etiquetas y convierte a matrices (sin exigir ambas clases, para bloques)"""
+
     # Normalize labels to "Regar" or "No regar"
     subset = subset.copy()
     subset[label_column] = subset[label_column].str.strip().str.capitalize()
@@ -181,33 +537,665 @@ def prepare_training_data(
             + ", ".join(map(str, invalid_values))
         )
 
-    if y.nunique() < 2:
-        raise ValueError(
-            "Se requiere al menos dos clases (`Regar` y `No regar`) para entrenar el modelo."
-        )
-
     X = subset[features].to_numpy(dtype=float)
     return X, y.to_numpy(dtype=float), subset
 
 
-def build_pipeline() -> Pipeline:
+def build_pipeline(alpha: float = 0.0) -> Pipeline:
+    """Pipeline de escalado + regresión lineal (Ridge si `alpha` > 0)"""
+    regressor = Ridge(alpha=alpha) if alpha > 0 else LinearRegression()
     return Pipeline(
         steps=[
             ("scaler", StandardScaler()),
-            ("regressor", LinearRegression()),
+            ("regressor", regressor),
         ]
     )
 
 
+def reference_histograms(
+    X: np.ndarray, features: List[str], n_bins: int = REFERENCE_BINS
+) -> dict:
+    """
+    Histogramas de referencia de las características de entrenamiento
+
+    Los cortes son cuantiles, así que cada bin tiene ~1/n_bins de las filas
+    (menos si hay valores repetidos). El servidor compara contra ellos las
+    lecturas en vivo (ver drift_monitor.py). Solo se incluyen las características
+    que el servidor recibe directamente (DEFAULT_FEATURES).
+    """
+    reference = {}
+    for j, name in enumerate(features):
+        if name not in DEFAULT_FEATURES:
+            continue
+        column = X[:, j]
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, column, side="right"), minlength=len(edges) + 1)
+        reference[name] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+        }
+    return reference
+
+
+def raw_coefficients(model: Pipeline) -> tuple[np.ndarray, float]:
+    """
+    Convierte los coeficientes del pipeline (sobre datos escalados) a
+    coeficientes sobre las lecturas sin escalar, como los usa IrrigationPredictor
+    """
+    scaler = model.named_steps["scaler"]
+    regressor = model.named_steps["regressor"]
+    coef = regressor.coef_ / scaler.scale_
+    intercept = float(regressor.intercept_ - coef @ scaler.mean_)
+    return coef, intercept
+
+
+class SufficientStatistics:
+    """
+    Estadísticas suficientes de una regresión lineal acumuladas por bloques:
+    XᵀX y Xᵀy (con columna de unos para el intercepto), Σy, Σy² y la media y
+    varianza de cada característica (combinación de Chan).
+
+    Las X se desplazan por la media del primer bloque antes de acumular, lo que
+    mejora mucho el condicionamiento de XᵀX sin cambiar la solución.
+    """
+
+    def __init__(self, n_features: int) -> None:
+        self.n_features = n_features
+        self.count = 0
+        self.shift: np.ndarray | None = None
+        self.xtx = np.zeros((n_features + 1, n_features + 1))
+        self.xty = np.zeros(n_features + 1)
+        self.sum_y = 0.0
+        self.sum_yy = 0.0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def update(self, X: np.ndarray, y: np.ndarray) -> None:
+        n_batch = len(X)
+        if n_batch == 0:
+            return
+        if self.shift is None:
+            self.shift = X.mean(axis=0)
+
+        Xa = np.empty((n_batch, self.n_features + 1))
+        Xa[:, 0] = 1.0
+        Xa[:, 1:] = X - self.shift
+        self.xtx += Xa.T @ Xa
+        self.xty += Xa.T @ y
+        self.sum_y += float(y.sum())
+        self.sum_yy += float(y @ y)
+
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n_batch
+        delta = batch_mean - self.mean
+        self.mean += delta * n_batch / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n_batch / total
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        """Desviación estándar poblacional (ddof=0, igual que StandardScaler)"""
+        std = np.sqrt(self.m2 / max(self.count, 1))
+        return np.where(std == 0.0, 1.0, std)
+
+    def solve(self) -> tuple[np.ndarray, float]:
+        """Resuelve las ecuaciones normales: coeficientes e intercepto sobre X sin escalar"""
+        theta = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+        coef = theta[1:]
+        intercept = float(theta[0] - coef @ self.shift)
+        return coef, intercept
+
+    def scaled_solution(self, coef: np.ndarray, intercept: float) -> tuple[np.ndarray, float]:
+        """Expresa la solución en el espacio de StandardScaler, como reporta el pipeline"""
+        return coef * self.std, float(intercept + coef @ self.mean)
+
+    def squared_error(self, coef: np.ndarray, intercept: float) -> float:
+        """Σ(y - ŷ)² de estas filas para el modelo dado, sin volver a leerlas"""
+        if self.count == 0:
+            return 0.0
+        theta = np.concatenate([[intercept + coef @ self.shift], coef])
+        return float(self.sum_yy - 2.0 * theta @ self.xty + theta @ self.xtx @ theta)
+
+    def total_sum_of_squares(self) -> float:
+        return self.sum_yy - self.sum_y ** 2 / max(self.count, 1)
+
+
+class ReservoirSample:
+    """
+    Muestra uniforme de a lo sumo `size` filas de todos los bloques vistos
+
+    Cada fila recibe una clave aleatoria y se conservan las `size` de menor
+    clave, lo que equivale a muestrear sin reemplazo sobre todo el historial.
+    """
+
+    def __init__(self, size: int, seed: int) -> None:
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.rows: np.ndarray | None = None
+        self.keys = np.empty(0)
+
+    def update(self, X: np.ndarray) -> None:
+        if len(X) == 0:
+            return
+        keys = self.rng.random(len(X))
+        if len(self.keys) >= self.size:
+            # Solo pueden entrar las filas con clave menor a la mayor guardada
+            candidates = keys < self.keys.max()
+            X, keys = X[candidates], keys[candidates]
+            if len(X) == 0:
+                return
+        rows = X if self.rows is None else np.vstack([self.rows, X])
+        keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.size:
+            keep = np.argpartition(keys, self.size)[:self.size]
+            rows, keys = rows[keep], keys[keep]
+        self.rows, self.keys = rows, keys
+
+
+def holdout_mask(row_ids: np.ndarray, test_size: float, seed: int) -> np.ndarray:
+    """
+    Partición train/test determinista por hash del id de cada fila
+
+    Cada fila cae en test si su hash (finalizador de splitmix64) normalizado
+    a [0, 1) es menor que `test_size`; no requiere tener todas las filas.
+    """
+    with np.errstate(over="ignore"):
+        h = row_ids.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        h = h ^ (h >> np.uint64(31))
+    return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53) < test_size
+
+
+def iter_csv_chunks(
+    csv_path: Path,
+    chunk_size: int,
+    columns: Sequence[str] | None = None,
+    text_columns: Sequence[str] = TEXT_COLUMNS,
+) -> Iterator[pd.DataFrame]:
+    """Lee el CSV por bloques agregando el número de fila global"""
+    if not csv_path.exists():
+        raise FileNotFoundError(f"No se encontró el archivo CSV en {csv_path!s}")
+
+    offset = 0
+    # El motor pyarrow no admite `chunksize`
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size,
+                             **_csv_read_options(csv_path, columns, text_columns)):
+        chunk[ROW_NUMBER_COLUMN] = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def iter_labeled_chunks(chunks: Iterable[pd.DataFrame], label_column: str) -> Iterator[pd.DataFrame]:
+    """
+    Aplica `ensure_labels` bloque a bloque
+
+    Si hay que generar etiquetas, la última fila de cada dispositivo en un
+    bloque depende de la primera del siguiente, así que se retiene y se
+    etiqueta junto con el bloque siguiente. Supone el archivo en orden temporal.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return
+
+    generate = label_column not in first.columns or first[label_column].isna().all()
+    if not generate:
+        for chunk in itertools.chain([first], chunks):
+            yield ensure_labels(chunk, label_column)
+        return
+
+    pending = None
+    for chunk in itertools.chain([first], chunks):
+        chunk = chunk.drop(columns=[label_column], errors="ignore")
+        frame = chunk if pending is None else pd.concat([pending, chunk], ignore_index=True)
+        frame = frame.reset_index(drop=True)
+        labeled = ensure_labels(frame, label_column)
+
+        order, device_codes, _ = _temporal_order(frame)
+        sorted_codes = device_codes[order]
+        is_last = np.ones(len(frame), dtype=bool)
+        is_last[:-1] = sorted_codes[:-1] != sorted_codes[1:]
+        hold = np.empty(len(frame), dtype=bool)
+        hold[order] = is_last
+
+        pending = frame[hold]
+        yield labeled[~hold]
+
+    if pending is not None and len(pending):
+        yield ensure_labels(pending.reset_index(drop=True), label_column)
+
+
+def iter_training_batches(
+    chunks: Iterable[pd.DataFrame], args: argparse.Namespace
+) -> Iterator[tuple[List[str], np.ndarray, np.ndarray, np.ndarray, pd.DataFrame]]:
+    """
+    Convierte bloques crudos en (features, X, y, máscara de test, subset)
+
+    Las características temporales continúan entre bloques con un único tracker.
+    Con `--per-device-models`, `subset` incluye además la columna de grupo y
+    `device_id`.
+    """
+    tracker = TemporalFeatureTracker() if args.temporal_features else None
+    requested_features = list(args.features)
+    if tracker is not None:
+        requested_features += [f for f in TEMPORAL_FEATURES if f not in requested_features]
+
+    for chunk in iter_labeled_chunks(chunks, args.prediction_column):
+        if tracker is not None:
+            chunk = add_temporal_features(chunk, tracker)
+        features = validate_features(chunk, requested_features)
+
+        subset = chunk[features + [args.prediction_column]].dropna()
+        if subset.empty:
+            continue
+        id_column = ID_COLUMN if ID_COLUMN in chunk.columns else ROW_NUMBER_COLUMN
+        row_ids = chunk.loc[subset.index, id_column].to_numpy()
+
+        X, y, subset = _extract_xy(subset, features, args.prediction_column)
+        if getattr(args, "per_device_models", None):
+            # Grupo (y dispositivo, para el mapa de zonas) de cada fila
+            for column in dict.fromkeys((args.group_column, DEVICE_COLUMN)):
+                if column in chunk.columns:
+                    subset[column] = chunk.loc[subset.index, column]
+        yield features, X, y, holdout_mask(row_ids, args.test_size, args.random_state), subset
+
+
+def _supabase_columns(args: argparse.Namespace) -> List[str]:
+    """
+    Columnas a pedir a `sensor_data`: solo las que usa el entrenamiento
+
+    `device_id` se pide solo si hace falta separar dispositivos (características
+    temporales o --per-device-models), y la columna de grupo con
+    --per-device-models; así las tablas sin esas columnas siguen funcionando
+    para el modelo global.
+    """
+    columns = [ID_COLUMN, TIMESTAMP_COLUMN, "soil_moisture1", "soil_moisture2"]
+    for feature in args.features:
+        if feature not in columns and feature not in TEMPORAL_FEATURES:
+            columns.append(feature)
+    per_device = getattr(args, "per_device_models", None)
+    if getattr(args, "temporal_features", False) or per_device:
+        columns.append(DEVICE_COLUMN)
+    if per_device and args.group_column not in columns:
+        columns.append(args.group_column)
+    return columns
+
+
+def _text_columns(args: argparse.Namespace) -> tuple[str, ...]:
+    """Columnas de texto: dispositivo, etiqueta y la de agrupación de --per-device-models"""
+    group_column = getattr(args, "group_column", DEVICE_COLUMN)
+    return tuple(dict.fromkeys((DEVICE_COLUMN, args.prediction_column, group_column)))
+
+
+def _csv_columns(args: argparse.Namespace) -> List[str]:
+    """Columnas a leer del CSV: las de Supabase más las de texto"""
+    return _supabase_columns(args) + list(_text_columns(args))
+
+
+def _text_as_str(page: pd.DataFrame, text_columns: Sequence[str]) -> pd.DataFrame:
+    """Columnas de texto como str (NaN si faltan), vengan del JSON o de la caché CSV"""
+    for col in text_columns:
+        values = page[col]
+        present = values.notna()
+        text = pd.Series(np.nan, index=page.index, dtype=object)
+        text[present] = values[present].astype(str)
+        page[col] = text
+    return page
+
+
+def iter_supabase_chunks(args: argparse.Namespace) -> Iterator[pd.DataFrame]:
+    """
+    Lee `sensor_data` por rangos de id, varios rangos en paralelo, en orden
+
+    Las páginas completas (todo su rango de ids es menor o igual al id máximo
+    actual) se guardan en `--cache-dir`; como los ids nuevos siempre son
+    mayores, en la siguiente ejecución solo se descarga la cola nueva. La
+    caché se separa por conjunto de columnas.
+    """
+    from supabase_utils import create_supabase_client, fetch_id_range, get_max_id
+
+    columns = _supabase_columns(args)
+    cache_dir = args.cache_dir / hashlib.sha1(",".join(columns).encode()).hexdigest()[:12]
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # Un solo cliente compartido por los hilos: reutiliza su pool de conexiones HTTP
+    client = create_supabase_client()
+    max_id = get_max_id(client)
+    ranges = [(lo, lo + args.page_size) for lo in range(1, max_id + 1, args.page_size)]
+
+    text_columns = [col for col in _text_columns(args) if col in columns]
+
+    def page_path(lo: int, hi: int) -> Path:
+        return cache_dir / f"sensor_data_{lo}_{hi}.csv"
+
+    def fetch(lo: int, hi: int) -> pd.DataFrame:
+        page = _text_as_str(
+            pd.DataFrame(fetch_id_range(client, lo, hi, columns), columns=columns), text_columns
+        )
+        if hi - 1 <= max_id:
+            # Escritura + rename: una ejecución interrumpida no deja páginas truncadas
+            path = page_path(lo, hi)
+            tmp_path = path.with_suffix(".csv.tmp")
+            page.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        return page
+
+    with ThreadPoolExecutor(max_workers=args.fetch_workers) as executor:
+        futures = {}
+        pending = iter(ranges)
+
+        def submit_next() -> None:
+            # Ventana acotada de descargas adelantadas para no acumular páginas en memoria
+            for lo, hi in pending:
+                if not page_path(lo, hi).exists():
+                    futures[(lo, hi)] = executor.submit(fetch, lo, hi)
+                    return
+
+        for _ in range(args.fetch_workers * 2):
+            submit_next()
+
+        for lo, hi in ranges:
+            future = futures.pop((lo, hi), None)
+            if future is not None:
+                page = future.result()
+                submit_next()
+            elif page_path(lo, hi).exists():
+                # Tipos explícitos: un device_id numérico no debe leerse como int
+                # (las páginas nuevas lo traen como texto y serían dos grupos)
+                page = _text_as_str(
+                    pd.read_csv(page_path(lo, hi), dtype={col: str for col in text_columns}), text_columns
+                )
+            else:
+                page = fetch(lo, hi)
+            if len(page):
+                yield page
+
+
+def iter_source_chunks(args: argparse.Namespace) -> Iterator[pd.DataFrame]:
+    """Bloques de datos crudos desde el origen elegido con `--source`"""
+    if args.source == "supabase":
+        return iter_supabase_chunks(args)
+    return iter_csv_chunks(
+        args.csv_path, args.chunk_size, _csv_columns(args), _text_columns(args)
+    )
+
+
+def load_source_dataset(args: argparse.Namespace) -> pd.DataFrame:
+    """Dataset completo en memoria desde el origen elegido con `--source`"""
+    if args.source == "supabase":
+        pages = list(iter_supabase_chunks(args))
+        if not pages:
+            raise ValueError("La tabla sensor_data de Supabase no tiene filas.")
+        return pd.concat(pages, ignore_index=True)
+    cache_dir = None if args.no_dataset_cache else args.dataset_cache_dir
+    return load_dataset(
+        args.csv_path, _csv_columns(args), cache_dir, _text_columns(args)
+    )
+
+
+def run_streaming(args: argparse.Namespace) -> None:
+    """Entrenamiento en memoria constante: dos pasadas sobre el CSV"""
+    train_stats = test_stats = None
+    features: List[str] = []
+    sample = ReservoirSample(REFERENCE_SAMPLE_SIZE, args.random_state) if args.save_model else None
+    groups = StreamingGroupModels(args) if args.per_device_models else None
+
+    # Pasada 1: acumular estadísticas suficientes de train y test
+    for features, X, y, test, subset in iter_training_batches(
+        iter_source_chunks(args), args
+    ):
+        if train_stats is None:
+            train_stats = SufficientStatistics(len(features))
+            test_stats = SufficientStatistics(len(features))
+        train_stats.update(X[~test], y[~test])
+        test_stats.update(X[test], y[test])
+        if sample is not None:
+            sample.update(X[~test])
+        if groups is not None:
+            groups.update(subset, X, y)
+
+    if train_stats is None or train_stats.count == 0:
+        raise ValueError("No quedan filas de entrenamiento después de eliminar NaN.")
+    if train_stats.sum_y in (0.0, float(train_stats.count)):
+        raise ValueError(
+            "Se requiere al menos dos clases (`Regar` y `No regar`) para entrenar el modelo."
+        )
+
+    coef, intercept = train_stats.solve()
+    scaled_coef, scaled_intercept = train_stats.scaled_solution(coef, intercept)
+
+    n_test = test_stats.count
+    mse = test_stats.squared_error(coef, intercept) / n_test if n_test else float("nan")
+    sst = test_stats.total_sum_of_squares()
+    r2 = 1.0 - test_stats.squared_error(coef, intercept) / sst if n_test and sst > 0 else float("nan")
+
+    # Pasada 2: exactitud con umbral (no se deduce de XᵀX) y predicciones opcionales
+    correct = 0
+    last_score = None
+    write_header = True
+    for _, X, y, test, subset in iter_training_batches(
+        iter_source_chunks(args), args
+    ):
+        scores = intercept + X @ coef
+        if test.any():
+            correct += int(((scores[test] >= args.threshold) == (y[test] == 1.0)).sum())
+            last_score = float(scores[test][-1])
+        if args.save_predictions:
+            predictions_df = subset.copy()
+            predictions_df["score_continuo"] = scores
+            predictions_df[PREDICTION_COLUMN + "_estimada"] = np.where(
+                scores >= args.threshold, "Regar", "No regar"
+            )
+            predictions_df.to_csv(
+                args.save_predictions, mode="w" if write_header else "a",
+                header=write_header, index=False,
+            )
+            write_header = False
+    accuracy = correct / n_test if n_test else float("nan")
+
+    print_model_report(
+        "=== Modelo de regresión lineal (streaming, ecuaciones normales) ===",
+        features, train_stats.count, n_test, scaled_intercept, scaled_coef,
+        mse, r2, accuracy, args.threshold,
+    )
+    if last_score is not None:
+        resultado = REVERSE_LABEL_MAP[1.0] if last_score >= args.threshold else REVERSE_LABEL_MAP[0.0]
+        print(f"Predicción final: {resultado}")
+        print(f"Score continuo: {last_score:.4f}")
+    if args.save_predictions:
+        print(f"Predicciones guardadas en: {args.save_predictions}")
+
+    if args.save_model:
+        save_model_artifact(
+            args.save_model, features, coef, intercept, args.threshold,
+            metrics={"mse": float(mse), "r2": float(r2), "accuracy": float(accuracy)},
+            n_rows=int(train_stats.count), reference=reference_histograms(sample.rows, features),
+        )
+        print(f"Modelo guardado en: {args.save_model}")
+
+    if groups is not None:
+        groups.save(features)
+
+
+class StreamingGroupModels:
+    """
+    Modelos por grupo (--per-device-models) en modo --streaming
+
+    Por grupo se acumulan estadísticas suficientes de todas sus filas (como
+    `train_group_models`) y una muestra para los histogramas de referencia.
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.stats: dict = {}
+        self.samples: dict = {}
+        self.zones: dict = {}
+
+    def update(self, subset: pd.DataFrame, X: np.ndarray, y: np.ndarray) -> None:
+        args = self.args
+        if args.group_column not in subset.columns:
+            raise ValueError(f"La columna {args.group_column} no existe en el dataset.")
+        codes, names = pd.factorize(subset[args.group_column])
+        for i, name in enumerate(names):
+            mask = codes == i
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = SufficientStatistics(X.shape[1])
+                self.samples[name] = ReservoirSample(
+                    GROUP_REFERENCE_SAMPLE_SIZE, args.random_state + len(self.samples)
+                )
+            stats.update(X[mask], y[mask])
+            self.samples[name].update(X[mask])
+
+        if args.group_column != DEVICE_COLUMN and DEVICE_COLUMN in subset.columns:
+            pairs = subset[[DEVICE_COLUMN, args.group_column]].dropna().drop_duplicates(DEVICE_COLUMN)
+            for device, group in zip(pairs[DEVICE_COLUMN], pairs[args.group_column]):
+                self.zones.setdefault(str(device), str(group))
+
+    def save(self, features: List[str]) -> None:
+        from model_registry import model_filename
+
+        args = self.args
+        args.per_device_models.mkdir(parents=True, exist_ok=True)
+        saved = 0
+        for name, stats in self.stats.items():
+            # Mínimo de filas y ambas clases, como en train_group_models
+            if stats.count < args.min_group_rows or stats.sum_y in (0.0, float(stats.count)):
+                continue
+            coef, intercept = stats.solve()
+            save_model_artifact(
+                args.per_device_models / model_filename(name), features, coef, intercept,
+                args.threshold, metrics={"train_mse": stats.squared_error(coef, intercept) / stats.count},
+                group=str(name), n_rows=int(stats.count),
+                reference=reference_histograms(self.samples[name].rows, features),
+            )
+            saved += 1
+
+        if self.zones:
+            _write_zones(self.zones, args)
+        print(
+            f"Modelos por {args.group_column}: {saved} guardados en {args.per_device_models} "
+            f"({len(self.stats) - saved} grupos usan el modelo global)"
+        )
+
+
+def _write_zones(zones: dict, args: argparse.Namespace) -> None:
+    """Guarda el mapa dispositivo -> grupo que usa model_registry"""
+    from model_registry import ZONES_FILE
+
+    (args.per_device_models / ZONES_FILE).write_text(json.dumps(zones, indent=2), encoding="utf-8")
+
+
+def _fit_group(
+    X: np.ndarray, y: np.ndarray
+) -> tuple[np.ndarray, float, float] | None:
+    """Ajusta el modelo de un grupo; None si solo tiene una clase"""
+    if len(np.unique(y)) < 2:
+        return None
+    model = build_pipeline()
+    model.fit(X, y)
+    coef, intercept = raw_coefficients(model)
+    return coef, intercept, float(mean_squared_error(y, model.predict(X)))
+
+
+def train_group_models(
+    df: pd.DataFrame, subset: pd.DataFrame, X: np.ndarray, y: np.ndarray,
+    features: List[str], args: argparse.Namespace,
+) -> None:
+    """
+    Entrena y guarda un modelo por grupo (dispositivo o zona) en paralelo
+
+    Los grupos con menos de `--min-group-rows` filas o con una sola clase no
+    tienen modelo propio: el servidor usa el global para ellos. Las filas sin
+    grupo (NaN) solo entran en el modelo global.
+    """
+    from model_registry import model_filename
+
+    if args.group_column not in df.columns:
+        raise ValueError(f"La columna {args.group_column} no existe en el dataset.")
+    args.per_device_models.mkdir(parents=True, exist_ok=True)
+    # pd.factorize da código -1 a los NaN; no cuentan para ningún grupo
+    codes, names = pd.factorize(df.loc[subset.index, args.group_column])
+    counts = np.bincount(codes[codes >= 0], minlength=len(names))
+    eligible = [i for i in range(len(names)) if counts[i] >= args.min_group_rows]
+
+    with ProcessPoolExecutor(max_workers=args.model_workers) as executor:
+        futures = {
+            i: executor.submit(_fit_group, X[codes == i], y[codes == i])
+            for i in eligible
+        }
+        saved = 0
+        for i, future in futures.items():
+            result = future.result()
+            if result is None:
+                continue
+            coef, intercept, mse = result
+            save_model_artifact(
+                args.per_device_models / model_filename(names[i]), features, coef, intercept,
+                args.threshold, metrics={"train_mse": mse}, group=str(names[i]), n_rows=int(counts[i]),
+                reference=reference_histograms(X[codes == i], features),
+            )
+            saved += 1
+
+    if args.group_column != DEVICE_COLUMN and DEVICE_COLUMN in df.columns:
+        pairs = df[[DEVICE_COLUMN, args.group_column]].dropna().drop_duplicates(DEVICE_COLUMN)
+        _write_zones({str(d): str(g) for d, g in zip(pairs[DEVICE_COLUMN], pairs[args.group_column])}, args)
+
+    print(
+        f"Modelos por {args.group_column}: {saved} guardados en {args.per_device_models} "
+        f"({len(names) - saved} grupos usan el modelo global)"
+    )
+
+
+def print_model_report(
+    title: str,
+    features: List[str],
+    n_train: int,
+    n_test: int,
+    intercept: float,
+    coefficients: Sequence[float],
+    mse: float,
+    r2: float,
+    accuracy: float,
+    threshold: float,
+) -> None:
+    print(title)
+    print(f"Características utilizadas: {', '.join(features)}")
+    print(f"Tamaño train/test: {n_train} / {n_test}")
+    print(f"Intercepto: {intercept:.4f}")
+    for feature, coef in zip(features, coefficients, strict=False):
+        print(f"Coeficiente para {feature}: {coef:.4f}")
+    print("--- Métricas ---")
+    print(f"MSE: {mse:.4f}")
+    print(f"R²: {r2:.4f}")
+    print(f"Exactitud (umbral {threshold}): {accuracy:.4f}")
+    print("--- Resultado ---")
+
+
 def main() -> None:
     args = parse_args()
 
+    if args.streaming:
+        try:
+            run_streaming(args)
+        except Exception as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        return
+
     try:
-        df = load_dataset(args.csv_path)
+        df = load_source_dataset(args)
         if args.generate_labels or args.prediction_column not in df.columns:
             df = ensure_labels(df, args.prediction_column)
 
-        features = validate_features(df, args.features)
+        requested_features = list(args.features)
+        if args.temporal_features:
+            df = add_temporal_features(df)
+            requested_features += [f for f in TEMPORAL_FEATURES if f not in requested_features]
+
+        features = validate_features(df, requested_features)
         X, y, subset = prepare_training_data(df, features, args.prediction_column)
 
         stratify = y if len(np.unique(y)) > 1 else None
@@ -237,17 +1225,11 @@ def main() -> None:
         print(f"Error: {exc}", file=sys.stderr)
         sys.exit(1)
 
-    print("=== Modelo de regresión lineal (scikit-learn) ===")
-    print(f"Características utilizadas: {', '.join(features)}")
-    print(f"Tamaño train/test: {len(X_train)} / {len(X_test)}")
-    print(f"Intercepto: {intercept:.4f}")
-    for feature, coef in zip(features, coefficients, strict=False):
-        print(f"Coeficiente para {feature}: {coef:.4f}")
-    print("--- Métricas ---")
-    print(f"MSE: {mse:.4f}")
-    print(f"R²: {r2:.4f}")
-    print(f"Exactitud (umbral {args.threshold}): {accuracy:.4f}")
-    print("--- Resultado ---")
+    print_model_report(
+        "=== Modelo de regresión lineal (scikit-learn) ===",
+        features, len(X_train), len(X_test), intercept, coefficients,
+        mse, r2, accuracy, args.threshold,
+    )
     
     # Mostrar predicción para el último dato
     if len(X_test) > 0:
@@ -266,6 +1248,22 @@ def main() -> None:
         print(f"Predicciones guardadas en: {args.save_predictions}")
         print(f"Resultado: {predictions_df[PREDICTION_COLUMN + '_estimada'].iloc[-1]}")
 
+    if args.save_model:
+        coef_raw, intercept_raw = raw_coefficients(model)
+        save_model_artifact(
+            args.save_model, features, coef_raw, intercept_raw, args.threshold,
+            metrics={"mse": float(mse), "r2": float(r2), "accuracy": float(accuracy)},
+            n_rows=int(len(X_train)), reference=reference_histograms(X_train, features),
+        )
+        print(f"Modelo guardado en: {args.save_model}")
+
+    if args.per_device_models:
+        try:
+            train_group_models(df, subset, X, y, features, args)
+        except Exception as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -19,27 +19,19 @@ import json
 load_dotenv()
 load_dotenv('supabase.env')
 
-try:
-    from supabase import create_client, Client
-    
-    # Obtener credenciales de Supabase
-    SUPABASE_URL = os.getenv('SUPABASE_URL')
-    SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
-    
-    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        print("ERROR: SUPABASE_URL y SUPABASE_ANON_KEY deben estar en supabase.env")
-        sys.exit(1)
-    
-    # Crear cliente de Supabase
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-    print("✅ Conectado a Supabase")
-    
-except ImportError:
-    print("ERROR: Instala supabase: pip install supabase")
-    sys.exit(1)
-except Exception as e:
-    print(f"ERROR: No se pudo conectar a Supabase: {e}")
-    sys.exit(1)
+from supabase_utils import create_supabase_client, is_unknown_column_error, SENSOR_TABLE, PREDICTIONS_TABLE
+
+# Cliente de Supabase (se crea en el primer uso para poder importar el módulo
+# desde otros scripts, p. ej. el backfill, sin conectarse)
+supabase = None
+
+def get_supabase():
+    """Obtiene el cliente de Supabase, creándolo la primera vez"""
+    global supabase
+    if supabase is None:
+        supabase = create_supabase_client()
+        print("✅ Conectado a Supabase")
+    return supabase
 
 # Coeficientes del modelo entrenado (del último entrenamiento)
 MODEL_COEFFICIENTS = {
@@ -53,10 +45,55 @@ MODEL_COEFFICIENTS = {
 
 THRESHOLD = 0.5
 
+FEATURES = ['uv_index', 'temperature2', 'humidity2', 'soil_moisture1', 'soil_moisture2']
+
+def load_model_config(model_path=None):
+    """
+    Coeficientes y umbral a usar
+
+    Con `model_path` (o la variable IRRIGATION_MODEL_PATH, la misma que usa el
+    servidor) se leen del artefacto de tune_irrigation_model.py o de
+    linear_regression_sensor_data.py --save-model; si no, los de este módulo.
+
+    Returns:
+        dict con 'coefficients' (incluye 'intercept'), 'threshold', 'version'
+        y 'unscaled' (True si los coeficientes son sobre valores sin escalar,
+        como en los artefactos)
+    """
+    model_path = model_path or os.getenv('IRRIGATION_MODEL_PATH')
+    if not model_path:
+        return {'coefficients': dict(MODEL_COEFFICIENTS), 'threshold': THRESHOLD,
+                'version': 'default', 'unscaled': False}
+
+    from irrigation_predictor import load_model_artifact
+    artifact = load_model_artifact(model_path)
+    extra = [name for name in artifact['features'] if name not in FEATURES]
+    if extra:
+        # Este script puntúa lecturas sueltas, sin historial para las temporales
+        print(f"⚠️ Características ignoradas (no disponibles en lecturas sueltas): {', '.join(extra)}")
+    coefficients = {name: float(artifact['coefficients'].get(name, 0.0)) for name in FEATURES}
+    coefficients['intercept'] = float(artifact['intercept'])
+    return {
+        'coefficients': coefficients,
+        'threshold': float(artifact.get('threshold', THRESHOLD)),
+        'version': artifact.get('version') or os.path.basename(model_path),
+        'unscaled': True,
+    }
+
+# Configuración del modelo, leída una sola vez por proceso
+_model_config = None
+
+def get_model_config():
+    """Obtiene la configuración del modelo (ver load_model_config), leyéndola la primera vez"""
+    global _model_config
+    if _model_config is None:
+        _model_config = load_model_config()
+    return _model_config
+
 def get_latest_sensor_data():
     """Obtiene los últimos datos del sensor desde Supabase"""
     try:
-        result = supabase.table('sensor_data').select('*').order('timestamp', desc=True).limit(1).execute()
+        result = get_supabase().table(SENSOR_TABLE).select('*').order('timestamp', desc=True).limit(1).execute()
         if result.data and len(result.data) > 0:
             return result.data[0]
         return None
@@ -64,8 +101,17 @@ def get_latest_sensor_data():
         print(f"ERROR obteniendo datos: {e}")
         return None
 
-def create_prediction_model():
-    """Crea el modelo de regresión lineal con scikit-learn"""
+def create_prediction_model(model_config=None):
+    """
+    Crea el modelo de regresión lineal con scikit-learn
+
+    Args:
+        model_config: resultado de load_model_config (por defecto get_model_config())
+    """
+    if model_config is None:
+        model_config = get_model_config()
+    coefficients = model_config['coefficients']
+
     # Crear pipeline con scaler y regresor
     model = Pipeline([
         ('scaler', StandardScaler()),
@@ -79,19 +125,30 @@ def create_prediction_model():
     
     # Entrenar el modelo (solo para inicializar)
     model.fit(dummy_X, dummy_y)
+
+    if model_config['unscaled']:
+        # Coeficientes de un artefacto: se aplican sobre los valores sin escalar
+        scaler = model.named_steps['scaler']
+        scaler.mean_ = np.zeros(len(FEATURES))
+        scaler.var_ = np.ones(len(FEATURES))
+        scaler.scale_ = np.ones(len(FEATURES))
     
     # Establecer los coeficientes entrenados
-    model.named_steps['regressor'].coef_ = np.array([
-        MODEL_COEFFICIENTS['uv_index'],
-        MODEL_COEFFICIENTS['temperature2'],
-        MODEL_COEFFICIENTS['humidity2'],
-        MODEL_COEFFICIENTS['soil_moisture1'],
-        MODEL_COEFFICIENTS['soil_moisture2']
-    ])
-    model.named_steps['regressor'].intercept_ = MODEL_COEFFICIENTS['intercept']
+    model.named_steps['regressor'].coef_ = np.array([coefficients[name] for name in FEATURES])
+    model.named_steps['regressor'].intercept_ = coefficients['intercept']
     
     return model
 
+# Modelo construido una sola vez por proceso (antes se re-entrenaba en cada predicción)
+_prediction_model = None
+
+def get_prediction_model():
+    """Obtiene el modelo de predicción, creándolo la primera vez"""
+    global _prediction_model
+    if _prediction_model is None:
+        _prediction_model = create_prediction_model()
+    return _prediction_model
+
 def predict_irrigation(sensor_data):
     """
     Hace una predicción de riego usando scikit-learn
@@ -103,8 +160,10 @@ def predict_irrigation(sensor_data):
         dict: Resultado de la predicción
     """
     try:
-        # Crear el modelo
-        model = create_prediction_model()
+        # Obtener el modelo y su umbral
+        model = get_prediction_model()
+        model_config = get_model_config()
+        threshold = model_config['threshold']
         
         # Preparar los datos en el orden correcto
         features = np.array([[
@@ -119,17 +178,18 @@ def predict_irrigation(sensor_data):
         score = model.predict(features)[0]
         
         # Determinar si se debe regar
-        prediction = "Regar" if score >= THRESHOLD else "No regar"
+        prediction = "Regar" if score >= threshold else "No regar"
         
         # Calcular confianza
-        distance_from_threshold = abs(score - THRESHOLD)
+        distance_from_threshold = abs(score - threshold)
         confidence = min(100.0, max(0.0, (1.0 - distance_from_threshold) * 100.0))
         
         return {
             'prediction': prediction,
             'score': float(score),
             'confidence': round(confidence, 2),
-            'threshold': THRESHOLD,
+            'threshold': threshold,
+            'model_version': model_config['version'],
             'status': 'success'
         }
     except Exception as e:
@@ -153,6 +213,7 @@ def save_prediction_to_supabase(prediction_result, sensor_data):
             'prediction': prediction_result['prediction'],
             'score': prediction_result['score'],
             'confidence': prediction_result['confidence'],
+            'threshold': prediction_result['threshold'],
             'uv_index': sensor_data.get('uv_index'),
             'temperature2': sensor_data.get('temperature2'),
             'humidity2': sensor_data.get('humidity2'),
@@ -160,7 +221,15 @@ def save_prediction_to_supabase(prediction_result, sensor_data):
             'soil_moisture2': sensor_data.get('soil_moisture2')
         }
         
-        result = supabase.table('irrigation_predictions').insert(data).execute()
+        try:
+            result = get_supabase().table(PREDICTIONS_TABLE).insert(data).execute()
+        except Exception as e:
+            if not is_unknown_column_error(e, 'threshold'):
+                raise
+            # Tabla sin la columna threshold: guardar igual y avisar de la migración
+            print("⚠️ La tabla no tiene la columna 'threshold'; ejecuta CREAR_TABLA_PREDICCIONES.sql")
+            del data['threshold']
+            result = get_supabase().table(PREDICTIONS_TABLE).insert(data).execute()
         
         if result.data:
             print(f"✅ Predicción guardada en Supabase: {prediction_result['prediction']}")
@@ -227,6 +296,15 @@ def main():
     print("=" * 60)
     print()
     
+    try:
+        get_supabase()
+    except RuntimeError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"ERROR: No se pudo conectar a Supabase: {e}")
+        sys.exit(1)
+    
     # Obtener últimos datos del sensor
     print("📡 Obteniendo últimos datos de Supabase...")
     sensor_data = get_latest_sensor_data()
@@ -261,6 +339,7 @@ def main():
     print(f"📈 Score: {prediction_result['score']:.4f}")
     print(f"🎯 Confianza: {prediction_result['confidence']:.2f}%")
     print(f"⚖️  Umbral: {prediction_result['threshold']}")
+    print(f"🏷️  Modelo: {prediction_result['model_version']}")
     print("=" * 60)
     print()
     
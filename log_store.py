@@ -0,0 +1,131 @@
+"""
+Almacén de logs del servidor en un buffer circular
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Reemplaza la lista `server_logs` (que se recortaba con `pop(0)`, O(n)): las
+entradas van a un `deque` con tamaño máximo, así que agregar cuesta O(1) y la
+más antigua se descarta sola. Es seguro entre hilos (un lock por operación).
+
+Cada entrada tiene un número de secuencia creciente que sirve de cursor para
+paginar: `query(cursor=N)` devuelve las entradas posteriores a N.
+
+Se guarda la hora como epoch; el texto 'YYYY-mm-dd HH:MM:SS' solo se arma
+para las entradas que devuelve `query`.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+LOG_CAPACITY = int(os.getenv('LOG_CAPACITY', '1000'))
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+
+def _parse_time(value):
+    """Segundos epoch desde un número o una fecha 'YYYY-mm-dd HH:MM:SS' (None si no se indica)"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+class LogStore:
+    """Buffer circular de entradas de log con contadores por nivel"""
+
+    def __init__(self, capacity=LOG_CAPACITY):
+        self.capacity = capacity
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._counts = dict.fromkeys(LEVELS, 0)
+
+    def log(self, level, message, device_id=None):
+        """
+        Agrega una entrada en O(1)
+
+        Returns:
+            int: número de secuencia de la entrada
+        """
+        now = time.time()
+        entry = {
+            'level': level,
+            'message': message,
+        }
+        if device_id is not None:
+            entry['device_id'] = device_id
+        with self._lock:
+            self._seq += 1
+            entry['seq'] = self._seq
+            self._entries.append((now, entry))
+            self._counts[level] = self._counts.get(level, 0) + 1
+            return self._seq
+
+    def query(self, level=None, since=None, until=None, device_id=None, cursor=None, limit=50):
+        """
+        Entradas que cumplen los filtros, de la más antigua a la más reciente
+
+        Args:
+            level: nivel exacto ('INFO', 'ERROR', ...)
+            since / until: rango de tiempo (epoch o 'YYYY-mm-dd HH:MM:SS')
+            device_id: solo entradas de ese dispositivo
+            cursor: devuelve las entradas con seq mayor; sin cursor, las últimas `limit`
+            limit: máximo de entradas
+
+        Returns:
+            (lista de entradas, cursor para pedir las siguientes, hay más entradas)
+        """
+        since = _parse_time(since)
+        until = _parse_time(until)
+        with self._lock:
+            snapshot = list(self._entries)
+
+        if cursor is not None and snapshot:
+            # Las secuencias son contiguas: la posición del cursor se calcula directo
+            start = max(0, int(cursor) - snapshot[0][1]['seq'] + 1)
+            snapshot = snapshot[start:]
+
+        def matches(ts, entry):
+            return ((level is None or entry['level'] == level)
+                    and (device_id is None or entry.get('device_id') == device_id)
+                    and (since is None or ts >= since)
+                    and (until is None or ts <= until))
+
+        if cursor is not None:
+            selected = []
+            for ts, entry in snapshot:
+                if matches(ts, entry):
+                    selected.append((ts, entry))
+                    if len(selected) == limit:
+                        break
+            has_more = len(selected) == limit
+        else:
+            selected = [(ts, entry) for ts, entry in snapshot if matches(ts, entry)][-limit:] if limit > 0 else []
+            has_more = False
+
+        if selected:
+            next_cursor = selected[-1][1]['seq']
+        elif cursor is not None:
+            next_cursor = int(cursor)
+        else:
+            next_cursor = snapshot[-1][1]['seq'] if snapshot else 0
+        entries = [
+            {'timestamp': datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M:%S'), **entry}
+            for ts, entry in selected
+        ]
+        return entries, next_cursor, has_more
+
+    def counts(self):
+        """Entradas registradas por nivel desde el arranque"""
+        with self._lock:
+            return dict(self._counts)
+
+    def total(self):
+        """Entradas registradas desde el arranque (incluye las ya descartadas)"""
+        return self._seq
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,244 @@
+"""
+Seguimiento del crecimiento de memoria del servidor
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Tres fuentes, de menor a mayor costo:
+    - muestreo periódico (cada MEMORY_SAMPLE_INTERVAL segundos, en un hilo):
+      RSS del proceso, objetos seguidos por el recolector y el tamaño de cada
+      estructura registrada con `watch` (log, ventanas por dispositivo, caché
+      de modelos...). Si una de ellas crece sin límite se ve en la serie.
+    - snapshots de tracemalloc bajo demanda: la diferencia entre dos snapshots
+      da los sitios de asignación (archivo:línea) que más crecieron.
+      tracemalloc solo se activa con el primer snapshot porque encarece
+      todas las asignaciones; se apaga con `stop_tracing`.
+    - conteo de objetos por tipo (recorre todo el heap, solo bajo demanda).
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+MEMORY_SAMPLE_INTERVAL = float(os.getenv('MEMORY_SAMPLE_INTERVAL', '60'))
+MEMORY_HISTORY = int(os.getenv('MEMORY_HISTORY', '1440'))   # 1 día con muestras cada minuto
+TRACEMALLOC_FRAMES = int(os.getenv('TRACEMALLOC_FRAMES', '1'))
+KEY_TYPES = ('lineno', 'filename', 'traceback')
+
+# Asignaciones propias de la medición que no interesan en el diff
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def rss_bytes():
+    """Memoria residente actual del proceso (None si la plataforma no la expone)"""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Sin /proc solo queda el pico (KB en Linux, bytes en macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _site(stat, key_type):
+    frames = stat.traceback
+    if key_type == 'traceback':
+        return [f'{frame.filename}:{frame.lineno}' for frame in frames]
+    frame = frames[0]
+    return frame.filename if key_type == 'filename' else f'{frame.filename}:{frame.lineno}'
+
+
+class MemoryTracker:
+    """Muestras periódicas de memoria y diffs de tracemalloc bajo demanda"""
+
+    def __init__(self, interval=MEMORY_SAMPLE_INTERVAL, history=MEMORY_HISTORY, on_error=None):
+        """
+        Args:
+            on_error: función que recibe el mensaje cuando falla una muestra del
+                hilo de muestreo (el hilo sigue con la siguiente)
+        """
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.on_error = on_error
+        self.sample_errors = 0
+        self.last_error = None
+        self._watched = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._snapshot = None
+        self._snapshot_at = None
+        self._type_counts = None
+
+    def watch(self, name, size_fn):
+        """Registra una estructura cuyo tamaño (`size_fn()`) se incluye en cada muestra"""
+        self._watched[name] = size_fn
+
+    def sizes(self):
+        sizes = {}
+        for name, size_fn in self._watched.items():
+            try:
+                sizes[name] = size_fn()
+            except Exception as e:
+                sizes[name] = f'error: {e}'
+        return sizes
+
+    def sample(self):
+        """Toma y guarda una muestra"""
+        entry = {
+            'timestamp': time.time(),
+            'rss_bytes': rss_bytes(),
+            'gc_objects': len(gc.get_objects()),
+            'sizes': self.sizes(),
+        }
+        if tracemalloc.is_tracing():
+            entry['traced_bytes'] = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self.samples.append(entry)
+        return entry
+
+    def start_sampler(self):
+        """
+        Inicia el hilo de muestreo (una sola vez; no hace nada con intervalo <= 0)
+
+        La primera muestra se toma pasado un intervalo: `gc.get_objects()`
+        recorre todo el heap y no debe competir con el arranque ni con las
+        primeras peticiones.
+        """
+        if self.interval <= 0 or self._sampler is not None:
+            return
+        self._sampler = threading.Thread(target=self._sample_loop, name='memory-sampler', daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception as e:
+                # Una muestra fallida no debe terminar el hilo (las siguientes
+                # quedarían sin tomarse y /admin/memory mostraría datos viejos)
+                self.sample_errors += 1
+                self.last_error = f'{type(e).__name__}: {e}'
+                if self.on_error is not None:
+                    try:
+                        self.on_error(f"Memory sample failed: {self.last_error}")
+                    except Exception:
+                        pass
+
+    def growth(self):
+        """Variación entre la primera y la última muestra guardadas"""
+        with self._lock:
+            if len(self.samples) < 2:
+                return None
+            first, last = self.samples[0], self.samples[-1]
+        elapsed = last['timestamp'] - first['timestamp']
+        rss_delta = None
+        if first['rss_bytes'] is not None and last['rss_bytes'] is not None:
+            rss_delta = last['rss_bytes'] - first['rss_bytes']
+        sizes = {}
+        for name, value in last['sizes'].items():
+            before = first['sizes'].get(name)
+            if isinstance(value, (int, float)) and isinstance(before, (int, float)):
+                sizes[name] = value - before
+        return {
+            'seconds': round(elapsed, 1),
+            'rss_bytes': rss_delta,
+            'rss_bytes_per_hour': round(rss_delta * 3600 / elapsed) if rss_delta is not None and elapsed > 0 else None,
+            'gc_objects': last['gc_objects'] - first['gc_objects'],
+            'sizes': sizes,
+        }
+
+    def recent(self, limit=60):
+        with self._lock:
+            return list(self.samples)[-limit:] if limit > 0 else []
+
+    def take_snapshot(self, limit=20, key_type='lineno'):
+        """
+        Snapshot de tracemalloc comparado con el anterior
+
+        El primer llamado activa tracemalloc y solo deja la línea base: las
+        asignaciones previas a activarlo no se ven.
+
+        Returns:
+            dict con los `limit` sitios que más crecieron (lista vacía en el primero)
+        """
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key_type debe ser uno de: {', '.join(KEY_TYPES)}")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        now = time.time()
+        with self._lock:
+            previous, previous_at = self._snapshot, self._snapshot_at
+            self._snapshot, self._snapshot_at = snapshot, now
+
+        current, peak = tracemalloc.get_traced_memory()
+        result = {
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'baseline': previous is None,
+            'seconds_since_previous': round(now - previous_at, 1) if previous_at else None,
+            'top_growth': [],
+        }
+        if previous is not None:
+            stats = snapshot.compare_to(previous, key_type)
+            result['top_growth'] = [
+                {
+                    'site': _site(stat, key_type),
+                    'size_diff_bytes': stat.size_diff,
+                    'size_bytes': stat.size,
+                    'count_diff': stat.count_diff,
+                    'count': stat.count,
+                }
+                for stat in stats[:limit]
+            ]
+        return result
+
+    def stop_tracing(self):
+        """Apaga tracemalloc y descarta el snapshot guardado"""
+        with self._lock:
+            self._snapshot = self._snapshot_at = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def type_counts(self, limit=20):
+        """Objetos seguidos por el recolector, por tipo, con la diferencia contra el llamado anterior"""
+        counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+        with self._lock:
+            previous, self._type_counts = self._type_counts, counts
+        return [
+            {
+                'type': name,
+                'count': count,
+                'diff': count - previous.get(name, 0) if previous is not None else None,
+            }
+            for name, count in counts.most_common(limit)
+        ]
+
+    def status(self):
+        with self._lock:
+            last = self.samples[-1] if self.samples else None
+            samples = len(self.samples)
+        return {
+            'rss_bytes': rss_bytes(),
+            'tracing': tracemalloc.is_tracing(),
+            'sample_interval': self.interval,
+            'samples': samples,
+            'sample_errors': self.sample_errors,
+            'last_error': self.last_error,
+            'last_sample': last,
+            'sizes': self.sizes(),
+            'growth': self.growth(),
+        }
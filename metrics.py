@@ -0,0 +1,214 @@
+"""
+Métricas del servidor en formato de texto de Prometheus
+Versión sin dependencias pesadas (solo biblioteca estándar + Flask) para Vercel
+
+Registra por ruta:
+    - http_requests_total{route, method, status}
+    - http_request_duration_seconds (histograma) {route, method}
+    - http_requests_in_flight {route}
+y por llamada al almacenamiento (Supabase):
+    - storage_call_duration_seconds (histograma) {operation}
+    - storage_calls_total {operation, outcome}
+
+Para no competir por un único lock en cada petición, los datos se reparten en
+SHARDS fragmentos con su propio lock; cada hilo se asigna a un fragmento por
+turno la primera vez que registra algo, así que dos hilos solo compiten si
+comparten fragmento. Solo al exportar `/metrics` se suman los fragmentos. El
+número de fragmentos es fijo, aunque el servidor cree un hilo por petición.
+"""
+
+import functools
+import itertools
+import threading
+import time
+from bisect import bisect_left
+
+# Límites superiores (segundos) de los buckets de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SHARDS = 16
+
+_HELP = {
+    'http_requests_total': ('counter', 'Peticiones HTTP atendidas'),
+    'http_requests_in_flight': ('gauge', 'Peticiones HTTP en curso'),
+    'http_request_duration_seconds': ('histogram', 'Duracion de las peticiones HTTP'),
+    'storage_calls_total': ('counter', 'Llamadas al almacenamiento'),
+    'storage_call_duration_seconds': ('histogram', 'Duracion de las llamadas al almacenamiento'),
+    'server_timing_phase_seconds': ('histogram', 'Duracion de cada fase de las peticiones (muestreo)'),
+    'storage_round_trips_total': ('counter', 'Idas y vueltas al almacenamiento'),
+    'storage_rows_total': ('counter', 'Filas devueltas por el almacenamiento'),
+    'storage_bytes_total': ('counter', 'Bytes aproximados devueltos por el almacenamiento (solo en modo debug)'),
+    'storage_requests_over_budget_total': ('counter', 'Peticiones que superaron el presupuesto de almacenamiento'),
+    'log_records_dropped_total': ('counter', 'Registros de log descartados con la cola llena'),
+}
+
+
+class _Shard:
+    """Contadores e histogramas de un fragmento, con su propio lock"""
+
+    __slots__ = ('lock', 'counters', 'histograms')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+
+class MetricsRegistry:
+    """Contadores, gauges e histogramas repartidos en fragmentos"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, shards=SHARDS):
+        self.buckets = tuple(buckets)
+        self._shards = [_Shard() for _ in range(shards)]
+        self._local = threading.local()
+        self._next_shard = itertools.count()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            # next() sobre itertools.count es atómico en CPython
+            shard = self._shards[next(self._next_shard) % len(self._shards)]
+            self._local.shard = shard
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """Suma `value` a un contador o gauge (valor negativo para bajar un gauge)"""
+        shard = self._shard()
+        key = (name, labels)
+        with shard.lock:
+            shard.counters[key] = shard.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Agrega una observación a un histograma"""
+        shard = self._shard()
+        key = (name, labels)
+        index = bisect_left(self.buckets, value)
+        with shard.lock:
+            data = shard.histograms.get(key)
+            if data is None:
+                # [conteo por bucket..., +Inf, suma]
+                data = [0] * (len(self.buckets) + 1) + [0.0]
+                shard.histograms[key] = data
+            data[index] += 1
+            data[-1] += value
+
+    def _collect(self):
+        counters = {}
+        histograms = {}
+        for shard in self._shards:
+            with shard.lock:
+                shard_counters = list(shard.counters.items())
+                shard_histograms = [(key, list(data)) for key, data in shard.histograms.items()]
+            for key, value in shard_counters:
+                counters[key] = counters.get(key, 0) + value
+            for key, data in shard_histograms:
+                total = histograms.get(key)
+                if total is None:
+                    histograms[key] = data
+                else:
+                    for i, value in enumerate(data):
+                        total[i] += value
+        return counters, histograms
+
+    def render(self):
+        """Texto en el formato de exposición de Prometheus"""
+        counters, histograms = self._collect()
+        by_name = {}
+        for (name, labels), value in counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), data in histograms.items():
+            by_name.setdefault(name, []).append((labels, data))
+
+        lines = []
+        for name in sorted(by_name):
+            default_kind = 'histogram' if (name, by_name[name][0][0]) in histograms else 'untyped'
+            kind, help_text = _HELP.get(name, (default_kind, name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), value):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
+
+
+def track_storage(operation):
+    """
+    Decorador que mide una llamada al almacenamiento
+
+    Las funciones decoradas capturan sus propios errores y devuelven False:
+    eso (o una excepción) cuenta como `error`; None o un resultado vacío,
+    como `empty`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = func(*args, **kwargs)
+                if result is not False:
+                    outcome = 'ok' if result else 'empty'
+                return result
+            finally:
+                registry.observe('storage_call_duration_seconds', (('operation', operation),),
+                                 time.perf_counter() - start)
+                registry.inc('storage_calls_total', (('operation', operation), ('outcome', outcome)))
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    """Registra en la app de Flask los hooks que miden cada petición"""
+    from flask import g, request
+
+    def route_label():
+        rule = request.url_rule
+        return rule.rule if rule is not None else 'unmatched'
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = route_label()
+        registry.inc('http_requests_in_flight', (('route', g.metrics_route),))
+
+    @app.after_request
+    def _metrics_record(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            labels = (('route', g.metrics_route), ('method', request.method))
+            registry.observe('http_request_duration_seconds', labels, time.perf_counter() - start)
+            registry.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+        return response
+
+    @app.teardown_request
+    def _metrics_done(exc):
+        # Se ejecuta siempre, también si la petición terminó con una excepción
+        route = g.pop('metrics_route', None)
+        if route is not None:
+            registry.inc('http_requests_in_flight', (('route', route),), -1)
@@ -0,0 +1,125 @@
+"""
+Registro de modelos de riego por dispositivo (o por zona)
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Los modelos por dispositivo son artefactos JSON en IRRIGATION_MODELS_DIR
+(generados con `linear_regression_sensor_data.py --per-device-models`). Se
+cargan la primera vez que se piden y se guardan en una caché LRU acotada, así
+que con miles de dispositivos la memoria no crece sin límite y los
+dispositivos activos se puntúan sin tocar disco ni base de datos.
+
+Si un dispositivo no tiene modelo propio se usa el modelo global, y ese
+resultado también queda en caché para no volver a buscar el archivo.
+
+Con `zones.json` en la carpeta (dispositivo -> zona) los dispositivos de una
+misma zona comparten el modelo `<zona>.json`.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from irrigation_predictor import IrrigationPredictor, get_predictor, load_model_artifact
+
+MODELS_DIR = os.getenv('IRRIGATION_MODELS_DIR')
+MAX_CACHED_MODELS = int(os.getenv('MAX_CACHED_MODELS', '256'))
+ZONES_FILE = 'zones.json'
+
+
+def model_filename(key):
+    """Nombre del artefacto de un dispositivo o zona (sin caracteres de ruta)"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(key)) + '.json'
+
+
+class ModelRegistry:
+    """Caché LRU de IrrigationPredictor por dispositivo con respaldo al modelo global"""
+
+    def __init__(self, models_dir=MODELS_DIR, max_models=MAX_CACHED_MODELS, fallback=None):
+        """
+        Args:
+            models_dir: carpeta con los artefactos por dispositivo (None = solo modelo global)
+            max_models: máximo de modelos en memoria
+            fallback: modelo para dispositivos sin artefacto (por defecto get_predictor())
+        """
+        self.models_dir = models_dir
+        self.max_models = max(1, int(max_models))
+        self.fallback = fallback or get_predictor()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._zones = self._load_zones()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _load_zones(self):
+        if not self.models_dir:
+            return {}
+        path = os.path.join(self.models_dir, ZONES_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as fh:
+            zones = json.load(fh)
+        if not isinstance(zones, dict):
+            raise ValueError(f"{ZONES_FILE} debe ser un objeto dispositivo -> zona")
+        return {str(device): str(zone) for device, zone in zones.items()}
+
+    def get(self, device_id):
+        """Modelo del dispositivo: caché, luego disco, luego el modelo global"""
+        key = self._zones.get(device_id, device_id)
+        with self._lock:
+            model = self._cache.get(key)
+            if model is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+
+        # La lectura del archivo se hace fuera del lock
+        model = self._load(key)
+        with self._lock:
+            self._cache[key] = model
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_models:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def _load(self, key):
+        if not self.models_dir:
+            return self.fallback
+        path = os.path.join(self.models_dir, model_filename(key))
+        if not os.path.exists(path):
+            return self.fallback
+        try:
+            model = IrrigationPredictor.from_artifact(load_model_artifact(path))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Artefacto ilegible o mal formado: el dispositivo usa el modelo global
+            return self.fallback
+        self.loads += 1
+        return model
+
+    def clear(self):
+        """Vacía la caché (p. ej. tras reentrenar los modelos)"""
+        with self._lock:
+            self._cache.clear()
+            self._zones = self._load_zones()
+
+    def stats(self):
+        with self._lock:
+            cached = len(self._cache)
+            own = sum(1 for model in self._cache.values() if model is not self.fallback)
+        return {
+            'models_dir': self.models_dir,
+            'max_models': self.max_models,
+            'cached': cached,
+            'cached_device_models': own,
+            'zones': len(self._zones),
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'fallback_version': self.fallback.version,
+        }
@@ -0,0 +1,268 @@
+"""
+Aprendizaje en línea del modelo de riego con mínimos cuadrados recursivos (RLS)
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Parte de los coeficientes del modelo entrenado en lote (IrrigationPredictor) y
+los ajusta con cada lectura etiquetada. La etiqueta de una lectura se conoce al
+llegar la siguiente del mismo dispositivo, con la misma regla del entrenamiento:
+`Regar` si en la siguiente soil_moisture1 o soil_moisture2 vale 100.
+
+Cada actualización cuesta O(d²) con d = 5 características (+ intercepto, + las
+temporales si el modelo en lote las usa). El
+factor de olvido hace que las lecturas antiguas pesen cada vez menos, así que
+el modelo sigue los cambios de estación o de suelo. Como una característica
+que no varía (p. ej. temperature2 = 0 cuando el firmware no la envía) haría
+crecer sin límite su varianza en P, la varianza de cada coeficiente se acota
+en MAX_COVARIANCE.
+
+Cada `publish_every` actualizaciones se publica una versión nueva como un
+IrrigationPredictor inmutable; mientras tanto se compara de forma
+precuencial (predecir antes de actualizar) contra el modelo en lote.
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from operator import mul
+
+from irrigation_predictor import (
+    DEFAULT_FEATURES, MAX_TRACKED_DEVICES, IrrigationPredictor, get_predictor, is_irrigation_reading,
+)
+
+FORGETTING_FACTOR = float(os.getenv('RLS_FORGETTING_FACTOR', '0.999'))
+PUBLISH_EVERY = int(os.getenv('RLS_PUBLISH_EVERY', '50'))
+# Varianza inicial de los coeficientes: pequeña para no olvidar enseguida el arranque en lote
+INITIAL_COVARIANCE = 1.0
+# Varianza máxima de cada coeficiente (diagonal de P)
+MAX_COVARIANCE = float(os.getenv('RLS_MAX_COVARIANCE', '100'))
+MAX_VERSIONS = 20
+
+
+class RecursiveLeastSquares:
+    """Regresión lineal con intercepto actualizada muestra a muestra"""
+
+    __slots__ = ('forgetting', 'max_covariance', 'weights', 'covariance', 'n_updates')
+
+    def __init__(self, weights, forgetting=FORGETTING_FACTOR, initial_covariance=INITIAL_COVARIANCE,
+                 max_covariance=MAX_COVARIANCE):
+        """
+        Args:
+            weights: [intercepto, coef_1, ..., coef_d] de arranque
+            forgetting: factor de olvido λ en (0, 1]; 1 = sin olvido
+            initial_covariance: valor inicial de la diagonal de P
+            max_covariance: cota de cada elemento de la diagonal de P
+        """
+        n = len(weights)
+        self.forgetting = forgetting
+        self.max_covariance = max_covariance
+        self.weights = [float(w) for w in weights]
+        self.covariance = [[initial_covariance if i == j else 0.0 for j in range(n)] for i in range(n)]
+        self.n_updates = 0
+
+    def predict(self, x):
+        """Score para las características `x` (sin el 1 del intercepto)"""
+        w = self.weights
+        score = w[0]
+        for i, value in enumerate(x, 1):
+            score += w[i] * value
+        return score
+
+    def update(self, x, y):
+        """
+        Incorpora la muestra (x, y)
+
+        Returns:
+            float: error a priori (y - predicción antes de actualizar)
+        """
+        z = [1.0]
+        z.extend(x)
+        n = len(z)
+        P = self.covariance
+        lam = self.forgetting
+
+        Pz = [sum(row[j] * z[j] for j in range(n)) for row in P]
+        denom = lam + sum(z[i] * Pz[i] for i in range(n))
+        gain = [v / denom for v in Pz]
+        error = y - self.predict(x)
+
+        w = self.weights
+        for i in range(n):
+            w[i] += gain[i] * error
+
+        # P = (P - k·(Pz)ᵀ) / λ, solo el triángulo superior y se refleja
+        # (mantiene P simétrica frente a errores de redondeo)
+        for i in range(n):
+            row = P[i]
+            k = gain[i]
+            for j in range(i, n):
+                value = (row[j] - k * Pz[j]) / lam
+                row[j] = value
+                P[j][i] = value
+        self._bound_covariance()
+
+        self.n_updates += 1
+        return error
+
+    def _bound_covariance(self):
+        """
+        Acota la diagonal de P escalando fila y columna de cada coeficiente
+        que la supera (P = D·P·D con D diagonal): P sigue simétrica y definida
+        positiva, y las direcciones que sí reciben información no cambian
+        """
+        P = self.covariance
+        limit = self.max_covariance
+        n = len(P)
+        scale = [math.sqrt(limit / P[i][i]) if P[i][i] > limit else 1.0 for i in range(n)]
+        if all(factor == 1.0 for factor in scale):
+            return
+        for i in range(n):
+            row = P[i]
+            for j in range(n):
+                row[j] *= scale[i] * scale[j]
+
+
+def _features(reading, temporal_features, temporal_names):
+    get = reading.get
+    x = [float(get(name, 0) or 0) for name in DEFAULT_FEATURES]
+    if temporal_names:
+        tf = temporal_features or {}
+        x.extend(float(tf.get(name, 0.0) or 0.0) for name in temporal_names)
+    return x
+
+
+class _Comparison:
+    """Error cuadrático y aciertos acumulados de un modelo (evaluación precuencial)"""
+
+    __slots__ = ('count', 'squared_error', 'correct')
+
+    def __init__(self):
+        self.count = 0
+        self.squared_error = 0.0
+        self.correct = 0
+
+    def add(self, score, label, threshold):
+        self.count += 1
+        self.squared_error += (label - score) ** 2
+        self.correct += (score >= threshold) == (label == 1.0)
+
+    def summary(self):
+        if not self.count:
+            return {'samples': 0, 'mse': None, 'accuracy': None}
+        return {
+            'samples': self.count,
+            'mse': round(self.squared_error / self.count, 6),
+            'accuracy': round(self.correct / self.count, 4),
+        }
+
+
+class OnlineIrrigationLearner:
+    """Modelo de riego que se actualiza con las lecturas que llegan al servidor"""
+
+    def __init__(self, base_predictor=None, forgetting=FORGETTING_FACTOR, publish_every=PUBLISH_EVERY,
+                 max_devices=MAX_TRACKED_DEVICES):
+        """
+        Args:
+            base_predictor: IrrigationPredictor entrenado en lote (arranque y referencia);
+                por defecto el de get_predictor()
+            forgetting: factor de olvido de RLS
+            publish_every: actualizaciones entre versiones publicadas
+            max_devices: dispositivos con lectura pendiente de etiqueta
+        """
+        self.base = base_predictor or get_predictor()
+        self.threshold = self.base.threshold
+        self.publish_every = max(1, int(publish_every))
+        # Si el modelo en lote usa características temporales, RLS también las
+        # ajusta (arranca con los mismos pesos, así ambos coinciden al inicio)
+        self.temporal_names = list(self.base.temporal_coefficients)
+        self.feature_names = list(DEFAULT_FEATURES) + self.temporal_names
+        self._batch_weights = ([self.base.intercept] + list(self.base.coefficients)
+                               + [self.base.temporal_coefficients[name] for name in self.temporal_names])
+        self.rls = RecursiveLeastSquares(self._batch_weights, forgetting)
+        self.max_devices = max(1, int(max_devices))
+        self._pending = OrderedDict()
+        # Las peticiones llegan en hilos distintos: P, los pesos y _pending se
+        # modifican juntos
+        self._lock = threading.Lock()
+        self._online = _Comparison()
+        self._batch = _Comparison()
+        self.published = self.base
+        self.versions = deque(maxlen=MAX_VERSIONS)
+
+    def observe(self, device_id, reading, temporal_features=None):
+        """
+        Registra una lectura del dispositivo
+
+        Si había una lectura anterior del mismo dispositivo, queda etiquetada
+        con esta y se usa para actualizar el modelo.
+
+        Args:
+            device_id: dispositivo que envió la lectura
+            reading: dict con las lecturas
+            temporal_features: características temporales del dispositivo en
+                esta lectura (solo se usan si el modelo en lote las tiene)
+
+        Returns:
+            float o None: etiqueta asignada a la lectura anterior (1.0 = Regar)
+        """
+        x = _features(reading, temporal_features, self.temporal_names)
+        label = 1.0 if is_irrigation_reading(reading) else 0.0
+        with self._lock:
+            previous = self._pending.pop(device_id, None)
+            self._pending[device_id] = x
+            if len(self._pending) > self.max_devices:
+                self._pending.popitem(last=False)
+            if previous is None:
+                return None
+
+            # Evaluación precuencial: ambos modelos predicen antes de ver la etiqueta
+            batch_score = self._batch_weights[0] + sum(map(mul, self._batch_weights[1:], previous))
+            self._batch.add(batch_score, label, self.threshold)
+            online_score = label - self.rls.update(previous, label)
+            self._online.add(online_score, label, self.threshold)
+
+            if self.rls.n_updates % self.publish_every == 0:
+                self._publish()
+        return label
+
+    def _publish(self):
+        weights = self.rls.weights
+        version = f"online-{self.rls.n_updates}"
+        # Se reemplaza la referencia completa: los lectores nunca ven un modelo a medias
+        self.published = IrrigationPredictor(
+            coefficients=dict(zip(self.feature_names, weights[1:])),
+            intercept=weights[0],
+            threshold=self.threshold,
+            version=version,
+        )
+        self.versions.append({
+            'version': version,
+            'published_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'updates': self.rls.n_updates,
+            'online': self._online.summary(),
+            'batch': self._batch.summary(),
+        })
+
+    def stats(self):
+        """Estado del modelo en línea y comparación con el modelo en lote"""
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        weights = self.rls.weights
+        return {
+            'updates': self.rls.n_updates,
+            'forgetting_factor': self.rls.forgetting,
+            'max_covariance': self.rls.max_covariance,
+            'publish_every': self.publish_every,
+            'published_version': self.published.version,
+            'batch_version': self.base.version,
+            'intercept': round(weights[0], 6),
+            'coefficients': {name: round(w, 6) for name, w in zip(self.feature_names, weights[1:])},
+            'comparison': {
+                'online': self._online.summary(),
+                'batch': self._batch.summary(),
+            },
+            'versions': list(self.versions),
+        }
@@ -2,100 +2,207 @@
 Flask server para recibir datos del ESP32 y guardarlos en Supabase
 """
 
+import functools
+import hmac
+import importlib.util
+import logging
+import math
 import os
-from flask import Flask, request, jsonify, render_template_string
+import threading
+import time
+from flask import Flask, Response, request, jsonify, render_template_string, has_request_context
 from datetime import datetime
 
+from irrigation_predictor import DEFAULT_DEVICE_ID
+from temporal_features import TemporalFeatureTracker
+from dryout_forecast import DryoutForecaster
+from drift_monitor import DriftMonitor
+from log_store import LogStore
+from metrics import registry as metrics_registry, track_storage, init_app as init_metrics
+from server_timing import mark as timing_mark, init_app as init_server_timing
+from request_profiler import PROFILE_SAMPLE_INTERVAL, ProfilerBusy, profiler as request_profiler, init_app as init_request_profiler
+from memory_tracker import MemoryTracker
+from storage_accounting import CountingClient, init_app as init_storage_accounting
+from device_liveness import DeviceLivenessTracker
+from structured_logging import configure_logging
+
+# Logs del servidor para debugging (buffer circular, ver /logs)
+log_store = LogStore()
+# Mismas entradas en JSON hacia stderr y LOG_FILE, escritas por un hilo aparte
+logger = configure_logging()
+
+def log_event(level, message, device_id=None, exc_info=False):
+    """
+    Registra una entrada en el log del servidor (O(1), seguro entre hilos, nunca bloquea)
+    
+    Todas las entradas van a log_store (/logs y el dashboard). LOG_LEVEL solo
+    filtra el log JSON (stderr/LOG_FILE), antes de crear el registro.
+    exc_info=True agrega el traceback de la excepcion en curso (solo en el log JSON).
+    """
+    levelno = logging.getLevelName(level)
+    if logger.isEnabledFor(levelno):
+        route = request.path if has_request_context() else None
+        logger.log(levelno, message, exc_info=exc_info, extra={'device_id': device_id, 'route': route})
+    return log_store.log(level, message, device_id)
+
 # Importar el predictor de riego
 try:
     from irrigation_predictor import get_predictor
+    from online_irrigation_learner import OnlineIrrigationLearner
+    from model_registry import ModelRegistry
+    from shadow_scoring import ShadowScorer
     PREDICTOR_AVAILABLE = True
 except ImportError:
     PREDICTOR_AVAILABLE = False
     def get_predictor():
         return None
 
-# Intentar importar Supabase
-SUPABASE_AVAILABLE = False
-insert_sensor_data = None
-get_latest_sensor_data = None
-get_latest_irrigation_prediction = None
+# Almacenamiento (Supabase). Importar `supabase` (httpx, pydantic...) y crear el
+# cliente cuesta cientos de ms, asi que se hace en el primer uso
+# (get_storage_client) y no al importar este modulo: el arranque en frio y las
+# rutas que no tocan Supabase no lo pagan. Ver benchmarks/benchmark_cold_start.py
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
+# find_spec solo busca el paquete, no lo importa
+SUPABASE_AVAILABLE = bool(SUPABASE_URL and SUPABASE_ANON_KEY) and importlib.util.find_spec('supabase') is not None
+_storage_client = None
+_storage_lock = threading.Lock()
 
-try:
-    from supabase import create_client, Client
-    import urllib3
-    urllib3.disable_warnings()
-    
-    # Obtener credenciales de variables de entorno
-    SUPABASE_URL = os.getenv('SUPABASE_URL')
-    SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
-    
-    if SUPABASE_URL and SUPABASE_ANON_KEY:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
-        SUPABASE_AVAILABLE = True
-        
-        def insert_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_moisture1, soil_moisture2, uv_index, timestamp):
-            """Inserta datos del sensor en Supabase"""
-            try:
-                data = {
-                    'temperature1': float(temperature1),
-                    'humidity1': float(humidity1),
-                    'temperature2': float(temperature2),
-                    'humidity2': float(humidity2),
-                    'soil_moisture1': float(soil_moisture1),
-                    'soil_moisture2': float(soil_moisture2),
-                    'uv_index': float(uv_index),
-                    'timestamp': str(timestamp)
-                }
-                result = supabase.table('sensor_data').insert(data).execute()
-                if result.data:
-                    return True
-                else:
-                    import sys
-                    sys.stderr.write("ERROR: Supabase insert returned no data\n")
-                    return False
-            except Exception as e:
-                import sys
-                error_msg = f"ERROR: Failed to save to Supabase: {str(e)}"
-                sys.stderr.write(error_msg + "\n")
-                # Guardar en logs
-                server_logs.append({
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'level': 'ERROR',
-                    'message': error_msg
-                })
-                if len(server_logs) > 100:
-                    server_logs.pop(0)
-                return False
-        
-        def get_latest_sensor_data():
-            """Obtiene los datos mas recientes del sensor desde Supabase"""
-            try:
-                result = supabase.table('sensor_data').select('*').order('timestamp', desc=True).limit(1).execute()
-                if result.data and len(result.data) > 0:
-                    return result.data[0]
-                return None
-            except Exception as e:
-                return None
-        
-        def get_latest_irrigation_prediction():
-            """Obtiene la última predicción de riego desde Supabase"""
+def configure_storage(client):
+    """
+    Usa `client` como almacenamiento: el cliente de Supabase o uno compatible
+    (table(...).insert/select/order/limit/execute), p. ej. el cliente falso de
+    test_scripts/load_test_fleet.py
+    """
+    global _storage_client, SUPABASE_AVAILABLE
+    # Cuenta idas y vueltas, filas y bytes por peticion y ruta (ver /metrics)
+    _storage_client = CountingClient(client)
+    SUPABASE_AVAILABLE = True
+
+def get_storage_client():
+    """Cliente de almacenamiento; lo crea en la primera llamada (None si no esta disponible)"""
+    global SUPABASE_AVAILABLE
+    if _storage_client is not None or not SUPABASE_AVAILABLE:
+        return _storage_client
+    with _storage_lock:
+        if _storage_client is None and SUPABASE_AVAILABLE:
             try:
-                result = supabase.table('irrigation_predictions').select('*').order('timestamp', desc=True).limit(1).execute()
-                if result.data and len(result.data) > 0:
-                    return result.data[0]
-                return None
+                from supabase import create_client
+                import urllib3
+                urllib3.disable_warnings()
+                configure_storage(create_client(SUPABASE_URL, SUPABASE_ANON_KEY))
             except Exception as e:
-                return None
-    else:
-        pass
-except Exception as e:
-    pass
+                SUPABASE_AVAILABLE = False
+                log_event('ERROR', f"ERROR: Supabase client not available: {str(e)}", exc_info=True)
+    return _storage_client
+
+# sensor_data sin la columna device_id (falta ejecutar CONFIGURAR_SUPABASE_TABLA.sql):
+# se sigue guardando la lectura sin el dispositivo en lugar de perderla
+_sensor_device_id_column = True
+
+def is_unknown_column_error(error, column):
+    """True si PostgREST rechazo la escritura porque la tabla no tiene `column`"""
+    message = str(error)
+    return column in message and ('PGRST204' in message or '42703' in message)
+
+def _drop_device_id_column():
+    global _sensor_device_id_column
+    if _sensor_device_id_column:
+        _sensor_device_id_column = False
+        log_event('WARNING', "WARNING: sensor_data has no device_id column; saving readings without it (run CONFIGURAR_SUPABASE_TABLA.sql)")
+
+@track_storage('insert_sensor_data')
+def insert_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_moisture1, soil_moisture2, uv_index, timestamp, device_id):
+    """Inserta datos del sensor en Supabase"""
+    try:
+        client = get_storage_client()
+        if client is None:
+            return False
+        data = {
+            'temperature1': float(temperature1),
+            'humidity1': float(humidity1),
+            'temperature2': float(temperature2),
+            'humidity2': float(humidity2),
+            'soil_moisture1': float(soil_moisture1),
+            'soil_moisture2': float(soil_moisture2),
+            'uv_index': float(uv_index),
+            'timestamp': str(timestamp),
+            'device_id': str(device_id)
+        }
+        if not _sensor_device_id_column:
+            del data['device_id']
+        try:
+            result = client.table('sensor_data').insert(data).execute()
+        except Exception as e:
+            if 'device_id' not in data or not is_unknown_column_error(e, 'device_id'):
+                raise
+            _drop_device_id_column()
+            del data['device_id']
+            result = client.table('sensor_data').insert(data).execute()
+        if result.data:
+            return True
+        else:
+            log_event('ERROR', "ERROR: Supabase insert returned no data")
+            return False
+    except Exception as e:
+        log_event('ERROR', f"ERROR: Failed to save to Supabase: {str(e)}", exc_info=True)
+        return False
+
+@track_storage('get_latest_sensor_data')
+def get_latest_sensor_data():
+    """Obtiene los datos mas recientes del sensor desde Supabase (None si no hay filas, False si falla)"""
+    try:
+        client = get_storage_client()
+        if client is None:
+            return False
+        result = client.table('sensor_data').select('*').order('timestamp', desc=True).limit(1).execute()
+        if result.data and len(result.data) > 0:
+            return result.data[0]
+        return None
+    except Exception as e:
+        return False
 
-# Threshold para predicciones (debe coincidir con el script local)
+@track_storage('get_latest_irrigation_prediction')
+def get_latest_irrigation_prediction():
+    """Obtiene la última predicción de riego desde Supabase (None si no hay filas, False si falla)"""
+    try:
+        client = get_storage_client()
+        if client is None:
+            return False
+        result = client.table('irrigation_predictions').select('*').order('timestamp', desc=True).limit(1).execute()
+        if result.data and len(result.data) > 0:
+            return result.data[0]
+        return None
+    except Exception as e:
+        return False
+
+# Umbral de las predicciones guardadas sin la columna `threshold` (las anteriores
+# a que el script local la registrara usaban el umbral por defecto)
 THRESHOLD = 0.5
 
 app = Flask(__name__)
+# Latencia y conteo de peticiones por ruta (ver /metrics)
+init_metrics(app)
+# Cabecera Server-Timing con el tiempo de cada fase (parse, storage, ...)
+init_server_timing(app)
+# Perfilado bajo demanda (armado desde /admin/profile; desarmado no cuesta nada)
+init_request_profiler(app)
+# Presupuesto de idas y vueltas a Supabase por peticion (avisos en modo debug)
+init_storage_accounting(app, warn=lambda message: log_event('WARNING', message))
+
+# Token para los endpoints /admin/* (sin ADMIN_TOKEN quedan deshabilitados)
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+def admin_required(view):
+    """Exige la cabecera X-Admin-Token igual a ADMIN_TOKEN"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token', '')
+        # Se comparan bytes: con str, compare_digest lanza TypeError si hay caracteres no ASCII
+        if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({'status': 'error', 'message': 'No autorizado'}), 403
+        return view(*args, **kwargs)
+    return wrapper
 
 # Global variables
 esp32_data = {
@@ -115,21 +222,79 @@ esp32_data = {
     'last_data_received': None  # Timestamp del ultimo dato recibido del ESP32
 }
 
+# Ventanas de lecturas recientes por dispositivo (pendiente, EWMA, min/max)
+temporal_tracker = TemporalFeatureTracker()
+# Caracteristicas temporales de la ultima lectura (las usa /online-model)
+latest_device_features = {}
+# Pronostico de secado por dispositivo (se recalcula solo al recibir datos)
+dryout_forecaster = DryoutForecaster()
+# Ritmo de envio y estado de conexion por dispositivo (calculado al recibir datos)
+device_liveness = DeviceLivenessTracker()
+# Modelo global (IRRIGATION_MODEL_PATH): si el artefacto no se puede leer el
+# servidor arranca igual, sin las funciones que dependen del modelo
+_model_reference = None
+if PREDICTOR_AVAILABLE:
+    try:
+        _model_reference = get_predictor().reference
+    except (OSError, ValueError) as e:
+        log_event('WARNING', f"WARNING: Irrigation model not loaded: {str(e)}")
+        PREDICTOR_AVAILABLE = False
+# Modelo de riego actualizado en linea (RLS) a partir del modelo entrenado en lote
+online_learner = OnlineIrrigationLearner() if PREDICTOR_AVAILABLE else None
+# Modelos por dispositivo (IRRIGATION_MODELS_DIR) en cache LRU, con respaldo al modelo global
+model_registry = None
+if PREDICTOR_AVAILABLE:
+    try:
+        model_registry = ModelRegistry()
+    except (OSError, ValueError) as e:
+        # p. ej. zones.json mal formado: se sigue solo con el modelo global
+        log_event('WARNING', f"WARNING: Per-device models not loaded: {str(e)}")
+        model_registry = ModelRegistry(models_dir=None)
+# Deriva de las entradas frente a la distribucion de entrenamiento (si el modelo la trae)
+drift_monitor = DriftMonitor(_model_reference) if _model_reference else None
+# Modelos candidatos evaluados en sombra (SHADOW_MODEL_PATHS); no afectan la respuesta
+shadow_scorer = None
+if PREDICTOR_AVAILABLE:
+    try:
+        shadow_scorer = ShadowScorer.from_paths()
+    except (OSError, ValueError) as e:
+        log_event('WARNING', f"WARNING: Shadow models not loaded: {str(e)}")
+
+# Muestras periodicas de RSS y del tamano de las estructuras que viven en el proceso
+memory_tracker = MemoryTracker(on_error=lambda message: log_event('ERROR', f"ERROR: {message}"))
+memory_tracker.watch('log_store', lambda: len(log_store))
+memory_tracker.watch('device_liveness_devices', lambda: len(device_liveness))
+memory_tracker.watch('temporal_tracker_devices', lambda: len(temporal_tracker.devices()))
+memory_tracker.watch('dryout_forecaster_devices', lambda: len(dryout_forecaster.devices()))
+if online_learner is not None:
+    memory_tracker.watch('online_learner_versions', lambda: len(online_learner.versions))
+if model_registry is not None:
+    memory_tracker.watch('model_registry_cached', lambda: model_registry.stats()['cached'])
+if drift_monitor is not None:
+    memory_tracker.watch('drift_monitor_devices', lambda: len(drift_monitor.devices()))
+if shadow_scorer is not None:
+    memory_tracker.watch('shadow_log', lambda: len(shadow_scorer.log))
+memory_tracker.start_sampler()
+
 communication_test_queue = False
 data_request_queue = False  # Cola para solicitar datos al ESP32
-server_logs = []  # Logs del servidor para debugging (max 100 entradas)
 
-def save_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_moisture1, soil_moisture2, uv_index):
-    """Save sensor data to Supabase"""
-    import sys
+def latest_connection():
+    """Estado de conexion del ultimo dispositivo que se comunico (None si ninguno)"""
+    device_id = device_liveness.last_device
+    return device_liveness.status(device_id) if device_id is not None else None
+
+def esp32_status():
+    """'connected' o 'disconnected' segun el ultimo dispositivo que se comunico"""
+    state = latest_connection()
+    return 'connected' if state is not None and state['status'] != 'disconnected' else 'disconnected'
+
+def save_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_moisture1, soil_moisture2, uv_index, device_id):
+    """Save sensor data to Supabase (with the device_id used to key models and features)"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     if not SUPABASE_AVAILABLE:
-        sys.stderr.write("ERROR: Supabase not available - check environment variables\n")
-        return False
-    
-    if not insert_sensor_data:
-        sys.stderr.write("ERROR: insert_sensor_data function not available\n")
+        log_event('ERROR', "ERROR: Supabase not available - check environment variables")
         return False
     
     try:
@@ -138,35 +303,22 @@ def save_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_mois
             float(temperature2), float(humidity2),
             float(soil_moisture1), float(soil_moisture2),
             float(uv_index),
-            timestamp
+            timestamp,
+            device_id
         )
         if not success:
-            error_msg = "ERROR: Failed to save to Supabase"
-            sys.stderr.write(error_msg + "\n")
-            server_logs.append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'level': 'ERROR',
-                'message': error_msg
-            })
-            if len(server_logs) > 100:
-                server_logs.pop(0)
+            log_event('ERROR', "ERROR: Failed to save to Supabase")
         else:
             # Log exito
-            server_logs.append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'level': 'INFO',
-                'message': f"Data saved to Supabase: T1={temperature1}, H1={humidity1}"
-            })
-            if len(server_logs) > 100:
-                server_logs.pop(0)
+            log_event('INFO', f"Data saved to Supabase: T1={temperature1}, H1={humidity1}")
         return success
     except Exception as e:
-        sys.stderr.write(f"ERROR: Exception in save_sensor_data: {str(e)}\n")
+        log_event('ERROR', f"ERROR: Exception in save_sensor_data: {str(e)}", exc_info=True)
         return False
 
 def load_latest_data_from_supabase():
     """Load latest sensor data from Supabase"""
-    if SUPABASE_AVAILABLE and get_latest_sensor_data:
+    if SUPABASE_AVAILABLE:
         try:
             latest = get_latest_sensor_data()
             if latest:
@@ -184,8 +336,7 @@ def load_latest_data_from_supabase():
                 # El estado de conexion se verifica en /connection-status basado en last_data_received
                 return True
         except Exception as e:
-            import sys
-            sys.stderr.write(f"ERROR in load_latest_data_from_supabase: {str(e)}\n")
+            log_event('ERROR', f"ERROR in load_latest_data_from_supabase: {str(e)}", exc_info=True)
     return False
 
 @app.route('/favicon.ico')
@@ -201,8 +352,9 @@ def home():
         load_latest_data_from_supabase()
     except Exception as e:
         pass
+    timing_mark('storage')
     
-    return render_template_string('''
+    html = render_template_string('''
 <!DOCTYPE html>
 <html lang="es">
 <head>
@@ -703,14 +855,17 @@ def home():
 </body>
 </html>
     ''', esp32_data=esp32_data)
+    timing_mark('render')
+    return html
 
 @app.route('/data', methods=['GET', 'POST'])
 def receive_sensor_data():
     """Receive sensor data from ESP32"""
-    import sys
+    global latest_device_features
     try:
         if request.method == 'POST':
             data = request.get_json() or {}
+            timing_mark('parse')
             temperature1 = data.get('temperature1')
             humidity1 = data.get('humidity1')
             temperature2 = data.get('temperature2')
@@ -730,29 +885,18 @@ def receive_sensor_data():
             if soil_moisture1 is None: soil_moisture1 = 0.0
             if soil_moisture2 is None: soil_moisture2 = 0.0
             if uv_index is None: uv_index = 0.0
+            device_id = str(data.get('device_id') or DEFAULT_DEVICE_ID)
+            timing_mark('validate')
 
             # Guardar en Supabase
-            save_success = save_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_moisture1, soil_moisture2, uv_index)
+            save_success = save_sensor_data(temperature1, humidity1, temperature2, humidity2, soil_moisture1, soil_moisture2, uv_index, device_id)
+            timing_mark('storage')
             
             if not save_success:
-                error_msg = "WARNING: Data received but failed to save to Supabase"
-                sys.stderr.write(error_msg + "\n")
-                server_logs.append({
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'level': 'WARNING',
-                    'message': error_msg
-                })
-                if len(server_logs) > 100:
-                    server_logs.pop(0)
+                log_event('WARNING', "WARNING: Data received but failed to save to Supabase", device_id)
             else:
                 # Log exito
-                server_logs.append({
-                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'level': 'INFO',
-                    'message': f"Data received and saved successfully from ESP32"
-                })
-                if len(server_logs) > 100:
-                    server_logs.pop(0)
+                log_event('INFO', f"Data received and saved successfully from ESP32", device_id)
 
             esp32_data['sensor_data'] = {
                 'temperature1': float(temperature1),
@@ -764,11 +908,32 @@ def receive_sensor_data():
                 'uv_index': float(uv_index),
                 'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
+            # Actualizar ventana temporal del dispositivo (O(1), sin consultar historial)
+            received_at = time.time()
+            device_features = temporal_tracker.update(device_id, received_at, esp32_data['sensor_data'])
+            latest_device_features = device_features
+            try:
+                dryout_forecaster.update(device_id, received_at, esp32_data['sensor_data'])
+            except Exception as e:
+                # Un pronostico fallido no debe impedir registrar la lectura
+                log_event('WARNING', f"WARNING: Dryout forecast update failed: {str(e)}", device_id, exc_info=True)
+            device_liveness.record(device_id, received_at)
+            if online_learner is not None:
+                try:
+                    online_learner.observe(device_id, esp32_data['sensor_data'], device_features)
+                except Exception as e:
+                    log_event('WARNING', f"WARNING: Online model update failed: {str(e)}", device_id, exc_info=True)
+            if drift_monitor is not None:
+                try:
+                    drift_monitor.update(device_id, esp32_data['sensor_data'])
+                except Exception as e:
+                    log_event('WARNING', f"WARNING: Drift monitor update failed: {str(e)}", device_id, exc_info=True)
             # Actualizar timestamp del ultimo dato recibido
             esp32_data['last_data_received'] = datetime.now()
             esp32_data['esp32_status'] = 'connected'
             esp32_data['connection_status'] = 'connected'
             esp32_data['last_connection_check'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            timing_mark('state')
 
             response = {
                 'status': 'success',
@@ -776,64 +941,69 @@ def receive_sensor_data():
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'data': esp32_data['sensor_data']
             }
+            if model_registry is not None:
+                # Modelo del dispositivo desde la cache (sin disco ni base de datos si ya esta cargado).
+                # La lectura ya esta guardada: si el modelo del dispositivo falla se usa el
+                # global en vez de responder 500 (el ESP32 reenviaria y duplicaria la fila)
+                try:
+                    model = model_registry.get(device_id)
+                    result = model.predict_with_temporal(esp32_data['sensor_data'], device_features)
+                except Exception as e:
+                    log_event('WARNING', f"WARNING: Device model failed, using global model: {str(e)}", device_id, exc_info=True)
+                    model = model_registry.fallback
+                    result = model.predict_with_temporal(esp32_data['sensor_data'], device_features)
+                response['prediction'] = {
+                    'prediction': result.prediction,
+                    'score': result.score,
+                    'confidence': round(result.confidence, 2),
+                    'model_version': model.version
+                }
+                if shadow_scorer is not None:
+                    try:
+                        shadow_scorer.observe(device_id, esp32_data['sensor_data'], result, device_features)
+                    except Exception as e:
+                        log_event('WARNING', f"WARNING: Shadow scoring failed: {str(e)}", device_id, exc_info=True)
+                timing_mark('predict')
             return jsonify(response)
         else:
-            return jsonify(esp32_data)
+            status = esp32_status()
+            return jsonify({**esp32_data, 'esp32_status': status, 'connection_status': status})
     except Exception as e:
-        import sys
-        sys.stderr.write(f"ERROR in receive_sensor_data: {str(e)}\n")
-        import traceback
-        traceback.print_exc()
+        log_event('ERROR', f"ERROR in receive_sensor_data: {str(e)}", exc_info=True)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/latest-data')
 def latest_data():
     """Get latest sensor data from Supabase"""
-    import sys
     try:
         success = load_latest_data_from_supabase()
+        timing_mark('storage')
         if success:
-            server_logs.append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'level': 'INFO',
-                'message': 'Latest data loaded from Supabase successfully'
-            })
+            log_event('INFO', 'Latest data loaded from Supabase successfully')
         else:
-            server_logs.append({
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'level': 'WARNING',
-                'message': 'Failed to load data from Supabase or no data available'
-            })
-        if len(server_logs) > 100:
-            server_logs.pop(0)
+            log_event('WARNING', 'Failed to load data from Supabase or no data available')
         
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'sensor_data': esp32_data['sensor_data'],
-            'esp32_status': esp32_data['esp32_status'],
+            'esp32_status': esp32_status(),
             'last_update': esp32_data['sensor_data'].get('last_update', 'N/A')
         })
+        timing_mark('serialize')
+        return response
     except Exception as e:
-        error_msg = f"ERROR in latest_data: {str(e)}"
-        sys.stderr.write(error_msg + "\n")
-        server_logs.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'level': 'ERROR',
-            'message': error_msg
-        })
-        if len(server_logs) > 100:
-            server_logs.pop(0)
+        log_event('ERROR', f"ERROR in latest_data: {str(e)}", exc_info=True)
         return jsonify({
             'status': 'error',
             'sensor_data': esp32_data.get('sensor_data', {}),
-            'esp32_status': esp32_data.get('esp32_status', 'disconnected'),
+            'esp32_status': esp32_status(),
             'error': str(e)
         })
 
 @app.route('/communication-test', methods=['GET', 'POST'])
 def communication_test():
     """Handle communication test request"""
-    global communication_test_queue, data_request_queue
+    global communication_test_queue
     
     if request.method == 'POST':
         # ESP32 sending confirmation
@@ -842,6 +1012,7 @@ def communication_test():
             if data.get('response') == 'conectado':
                 esp32_data['last_communication_test'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 esp32_data['last_data_received'] = datetime.now()  # Actualizar timestamp de ultimo contacto
+                device_liveness.contact(str(data.get('device_id') or DEFAULT_DEVICE_ID))
                 esp32_data['esp32_status'] = 'connected'
                 esp32_data['connection_status'] = 'connected'
                 esp32_data['last_connection_check'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -873,16 +1044,13 @@ def communication_test():
         if communication_test_queue:
             communication_test_queue = False
         
-        if data_request_queue:
-            data_request_queue = False
+        # data_request solo se informa: el firmware lo lee (y se limpia) en
+        # /data-request, que consulta justo despues. Limpiarlo aqui perdia la solicitud
         
         return jsonify(response)
     except Exception as e:
-        import sys
         error_msg = f"ERROR in communication_test GET: {str(e)}"
-        sys.stderr.write(error_msg + "\n")
-        import traceback
-        traceback.print_exc()
+        log_event('ERROR', error_msg, exc_info=True)
         return jsonify({
             'status': 'error',
             'message': error_msg,
@@ -910,69 +1078,285 @@ def request_data():
     global data_request_queue
     try:
         data_request_queue = True
-        server_logs.append({
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'level': 'INFO',
-            'message': 'Data request queued for ESP32'
-        })
-        if len(server_logs) > 100:
-            server_logs.pop(0)
+        log_event('INFO', 'Data request queued for ESP32')
         return jsonify({
             'status': 'success',
             'message': 'Data request queued. ESP32 will send data within 10 seconds.'
         })
     except Exception as e:
-        import sys
-        error_msg = f"ERROR in request_data: {str(e)}"
-        sys.stderr.write(error_msg + "\n")
+        log_event('ERROR', f"ERROR in request_data: {str(e)}", exc_info=True)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 @app.route('/logs')
 def get_logs():
-    """Get server logs for debugging"""
+    """
+    Get server logs for debugging
+    
+    Filtros opcionales: ?level=, ?since= / ?until= (epoch o 'YYYY-mm-dd HH:MM:SS'),
+    ?device_id=, ?limit= (default 50) y ?cursor= (seq de la ultima entrada ya leida)
+    """
+    args = request.args
+    level = args.get('level')
+    try:
+        limit = max(1, min(int(args.get('limit', 50)), log_store.capacity))
+        cursor = int(args['cursor']) if args.get('cursor') else None
+        logs, next_cursor, has_more = log_store.query(
+            level=level.upper() if level else None,
+            since=args.get('since'),
+            until=args.get('until'),
+            device_id=args.get('device_id'),
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Parametro invalido: {str(e)}'}), 400
+    
+    return jsonify({
+        'status': 'success',
+        'logs': logs,
+        'total_logs': len(log_store),
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'counts': log_store.counts()
+    })
+
+@app.route('/temporal-features')
+def temporal_features():
+    """Caracteristicas temporales (pendiente, EWMA, min/max) de la humedad de suelo por dispositivo"""
+    device_id = request.args.get('device_id')
+    if device_id:
+        features = temporal_tracker.features(device_id)
+        if features is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'No hay lecturas recientes del dispositivo {device_id}'
+            }), 404
+        return jsonify({'status': 'success', 'device_id': device_id, 'features': features})
+    
+    return jsonify({
+        'status': 'success',
+        'devices': {device: temporal_tracker.features(device) for device in temporal_tracker.devices()}
+    })
+
+@app.route('/dryout-forecast')
+def dryout_forecast():
+    """Estimacion de cuando cada sensor de humedad de suelo cruzara el umbral de sequedad"""
+    device_id = request.args.get('device_id')
+    threshold = request.args.get('threshold')
+    try:
+        threshold = float(threshold) if threshold is not None else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'threshold debe ser numerico'}), 400
+    if threshold is not None and not math.isfinite(threshold):
+        return jsonify({'status': 'error', 'message': 'threshold debe ser un numero finito'}), 400
+    
+    if device_id:
+        forecast = dryout_forecaster.forecast(device_id, threshold)
+        if forecast is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'No hay lecturas del dispositivo {device_id}'
+            }), 404
+        return jsonify({'status': 'success', 'forecast': forecast})
+    
+    return jsonify({
+        'status': 'success',
+        'forecasts': [dryout_forecaster.forecast(device, threshold) for device in dryout_forecaster.devices()]
+    })
+
+@app.route('/online-model')
+def online_model():
+    """Estado del modelo de riego en linea (RLS) y su comparacion con el modelo en lote"""
+    if online_learner is None:
+        return jsonify({'status': 'error', 'message': 'Predictor de riego no disponible'}), 500
+    
+    result = {'status': 'success', 'model': online_learner.stats()}
+    # Prediccion de ambos modelos para la ultima lectura recibida, con sus
+    # caracteristicas temporales (igual que en /data)
+    if esp32_data.get('last_data_received'):
+        latest = esp32_data['sensor_data']
+        result['latest_prediction'] = {}
+        for name, model in (('online', online_learner.published), ('batch', online_learner.base)):
+            prediction = model.predict_with_temporal(latest, latest_device_features)
+            result['latest_prediction'][name] = {
+                'prediction': prediction.prediction,
+                'score': prediction.score,
+                'confidence': round(prediction.confidence, 2),
+                'threshold': prediction.threshold
+            }
+    return jsonify(result)
+
+@app.route('/models')
+def models_status():
+    """Estado de la cache de modelos por dispositivo"""
+    if model_registry is None:
+        return jsonify({'status': 'error', 'message': 'Predictor de riego no disponible'}), 500
+    return jsonify({'status': 'success', 'registry': model_registry.stats()})
+
+@app.route('/shadow-metrics')
+def shadow_metrics():
+    """Metricas de los modelos candidatos evaluados en sombra"""
+    if shadow_scorer is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'No hay modelos en sombra. Configura SHADOW_MODEL_PATHS.'
+        }), 404
+    try:
+        limit = int(request.args.get('log', 20))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'log debe ser un entero'}), 400
     return jsonify({
         'status': 'success',
-        'logs': server_logs[-50:],  # Ultimos 50 logs
-        'total_logs': len(server_logs)
+        'metrics': shadow_scorer.metrics(),
+        'recent': shadow_scorer.recent(limit)
+    })
+
+@app.route('/drift')
+def drift():
+    """Deriva (PSI/KS) de las lecturas recientes de cada dispositivo frente al entrenamiento"""
+    if drift_monitor is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'El modelo no tiene histogramas de referencia. Usa IRRIGATION_MODEL_PATH con un artefacto de --save-model.'
+        }), 404
+    
+    device_id = request.args.get('device_id')
+    if device_id:
+        scores = drift_monitor.scores(device_id)
+        if scores is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'No hay lecturas del dispositivo {device_id}'
+            }), 404
+        return jsonify({'status': 'success', 'drift': scores})
+    
+    return jsonify({
+        'status': 'success',
+        'devices': [drift_monitor.scores(device) for device in drift_monitor.devices()]
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Métricas en formato de texto de Prometheus (latencia por ruta y del almacenamiento)"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+@admin_required
+def admin_profile():
+    """
+    Perfilado de las próximas peticiones
+    
+    POST: arma el perfilador. JSON: mode ('cprofile' o 'sampling'), requests, seconds, interval
+          (409 si hay peticiones de la sesión anterior perfilándose)
+    GET: estado; con ?format=text|pstats|collapsed devuelve el resultado acumulado
+    DELETE: desarma el perfilador
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            request_profiler.arm(
+                mode=data.get('mode', 'cprofile'),
+                requests=int(data['requests']) if data.get('requests') is not None else None,
+                seconds=float(data['seconds']) if data.get('seconds') is not None else None,
+                interval=float(data.get('interval', PROFILE_SAMPLE_INTERVAL))
+            )
+        except (TypeError, ValueError) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        except ProfilerBusy as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 409
+        log_event('INFO', f"Profiler armed: {request_profiler.status()}")
+        return jsonify({'status': 'success', 'profiler': request_profiler.status()})
+    
+    if request.method == 'DELETE':
+        request_profiler.disarm()
+        return jsonify({'status': 'success', 'profiler': request_profiler.status()})
+    
+    fmt = request.args.get('format')
+    if not fmt:
+        return jsonify({'status': 'success', 'profiler': request_profiler.status()})
+    try:
+        report = request_profiler.report(
+            fmt,
+            sort=request.args.get('sort', 'cumulative'),
+            limit=request.args.get('limit', 50, type=int)
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if report is None:
+        return jsonify({'status': 'error', 'message': 'Todavia no hay peticiones perfiladas'}), 404
+    if fmt == 'pstats':
+        return Response(report, mimetype='application/octet-stream',
+                        headers={'Content-Disposition': 'attachment; filename=profile.pstats'})
+    return Response(report, mimetype='text/plain')
+
+@app.route('/admin/memory')
+@admin_required
+def admin_memory():
+    """RSS, tamano de las estructuras vigiladas y su crecimiento (?samples=N muestras recientes)"""
+    status = memory_tracker.status()
+    status['recent'] = memory_tracker.recent(request.args.get('samples', 0, type=int))
+    return jsonify({'status': 'success', 'memory': status})
+
+@app.route('/admin/memory/snapshot', methods=['POST', 'DELETE'])
+@admin_required
+def admin_memory_snapshot():
+    """
+    POST: snapshot de tracemalloc y sitios de asignacion que mas crecieron desde el anterior
+          (?limit=20, ?key=lineno|filename|traceback). El primero activa tracemalloc.
+    DELETE: apaga tracemalloc
+    """
+    if request.method == 'DELETE':
+        memory_tracker.stop_tracing()
+        return jsonify({'status': 'success', 'tracing': False})
+    try:
+        result = memory_tracker.take_snapshot(
+            limit=request.args.get('limit', 20, type=int),
+            key_type=request.args.get('key', 'lineno')
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'snapshot': result})
+
+@app.route('/admin/memory/types')
+@admin_required
+def admin_memory_types():
+    """Objetos por tipo con la diferencia contra la consulta anterior (recorre todo el heap)"""
+    return jsonify({
+        'status': 'success',
+        'types': memory_tracker.type_counts(request.args.get('limit', 20, type=int))
     })
 
 @app.route('/connection-status')
 def connection_status():
     """Get ESP32 connection status"""
-    # Verificar si el ESP32 esta realmente conectado
-    # El ESP32 envia datos cada 5 minutos, asi que si no hay datos en 7 minutos, esta desconectado
-    is_connected = False
-    connection_status_str = 'disconnected'
-    
-    last_data = esp32_data.get('last_data_received')
-    if last_data:
-        # Calcular tiempo transcurrido desde el ultimo dato
-        time_diff = (datetime.now() - last_data).total_seconds()
-        # Si han pasado menos de 7 minutos (420 segundos), esta conectado
-        if time_diff < 420:  # 7 minutos = 420 segundos
-            is_connected = True
-            connection_status_str = 'connected'
-        else:
-            # Ha pasado mas de 7 minutos, marcar como desconectado
-            is_connected = False
-            connection_status_str = 'disconnected'
-            esp32_data['esp32_status'] = 'disconnected'
-            esp32_data['connection_status'] = 'disconnected'
-    else:
-        # Nunca se ha recibido un dato
-        is_connected = False
-        connection_status_str = 'disconnected'
-        esp32_data['esp32_status'] = 'disconnected'
-        esp32_data['connection_status'] = 'disconnected'
+    # Estado calculado al recibir datos segun el ritmo propio del dispositivo
+    # (ver device_liveness.py); esta consulta no modifica el estado
+    state = latest_connection()
+    is_connected = state is not None and state['status'] != 'disconnected'
+    last_seen = datetime.fromtimestamp(state['last_seen']) if state else None
     
     return jsonify({
         'status': 'success',
         'connected': is_connected,
-        'connection_status': connection_status_str,
+        'connection_status': 'connected' if is_connected else 'disconnected',
         'last_check': esp32_data.get('last_connection_check', None),
         'last_communication_test': esp32_data.get('last_communication_test', None),
-        'last_data_received': last_data.strftime('%Y-%m-%d %H:%M:%S') if last_data else None,
-        'seconds_since_last_data': (datetime.now() - last_data).total_seconds() if last_data else None
+        'last_data_received': last_seen.strftime('%Y-%m-%d %H:%M:%S') if last_seen else None,
+        'seconds_since_last_data': state['seconds_since_last_seen'] if state else None,
+        'device': state
+    })
+
+@app.route('/devices/status')
+def devices_status():
+    """Estado de conexion y estadisticas de llegada de todos los dispositivos (?status= para filtrar)"""
+    devices, summary = device_liveness.all_statuses()
+    wanted = request.args.get('status')
+    if wanted:
+        devices = [device for device in devices if device['status'] == wanted]
+    return jsonify({
+        'status': 'success',
+        'summary': summary,
+        'devices': devices
     })
 
 @app.route('/predict-irrigation', methods=['POST'])
@@ -982,7 +1366,7 @@ def predict_irrigation():
     La predicción se hace en la computadora local con scikit-learn
     """
     try:
-        if not SUPABASE_AVAILABLE or not get_latest_irrigation_prediction:
+        if not SUPABASE_AVAILABLE:
             return jsonify({
                 'status': 'error',
                 'message': 'Supabase no disponible o función de predicción no configurada'
@@ -1004,7 +1388,7 @@ def predict_irrigation():
             'prediction': prediction_data.get('prediction', 'No regar'),
             'score': float(prediction_data.get('score', 0.0)),
             'confidence': float(prediction_data.get('confidence', 0.0)),
-            'threshold': THRESHOLD if 'THRESHOLD' in globals() else 0.5,
+            'threshold': float(THRESHOLD if prediction_data.get('threshold') is None else prediction_data['threshold']),
             'timestamp': prediction_data.get('timestamp', 'N/A'),
             'sensor_data_used': {
                 'uv_index': prediction_data.get('uv_index'),
@@ -0,0 +1,275 @@
+"""
+Perfilado bajo demanda de las próximas peticiones del servidor
+Versión sin dependencias pesadas (solo biblioteca estándar + Flask) para Vercel
+
+Se arma desde `/admin/profile` para las próximas N peticiones o los próximos
+T segundos (lo que termine antes) con uno de dos modos:
+
+    - cprofile: cProfile sobre cada petición; las estadísticas se suman en un
+      solo pstats. Solo se perfila una petición a la vez (cProfile no admite
+      dos perfiladores activos); las concurrentes se cuentan como omitidas.
+    - sampling: un hilo toma la pila de los hilos que atienden peticiones cada
+      PROFILE_SAMPLE_INTERVAL segundos y cuenta pilas colapsadas
+      ("a;b;c 12"), el formato de entrada de flamegraph.pl y speedscope.
+      El costo sobre la petición es casi nulo.
+
+Desarmado, el hook de cada petición solo comprueba un booleano.
+"""
+
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+MODES = ('cprofile', 'sampling')
+DEFAULT_REQUESTS = 20
+MAX_REQUESTS = 1000
+MAX_SECONDS = 600
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+# Peticiones que nunca se perfilan (el propio endpoint de control)
+EXCLUDED_PREFIX = '/admin/'
+
+
+class ProfilerBusy(RuntimeError):
+    """Se intentó rearmar con peticiones de la sesión anterior todavía en curso"""
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class RequestProfiler:
+    """Perfilador que se arma para un número de peticiones o un tiempo acotado"""
+
+    def __init__(self):
+        self.armed = False
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._stop = None
+        self._sampler = None
+        self.mode = None
+        self._reset()
+
+    def _reset(self):
+        self.remaining = None
+        self.deadline = None
+        self.armed_at = None
+        self.profiled = 0
+        self.skipped = 0
+        self._stats = None
+        self._samples = Counter()
+        self._active = set()
+
+    def arm(self, mode='cprofile', requests=None, seconds=None, interval=PROFILE_SAMPLE_INTERVAL):
+        """
+        Descarta el resultado anterior y empieza a perfilar
+
+        Raises:
+            ValueError: parámetros fuera de rango
+            ProfilerBusy: hay peticiones perfilándose; sus resultados se
+                mezclarían con la nueva sesión
+
+        Args:
+            mode: 'cprofile' o 'sampling'
+            requests: peticiones a perfilar (DEFAULT_REQUESTS si no se indica ni `seconds`)
+            seconds: tiempo máximo armado
+            interval: segundos entre muestras (modo sampling)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Modo desconocido: {mode} (usa {', '.join(MODES)})")
+        if requests is None and seconds is None:
+            requests = DEFAULT_REQUESTS
+        if requests is not None and not 0 < requests <= MAX_REQUESTS:
+            raise ValueError(f'requests debe estar entre 1 y {MAX_REQUESTS}')
+        if seconds is not None and not 0 < seconds <= MAX_SECONDS:
+            raise ValueError(f'seconds debe estar entre 0 y {MAX_SECONDS}')
+        if interval <= 0:
+            raise ValueError('interval debe ser positivo')
+
+        with self._lock:
+            if self._busy.locked() or self._active:
+                raise ProfilerBusy('Hay peticiones perfilándose; espera a que terminen o desarma primero')
+            # Desde aquí ninguna petición nueva obtiene un token de esta sesión
+            self.armed = False
+        self.disarm()
+        with self._lock:
+            self._reset()
+            self.mode = mode
+            self.remaining = requests
+            self.deadline = time.monotonic() + seconds if seconds is not None else None
+            self.armed_at = time.time()
+            if mode == 'sampling':
+                self._stop = threading.Event()
+                self._sampler = threading.Thread(target=self._sample_loop, args=(self._stop, interval),
+                                                 name='request-profiler', daemon=True)
+                self._sampler.start()
+            self.armed = True
+
+    def disarm(self):
+        """Deja de perfilar (conserva lo acumulado para `report`)"""
+        with self._lock:
+            self.armed = False
+            stop, sampler = self._stop, self._sampler
+            self._stop = self._sampler = None
+        if stop is not None:
+            stop.set()
+            if sampler is not threading.current_thread():
+                sampler.join()
+
+    def _expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def start(self):
+        """Inicio de una petición con el perfilador armado; devuelve un token o None"""
+        with self._lock:
+            if not self.armed or (self.remaining is not None and self.remaining <= 0):
+                return None
+            if self._expired():
+                expired = True
+            else:
+                expired = False
+                if self.mode == 'cprofile' and not self._busy.acquire(blocking=False):
+                    self.skipped += 1
+                    return None
+                if self.remaining is not None:
+                    self.remaining -= 1
+                mode = self.mode
+        if expired:
+            self.disarm()
+            return None
+
+        if mode == 'sampling':
+            ident = threading.get_ident()
+            with self._lock:
+                self._active.add(ident)
+            return ident
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Otro perfilador (depurador, coverage) ya está activo en el proceso
+            with self._lock:
+                self.skipped += 1
+            self._busy.release()
+            return None
+        return profile
+
+    def finish(self, token):
+        """Fin de una petición que devolvió un token en `start`"""
+        if isinstance(token, int):
+            with self._lock:
+                self._active.discard(token)
+                self.profiled += 1
+                done = self.remaining == 0 and not self._active
+        else:
+            token.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(token)
+                else:
+                    self._stats.add(token)
+                self.profiled += 1
+                done = self.remaining == 0
+            self._busy.release()
+        if done:
+            self.disarm()
+
+    def _sample_loop(self, stop, interval):
+        while not stop.wait(interval):
+            if self._expired():
+                self.disarm()
+                return
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            stacks = []
+            for ident in active:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    stacks.append(';'.join(reversed(stack)))
+            with self._lock:
+                self._samples.update(stacks)
+
+    def status(self):
+        with self._lock:
+            seconds_left = None
+            if self.armed and self.deadline is not None:
+                seconds_left = round(max(0.0, self.deadline - time.monotonic()), 1)
+            return {
+                'armed': self.armed,
+                'mode': self.mode,
+                'armed_at': self.armed_at,
+                'remaining_requests': self.remaining if self.armed else None,
+                'seconds_left': seconds_left,
+                'profiled_requests': self.profiled,
+                'skipped_requests': self.skipped,
+                'samples': sum(self._samples.values()),
+            }
+
+    def report(self, fmt='text', sort='cumulative', limit=50):
+        """
+        Resultado acumulado
+
+        Args:
+            fmt: 'text' (tabla de pstats), 'pstats' (binario para snakeviz/gprof2dot)
+                 o 'collapsed' (pilas colapsadas, modo sampling)
+            sort / limit: orden y número de filas del formato 'text'
+
+        Returns:
+            str o bytes (None si todavía no hay datos)
+        """
+        with self._lock:
+            if fmt == 'collapsed':
+                if self.mode != 'sampling':
+                    raise ValueError("El formato 'collapsed' requiere el modo 'sampling'")
+                if not self._samples:
+                    return None
+                return ''.join(f'{stack} {count}\n' for stack, count in self._samples.most_common())
+            if fmt not in ('text', 'pstats'):
+                raise ValueError(f'Formato desconocido: {fmt}')
+            if self.mode != 'cprofile':
+                raise ValueError(f"El formato '{fmt}' requiere el modo 'cprofile'")
+            if self._stats is None:
+                return None
+            if fmt == 'pstats':
+                # Mismo contenido que pstats.Stats.dump_stats
+                return marshal.dumps(self._stats.stats)
+            stream = io.StringIO()
+            self._stats.stream = stream
+            self._stats.sort_stats(sort).print_stats(limit)
+            return stream.getvalue()
+
+
+profiler = RequestProfiler()
+
+
+def init_app(app):
+    """Registra en la app de Flask los hooks que perfilan las peticiones mientras esté armado"""
+    from flask import g, request
+
+    @app.before_request
+    def _profile_start():
+        if not profiler.armed:
+            return
+        if request.path.startswith(EXCLUDED_PREFIX):
+            return
+        g.profile_token = profiler.start()
+
+    @app.teardown_request
+    def _profile_finish(exc):
+        token = g.pop('profile_token', None)
+        if token is not None:
+            profiler.finish(token)
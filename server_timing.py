@@ -0,0 +1,73 @@
+"""
+Desglose por fases del tiempo de cada petición (cabecera Server-Timing)
+Versión sin dependencias pesadas (solo biblioteca estándar + Flask) para Vercel
+
+Dentro de un endpoint se llama `mark('fase')` al terminar cada fase; la
+duración de la fase es el tiempo desde la marca anterior (o desde el inicio de
+la petición). Al responder se agrega la cabecera
+
+    Server-Timing: parse;dur=0.12, storage;dur=85.40, state;dur=0.31, total;dur=86.10
+
+que muestran las herramientas de desarrollo del navegador y que el firmware
+puede imprimir. Con SERVER_TIMING_SAMPLE_RATE > 0 esa fracción de peticiones
+también se registra en el histograma `server_timing_phase_seconds` de /metrics.
+
+Con SERVER_TIMING=0 `mark` solo comprueba un booleano y retorna.
+"""
+
+import os
+import random
+import time
+
+from metrics import registry
+
+ENABLED = os.getenv('SERVER_TIMING', '1') != '0'
+SAMPLE_RATE = float(os.getenv('SERVER_TIMING_SAMPLE_RATE', '0'))
+
+
+def mark(phase):
+    """Cierra la fase `phase` de la petición en curso"""
+    if not ENABLED:
+        return
+    from flask import g
+    timings = g.get('server_timing')
+    if timings is None:
+        return
+    now = time.perf_counter()
+    timings.append((phase, now - g.server_timing_last))
+    g.server_timing_last = now
+
+
+def format_header(timings, total=None):
+    """Valor de la cabecera Server-Timing (duraciones en milisegundos)"""
+    parts = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in timings]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def init_app(app):
+    """Registra en la app de Flask los hooks que inician y emiten el desglose"""
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _server_timing_start():
+        g.server_timing = []
+        g.server_timing_start = g.server_timing_last = time.perf_counter()
+
+    @app.after_request
+    def _server_timing_emit(response):
+        timings = g.pop('server_timing', None)
+        if not timings:
+            return response
+        total = time.perf_counter() - g.server_timing_start
+        response.headers['Server-Timing'] = format_header(timings, total)
+        if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+            rule = request.url_rule
+            route = rule.rule if rule is not None else 'unmatched'
+            for phase, seconds in timings:
+                registry.observe('server_timing_phase_seconds',
+                                 (('route', route), ('phase', phase)), seconds)
+        return response
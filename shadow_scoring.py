@@ -0,0 +1,173 @@
+"""
+Evaluación en sombra de modelos candidatos
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Cada lectura recibida se puntúa también con uno o más modelos candidatos
+(artefactos en SHADOW_MODEL_PATHS, separados por coma). Los coeficientes de
+los candidatos se apilan en una matriz, así que puntuar todos es un solo
+producto matriz-vector pequeño en lugar de N llamadas a `predict`.
+
+La respuesta al dispositivo siempre usa el modelo de producción; los
+resultados de los candidatos solo se registran en un log compacto (anillo
+de tuplas) y en métricas acumuladas:
+    - acuerdo con la decisión de producción
+    - exactitud y MSE contra la etiqueta, que se conoce con la siguiente
+      lectura del dispositivo (regla de humedad 100, igual que el entrenamiento)
+
+La última lectura pendiente de etiqueta se guarda para a lo sumo
+MAX_TRACKED_DEVICES dispositivos (LRU).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from operator import mul
+
+from irrigation_predictor import (
+    DEFAULT_FEATURES, MAX_TRACKED_DEVICES, IrrigationPredictor, is_irrigation_reading, load_model_artifact,
+)
+
+SHADOW_MODEL_PATHS = os.getenv('SHADOW_MODEL_PATHS', '')
+SHADOW_LOG_SIZE = int(os.getenv('SHADOW_LOG_SIZE', '1000'))
+
+
+class _ModelMetrics:
+    """Contadores incrementales de un modelo"""
+
+    __slots__ = ('scored', 'agree', 'labeled', 'correct', 'squared_error')
+
+    def __init__(self):
+        self.scored = 0
+        self.agree = 0
+        self.labeled = 0
+        self.correct = 0
+        self.squared_error = 0.0
+
+    def summary(self):
+        return {
+            'scored': self.scored,
+            'agreement': round(self.agree / self.scored, 4) if self.scored else None,
+            'labeled': self.labeled,
+            'accuracy': round(self.correct / self.labeled, 4) if self.labeled else None,
+            'mse': round(self.squared_error / self.labeled, 6) if self.labeled else None,
+        }
+
+
+class ShadowScorer:
+    """Puntúa candidatos junto al modelo de producción sin afectar la respuesta"""
+
+    def __init__(self, candidates, names=None, log_size=SHADOW_LOG_SIZE, max_devices=MAX_TRACKED_DEVICES):
+        """
+        Args:
+            candidates: lista de IrrigationPredictor candidatos
+            names: nombre de cada candidato (por defecto su versión)
+            log_size: entradas máximas del log de puntuaciones
+            max_devices: dispositivos con lectura pendiente de etiqueta
+        """
+        self.candidates = list(candidates)
+        self.names = list(names) if names else [model.version for model in self.candidates]
+        # Columnas: las cinco características más las temporales que use algún candidato
+        temporal = []
+        for model in self.candidates:
+            temporal.extend(name for name in model.temporal_coefficients if name not in temporal)
+        self.temporal_columns = temporal
+        # Matriz de coeficientes (una fila por candidato) e interceptos
+        self.matrix = [
+            tuple(model.coefficients) + tuple(model.temporal_coefficients.get(name, 0.0) for name in temporal)
+            for model in self.candidates
+        ]
+        self.intercepts = [model.intercept for model in self.candidates]
+        self.thresholds = [model.threshold for model in self.candidates]
+        self.log = deque(maxlen=log_size)
+        self.max_devices = max(1, int(max_devices))
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._production = _ModelMetrics()
+        self._metrics = [_ModelMetrics() for _ in self.candidates]
+
+    @classmethod
+    def from_paths(cls, paths=SHADOW_MODEL_PATHS, log_size=SHADOW_LOG_SIZE):
+        """Crea el evaluador desde rutas de artefactos separadas por coma (None si no hay)"""
+        paths = [path.strip() for path in paths.split(',') if path.strip()]
+        if not paths:
+            return None
+        candidates = [IrrigationPredictor.from_artifact(load_model_artifact(path)) for path in paths]
+        return cls(candidates, [os.path.basename(path) for path in paths], log_size)
+
+    def score(self, reading, temporal_features=None):
+        """Scores de todos los candidatos (producto matriz-vector)"""
+        get = reading.get
+        x = [get(name, 0) for name in DEFAULT_FEATURES]
+        if self.temporal_columns:
+            tf = temporal_features or {}
+            x.extend(tf.get(name, 0.0) for name in self.temporal_columns)
+        return [b + sum(map(mul, row, x)) for b, row in zip(self.intercepts, self.matrix)]
+
+    def observe(self, device_id, reading, production_result, temporal_features=None):
+        """
+        Registra una lectura ya puntuada por producción
+
+        Args:
+            device_id: dispositivo que envió la lectura
+            reading: dict con las lecturas
+            production_result: PredictionResult del modelo de producción
+            temporal_features: características temporales del dispositivo (opcional)
+        """
+        scores = self.score(reading, temporal_features)
+        production_regar = production_result.score >= production_result.threshold
+        decisions = [score >= t for score, t in zip(scores, self.thresholds)]
+
+        with self._lock:
+            # La etiqueta de la lectura anterior del dispositivo se conoce ahora
+            previous = self._pending.pop(device_id, None)
+            if previous is not None:
+                label = 1.0 if is_irrigation_reading(reading) else 0.0
+                self._add_label(self._production, previous[0], previous[1], label)
+                for metrics, score, decision in zip(self._metrics, previous[2], previous[3]):
+                    self._add_label(metrics, score, decision, label)
+            self._pending[device_id] = (production_result.score, production_regar, scores, decisions)
+            if len(self._pending) > self.max_devices:
+                self._pending.popitem(last=False)
+
+            self._production.scored += 1
+            self._production.agree += 1
+            for metrics, decision in zip(self._metrics, decisions):
+                metrics.scored += 1
+                metrics.agree += decision == production_regar
+
+            self.log.append((time.time(), device_id, production_result.score, tuple(scores)))
+
+    @staticmethod
+    def _add_label(metrics, score, decision, label):
+        metrics.labeled += 1
+        metrics.correct += decision == (label == 1.0)
+        metrics.squared_error += (label - score) ** 2
+
+    def metrics(self):
+        """Métricas acumuladas de producción y de cada candidato"""
+        with self._lock:
+            return self._summary()
+
+    def _summary(self):
+        return {
+            'production': self._production.summary(),
+            'candidates': [
+                dict(name=name, version=model.version, **metrics.summary())
+                for name, model, metrics in zip(self.names, self.candidates, self._metrics)
+            ],
+        }
+
+    def recent(self, limit=20):
+        """Últimas entradas del log, de la más antigua a la más reciente"""
+        with self._lock:
+            entries = list(self.log)[-limit:] if limit > 0 else []
+        return [
+            {
+                'timestamp': ts,
+                'device_id': device_id,
+                'production_score': production_score,
+                'candidate_scores': dict(zip(self.names, scores)),
+            }
+            for ts, device_id, production_score, scores in entries
+        ]
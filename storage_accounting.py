@@ -0,0 +1,179 @@
+"""
+Conteo de idas y vueltas al almacenamiento (Supabase) por petición y por ruta
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+`CountingClient` envuelve el cliente de Supabase: cada `.execute()` de un
+query (`table(...)` o `rpc(...)`) cuenta como una ida y vuelta, con las filas
+devueltas. Su tamaño aproximado (JSON de `result.data`) obliga a volver a
+serializar cada resultado, así que solo se mide en modo debug y dentro de
+`track()`. Los totales van a /metrics por ruta y tabla:
+    - storage_round_trips_total, storage_rows_total, storage_bytes_total
+    - storage_requests_over_budget_total (peticiones que superaron el presupuesto)
+
+Presupuesto por petición: STORAGE_BUDGET_ROUND_TRIPS y STORAGE_BUDGET_ROWS.
+En modo debug (app.debug o STORAGE_ACCOUNTING_DEBUG=1) cada petición que lo
+supera deja un WARNING y todas las respuestas llevan la cabecera
+`X-Storage-Usage`, así las consultas de más (N+1, recargas redundantes) se ven
+en pruebas y benchmarks. Fuera de una petición se mide con `track()`.
+"""
+
+import contextlib
+import json
+import os
+from contextvars import ContextVar
+
+from metrics import registry
+
+STORAGE_BUDGET_ROUND_TRIPS = int(os.getenv('STORAGE_BUDGET_ROUND_TRIPS', '2'))
+STORAGE_BUDGET_ROWS = int(os.getenv('STORAGE_BUDGET_ROWS', '500'))
+STORAGE_ACCOUNTING_DEBUG = os.getenv('STORAGE_ACCOUNTING_DEBUG', '0') == '1'
+
+
+class StorageUsage:
+    """Idas y vueltas, filas y bytes acumulados en una petición"""
+
+    __slots__ = ('route', 'measure_bytes', 'round_trips', 'rows', 'bytes', 'tables')
+
+    def __init__(self, route, measure_bytes=False):
+        self.route = route
+        self.measure_bytes = measure_bytes
+        self.round_trips = 0
+        self.rows = 0
+        self.bytes = 0
+        self.tables = {}
+
+    def over_budget(self, max_round_trips=None, max_rows=None):
+        max_round_trips = STORAGE_BUDGET_ROUND_TRIPS if max_round_trips is None else max_round_trips
+        max_rows = STORAGE_BUDGET_ROWS if max_rows is None else max_rows
+        return self.round_trips > max_round_trips or self.rows > max_rows
+
+    def header(self):
+        return f'round_trips={self.round_trips}; rows={self.rows}; bytes={self.bytes}'
+
+    def to_dict(self):
+        return {
+            'route': self.route,
+            'round_trips': self.round_trips,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'tables': dict(self.tables),
+        }
+
+
+_current = ContextVar('storage_usage', default=None)
+
+
+def _record(table, data):
+    if isinstance(data, list):
+        rows = len(data)
+    else:
+        rows = 0 if data is None else 1
+    usage = _current.get()
+    measure_bytes = usage.measure_bytes if usage is not None else STORAGE_ACCOUNTING_DEBUG
+    size = len(json.dumps(data, default=str)) if measure_bytes and data is not None else 0
+
+    route = usage.route if usage is not None else 'none'
+    if usage is not None:
+        usage.round_trips += 1
+        usage.rows += rows
+        usage.bytes += size
+        usage.tables[table] = usage.tables.get(table, 0) + 1
+    labels = (('route', route), ('table', table))
+    registry.inc('storage_round_trips_total', labels)
+    registry.inc('storage_rows_total', labels, rows)
+    if measure_bytes:
+        registry.inc('storage_bytes_total', labels, size)
+
+
+class _CountingQuery:
+    """Envuelve un query builder; cada método que devuelve otro builder se vuelve a envolver"""
+
+    __slots__ = ('_builder', '_table')
+
+    def __init__(self, builder, table):
+        self._builder = builder
+        self._table = table
+
+    def execute(self, *args, **kwargs):
+        result = self._builder.execute(*args, **kwargs)
+        _record(self._table, getattr(result, 'data', None))
+        return result
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, 'execute'):
+                return _CountingQuery(result, self._table)
+            return result
+        return call
+
+
+class CountingClient:
+    """Cliente de Supabase que cuenta las idas y vueltas de `table()` y `rpc()`"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _CountingQuery(self._client.table(name), name)
+
+    def rpc(self, fn, *args, **kwargs):
+        return _CountingQuery(self._client.rpc(fn, *args, **kwargs), f'rpc:{fn}')
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def current_usage():
+    """Uso de la petición (o del bloque `track()`) en curso; None fuera de ellos"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def track(route='manual'):
+    """Cuenta las idas y vueltas hechas dentro del bloque (pruebas, benchmarks, scripts)"""
+    usage = StorageUsage(route, measure_bytes=True)
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+
+def init_app(app, warn=None):
+    """
+    Registra en la app de Flask los hooks que cuentan el uso de cada petición
+
+    Args:
+        warn: función(mensaje) para avisar de peticiones sobre el presupuesto en modo debug
+    """
+    from flask import request
+
+    @app.before_request
+    def _storage_usage_start():
+        rule = request.url_rule
+        _current.set(StorageUsage(rule.rule if rule is not None else 'unmatched',
+                                  measure_bytes=app.debug or STORAGE_ACCOUNTING_DEBUG))
+
+    @app.after_request
+    def _storage_usage_check(response):
+        usage = _current.get()
+        if usage is None:
+            return response
+        debug = app.debug or STORAGE_ACCOUNTING_DEBUG
+        if usage.over_budget():
+            registry.inc('storage_requests_over_budget_total', (('route', usage.route),))
+            if debug and warn is not None:
+                warn(f"Storage budget exceeded on {request.method} {usage.route}: {usage.header()} "
+                     f"(budget: round_trips={STORAGE_BUDGET_ROUND_TRIPS}, rows={STORAGE_BUDGET_ROWS})")
+        if debug:
+            response.headers['X-Storage-Usage'] = usage.header()
+        return response
+
+    @app.teardown_request
+    def _storage_usage_done(exc):
+        _current.set(None)
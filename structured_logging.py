@@ -0,0 +1,122 @@
+"""
+Logging estructurado (JSON) sin bloquear las peticiones
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Los hilos que atienden peticiones solo encolan el registro (`put_nowait`: si
+la cola está llena el registro se descarta y se cuenta en
+`log_records_dropped_total` de /metrics, nunca se espera). Un hilo escritor
+(`QueueListener`) lo formatea como una línea JSON y lo escribe en:
+    - stderr (lo que recoge Vercel)
+    - un archivo local con rotación (LOG_FILE, por defecto logs/server.log
+      fuera de Vercel; LOG_FILE='' lo desactiva)
+
+El nivel mínimo (LOG_LEVEL) se comprueba antes de crear el registro, y la
+fecha, el JSON y el traceback se formatean en el hilo escritor. LOG_LEVEL solo
+afecta a esta salida: el buffer de /logs (log_store.py) recibe todo.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from metrics import registry
+
+LOGGER_NAME = 'iot_server'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', '' if os.getenv('VERCEL') else os.path.join('logs', 'server.log'))
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(5 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv('LOG_FILE_BACKUPS', '3'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+# Campos que se copian del registro al JSON si se pasaron en `extra`
+EXTRA_FIELDS = ('device_id', 'route')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for field in EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Encola sin esperar; con la cola llena descarta el registro"""
+
+    def prepare(self, record):
+        # Solo se fija el texto del mensaje (los argumentos podrían cambiar
+        # después); el resto se formatea en el hilo escritor
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            registry.inc('log_records_dropped_total')
+
+
+def _file_handler(path):
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return RotatingFileHandler(path, maxBytes=LOG_FILE_MAX_BYTES,
+                                   backupCount=LOG_FILE_BACKUPS, encoding='utf-8', delay=True)
+    except OSError as e:
+        # Sistema de archivos de solo lectura (p. ej. serverless): queda solo stderr
+        sys.stderr.write(f"WARNING: log file {path} not available: {e}\n")
+        return None
+
+
+def configure_logging(level=LOG_LEVEL, log_file=LOG_FILE, queue_size=LOG_QUEUE_SIZE):
+    """
+    Configura el logger del servidor (solo la primera vez) e inicia el hilo escritor
+
+    Returns:
+        logging.Logger
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    formatter = JsonFormatter()
+    sinks = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        file_handler = _file_handler(log_file)
+        if file_handler is not None:
+            sinks.append(file_handler)
+    for sink in sinks:
+        sink.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger.addHandler(NonBlockingQueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, *sinks)
+    _listener.start()
+    # Al salir se escriben los registros que queden en la cola
+    atexit.register(_listener.stop)
+    return logger
@@ -0,0 +1,103 @@
+"""
+Utilidades compartidas para los scripts locales que leen/escriben en Supabase
+(predicción local, backfill, entrenamiento). No se usan en Vercel.
+"""
+
+import os
+
+SENSOR_TABLE = 'sensor_data'
+PREDICTIONS_TABLE = 'irrigation_predictions'
+
+# Límite por defecto de filas que devuelve la API de Supabase por petición
+MAX_ROWS_PER_REQUEST = 1000
+
+
+def create_supabase_client(service_role=False):
+    """
+    Crea un cliente de Supabase usando las credenciales de `.env` / `supabase.env`
+
+    Args:
+        service_role: usar SUPABASE_SERVICE_ROLE_KEY en lugar de la anon key
+            (para escrituras que RLS no permite a anon, como el upsert del
+            backfill). Esa key no debe salir de la máquina local.
+
+    Raises:
+        RuntimeError: si falta la librería o las credenciales
+    """
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+        load_dotenv('supabase.env')
+    except ImportError:
+        pass
+
+    try:
+        from supabase import create_client
+    except ImportError:
+        raise RuntimeError("Instala supabase: pip install supabase")
+
+    url = os.getenv('SUPABASE_URL')
+    key_name = 'SUPABASE_SERVICE_ROLE_KEY' if service_role else 'SUPABASE_ANON_KEY'
+    key = os.getenv(key_name)
+    if not url or not key:
+        raise RuntimeError(f"SUPABASE_URL y {key_name} deben estar en supabase.env")
+
+    return create_client(url, key)
+
+
+def is_unknown_column_error(error, column):
+    """
+    True si PostgREST rechazó la escritura porque la tabla no tiene `column`
+    (PGRST204 en el caché de esquema o 42703 de Postgres), es decir, falta
+    ejecutar la migración correspondiente
+    """
+    message = str(error)
+    return column in message and ('PGRST204' in message or '42703' in message)
+
+
+def get_max_id(client, table=SENSOR_TABLE):
+    """Obtiene el id más alto de la tabla (0 si está vacía)"""
+    result = client.table(table).select('id').order('id', desc=True).limit(1).execute()
+    if result.data:
+        return int(result.data[0]['id'])
+    return 0
+
+
+def fetch_id_range(client, start_id, end_id, columns='*', table=SENSOR_TABLE, page_size=MAX_ROWS_PER_REQUEST):
+    """
+    Obtiene las filas con `start_id <= id < end_id` ordenadas por id
+
+    Supabase limita cada respuesta a `page_size` filas, así que un rango más
+    grande se pide en varias páginas consecutivas.
+
+    Args:
+        client: cliente de Supabase
+        start_id: id inicial (inclusivo)
+        end_id: id final (exclusivo)
+        columns: columnas a seleccionar (lista o string separado por comas)
+        table: nombre de la tabla
+        page_size: máximo de filas por petición
+
+    Returns:
+        list: filas como diccionarios
+    """
+    if not isinstance(columns, str):
+        columns = ','.join(columns)
+    rows = []
+    cursor = start_id
+    while cursor < end_id:
+        result = (
+            client.table(table)
+            .select(columns)
+            .gte('id', cursor)
+            .lt('id', end_id)
+            .order('id')
+            .limit(page_size)
+            .execute()
+        )
+        page = result.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            break
+        cursor = int(page[-1]['id']) + 1
+    return rows
@@ -0,0 +1,251 @@
+"""
+Características temporales por dispositivo calculadas de forma incremental
+Versión sin dependencias pesadas (solo biblioteca estándar) para Vercel
+
+Cada dispositivo tiene un buffer circular de tamaño fijo (array('d')) con sus
+lecturas recientes. Sobre esa ventana se mantienen, en O(1) por lectura:
+    - pendiente (regresión lineal del valor contra el tiempo, en %/minuto)
+    - EWMA (media móvil exponencial)
+    - mínimo y máximo (colas monótonas, O(1) amortizado)
+
+El mismo código se usa al entrenar (`linear_regression_sensor_data.py`,
+reproduciendo el historial en orden) y al predecir, así las características
+son idénticas en ambos lados.
+
+El tracker es seguro entre hilos y guarda a lo sumo MAX_TRACKED_DEVICES
+ventanas: el `device_id` lo envía el cliente, así que al superar el límite se
+descarta la del dispositivo que lleva más tiempo sin enviar (LRU).
+"""
+
+import math
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+from irrigation_predictor import MAX_TRACKED_DEVICES, SOIL_COLUMNS
+
+# Ventana por defecto: 12 lecturas o 60 minutos (el ESP32 envía cada 5 minutos)
+WINDOW_SIZE = 12
+WINDOW_SECONDS = 3600.0
+EWMA_ALPHA = 0.3
+# Varianza mínima de los tiempos de la ventana (minutos²) para calcular pendiente
+MIN_TIME_VARIANCE = 1e-4
+
+TRACKED_COLUMNS = SOIL_COLUMNS
+TEMPORAL_STATS = ('slope', 'ewma', 'min', 'max')
+TEMPORAL_FEATURES = [f'{col}_{stat}' for col in TRACKED_COLUMNS for stat in TEMPORAL_STATS]
+
+
+class DeviceWindow:
+    """Ventana deslizante de lecturas recientes de un dispositivo"""
+
+    def __init__(self, window_size=WINDOW_SIZE, window_seconds=WINDOW_SECONDS,
+                 ewma_alpha=EWMA_ALPHA, columns=TRACKED_COLUMNS):
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.ewma_alpha = ewma_alpha
+        self.columns = tuple(columns)
+
+        # Buffers circulares: tiempos (minutos desde `origin`) y un array por columna
+        self._times = array('d', [0.0]) * window_size
+        self._values = [array('d', [0.0]) * window_size for _ in self.columns]
+        self._head = 0        # posición del elemento más antiguo
+        self._size = 0
+        self._seq = 0         # número de lecturas vistas (para las colas monótonas)
+        self._evictions = 0
+        self.origin = None    # segundos epoch que corresponden a t = 0
+
+        # Sumas para la pendiente: Σt, Σt² comunes y Σy, Σty por columna
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_y = [0.0] * len(self.columns)
+        self._sum_ty = [0.0] * len(self.columns)
+
+        self._ewma = [None] * len(self.columns)
+        # Colas monótonas de (seq, valor)
+        self._min_q = [deque() for _ in self.columns]
+        self._max_q = [deque() for _ in self.columns]
+
+    def __len__(self):
+        return self._size
+
+    def update(self, timestamp, reading):
+        """
+        Agrega una lectura a la ventana
+
+        Args:
+            timestamp: segundos epoch de la lectura
+            reading: dict (o mapeo) con las columnas rastreadas
+
+        Returns:
+            bool: False si la lectura se ignoró por tener valores nulos
+        """
+        values = []
+        for col in self.columns:
+            value = reading.get(col)
+            if value is None:
+                return False
+            value = float(value)
+            if math.isnan(value):
+                return False
+            values.append(value)
+
+        timestamp = float(timestamp)
+        # Expulsar por tamaño y por antigüedad (una expulsión puede mover el origen)
+        if self._size == self.window_size:
+            self._evict()
+        cutoff = timestamp - self.window_seconds
+        while self._size and self.origin + self._times[self._head] * 60.0 < cutoff:
+            self._evict()
+        if not self._size:
+            self.origin = timestamp
+        t = (timestamp - self.origin) / 60.0
+
+        tail = (self._head + self._size) % self.window_size
+        self._times[tail] = t
+        self._size += 1
+        seq = self._seq
+        self._seq += 1
+
+        self._sum_t += t
+        self._sum_tt += t * t
+        alpha = self.ewma_alpha
+        for i, value in enumerate(values):
+            self._values[i][tail] = value
+            self._sum_y[i] += value
+            self._sum_ty[i] += t * value
+
+            previous = self._ewma[i]
+            self._ewma[i] = value if previous is None else alpha * value + (1.0 - alpha) * previous
+
+            min_q = self._min_q[i]
+            while min_q and min_q[-1][1] >= value:
+                min_q.pop()
+            min_q.append((seq, value))
+            max_q = self._max_q[i]
+            while max_q and max_q[-1][1] <= value:
+                max_q.pop()
+            max_q.append((seq, value))
+        return True
+
+    def _evict(self):
+        """Saca la lectura más antigua de la ventana"""
+        head = self._head
+        t = self._times[head]
+        self._sum_t -= t
+        self._sum_tt -= t * t
+        oldest_seq = self._seq - self._size
+        for i in range(len(self.columns)):
+            value = self._values[i][head]
+            self._sum_y[i] -= value
+            self._sum_ty[i] -= t * value
+            if self._min_q[i] and self._min_q[i][0][0] == oldest_seq:
+                self._min_q[i].popleft()
+            if self._max_q[i] and self._max_q[i][0][0] == oldest_seq:
+                self._max_q[i].popleft()
+        self._head = (head + 1) % self.window_size
+        self._size -= 1
+
+        # Sumar y restar acumula error de redondeo; cada `window_size`
+        # expulsiones se recalculan las sumas (O(1) amortizado)
+        self._evictions += 1
+        if self._evictions >= self.window_size:
+            self._evictions = 0
+            self._rebuild_sums()
+
+    def _rebuild_sums(self):
+        """Recalcula las sumas desde el buffer y re-centra el origen de tiempos"""
+        if not self._size:
+            self._sum_t = self._sum_tt = 0.0
+            self._sum_y = [0.0] * len(self.columns)
+            self._sum_ty = [0.0] * len(self.columns)
+            return
+
+        # Mover el origen al elemento más antiguo mantiene los tiempos pequeños
+        shift = self._times[self._head]
+        self.origin += shift * 60.0
+        sum_t = sum_tt = 0.0
+        sum_y = [0.0] * len(self.columns)
+        sum_ty = [0.0] * len(self.columns)
+        for k in range(self._size):
+            pos = (self._head + k) % self.window_size
+            t = self._times[pos] - shift
+            self._times[pos] = t
+            sum_t += t
+            sum_tt += t * t
+            for i in range(len(self.columns)):
+                value = self._values[i][pos]
+                sum_y[i] += value
+                sum_ty[i] += t * value
+        self._sum_t, self._sum_tt = sum_t, sum_tt
+        self._sum_y, self._sum_ty = sum_y, sum_ty
+
+    def features(self):
+        """
+        Devuelve las características temporales de la ventana actual
+
+        Returns:
+            dict: {'<columna>_slope', '<columna>_ewma', '<columna>_min', '<columna>_max'};
+            todo 0.0 si la ventana está vacía
+        """
+        result = {}
+        n = self._size
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        for i, col in enumerate(self.columns):
+            if n == 0:
+                result[f'{col}_slope'] = 0.0
+                result[f'{col}_ewma'] = 0.0
+                result[f'{col}_min'] = 0.0
+                result[f'{col}_max'] = 0.0
+                continue
+            # Lecturas casi simultáneas (varianza de t < ~1 s²) no dan una pendiente útil
+            if n > 1 and denominator > n * n * MIN_TIME_VARIANCE:
+                slope = (n * self._sum_ty[i] - self._sum_t * self._sum_y[i]) / denominator
+            else:
+                slope = 0.0
+            result[f'{col}_slope'] = slope
+            result[f'{col}_ewma'] = self._ewma[i]
+            result[f'{col}_min'] = self._min_q[i][0][1]
+            result[f'{col}_max'] = self._max_q[i][0][1]
+        return result
+
+
+class TemporalFeatureTracker:
+    """Ventanas de lecturas recientes para varios dispositivos (LRU acotada)"""
+
+    def __init__(self, window_size=WINDOW_SIZE, window_seconds=WINDOW_SECONDS, ewma_alpha=EWMA_ALPHA,
+                 max_devices=MAX_TRACKED_DEVICES):
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.ewma_alpha = ewma_alpha
+        self.max_devices = max(1, int(max_devices))
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def update(self, device_id, timestamp, reading):
+        """Agrega una lectura del dispositivo y devuelve sus características actualizadas"""
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                window = DeviceWindow(self.window_size, self.window_seconds, self.ewma_alpha)
+                self._windows[device_id] = window
+                if len(self._windows) > self.max_devices:
+                    self._windows.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._windows.move_to_end(device_id)
+            window.update(timestamp, reading)
+            return window.features()
+
+    def features(self, device_id):
+        """Características actuales del dispositivo (None si nunca envió datos)"""
+        with self._lock:
+            window = self._windows.get(device_id)
+            if window is None:
+                return None
+            return window.features()
+
+    def devices(self):
+        with self._lock:
+            return list(self._windows)
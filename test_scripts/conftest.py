@@ -0,0 +1,6 @@
+"""Permite importar los modulos del servidor y del entrenamiento desde las pruebas"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
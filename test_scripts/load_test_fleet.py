@@ -0,0 +1,478 @@
+"""
+Prueba de carga local con una flota simulada de ESP32
+
+Cada dispositivo simulado sigue el protocolo del firmware
+(codigo_dht11/principal_code/principal_code.ino):
+    - cada 10 s: GET /connection-status
+    - cada 10 s: GET /communication-test (si trae test_request, responde
+      POST /communication-test {"response": "conectado"}) y luego
+      GET /data-request (si trae data_request, envia POST /data en el momento)
+    - cada 5 min: POST /data
+Los intervalos se dividen por --time-scale para comprimir el tiempo.
+
+Por defecto el servidor corre en un proceso aparte (werkzeug con hilos, como
+`python principal_code_simple.py`) con un cliente de Supabase falso en memoria
+(--storage-latency simula la latencia de red), asi que no se toca produccion.
+Con --url se prueba un servidor ya levantado.
+
+Escenarios:
+    steady    envios repartidos en el intervalo (arranque escalonado)
+    burst     todos los dispositivos envian a la vez (p. ej. tras un corte de luz)
+    commands  como steady, y un "dashboard" encola pruebas de comunicacion y
+              solicitudes de datos cada --command-interval segundos
+
+Reporta, por endpoint: peticiones/s, errores y latencia p50/p90/p99/max; y
+para los comandos: retraso de entrega (desde que se encolan hasta que un
+dispositivo responde) y comandos perdidos.
+
+Uso:
+    python test_scripts/load_test_fleet.py --devices 100 --duration 60
+    python test_scripts/load_test_fleet.py --devices 2000 --scenario burst --time-scale 30
+    python test_scripts/load_test_fleet.py --scenario commands --json fleet_report.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Intervalos del firmware (segundos)
+DATA_SEND_INTERVAL = 300
+CONNECTION_CHECK_INTERVAL = 10
+COMMAND_CHECK_INTERVAL = 10
+HTTP_TIMEOUT = 5   # http.setTimeout(5000) en el firmware
+
+SCENARIOS = {
+    'steady': {'synchronized': False, 'commands': False},
+    'burst': {'synchronized': True, 'commands': False},
+    'commands': {'synchronized': False, 'commands': True},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prueba de carga con una flota simulada de ESP32.")
+    parser.add_argument("--devices", type=int, default=100,
+                        help="Dispositivos simulados, de 1 a 10000 (default: 100).")
+    parser.add_argument("--duration", type=float, default=60,
+                        help="Duracion de la prueba en segundos reales (default: 60).")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="steady",
+                        help="Escenario (default: steady).")
+    parser.add_argument("--time-scale", type=float, default=10,
+                        help="Factor de compresion de los intervalos del firmware (default: 10).")
+    parser.add_argument("--command-interval", type=float, default=5,
+                        help="Segundos entre comandos del dashboard en el escenario commands (default: 5).")
+    parser.add_argument("--url", default=None,
+                        help="Servidor ya levantado (default: levanta uno local con Supabase falso).")
+    parser.add_argument("--port", type=int, default=0,
+                        help="Puerto del servidor local (default: uno libre).")
+    parser.add_argument("--storage-latency", type=float, default=0.03,
+                        help="Latencia simulada de cada llamada a Supabase, en segundos (default: 0.03).")
+    parser.add_argument("--max-connections", type=int, default=256,
+                        help="Conexiones HTTP simultaneas desde el cliente (default: 256).")
+    parser.add_argument("--no-device-id", action="store_true",
+                        help="No enviar device_id (como el firmware actual: todos son 'esp32').")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla de los datos simulados (default: 0).")
+    parser.add_argument("--json", type=str, default=None, help="Guarda el reporte en este archivo JSON.")
+    args = parser.parse_args()
+    if not 1 <= args.devices <= 10000:
+        parser.error("--devices debe estar entre 1 y 10000")
+    if args.time_scale <= 0 or args.duration <= 0:
+        parser.error("--time-scale y --duration deben ser positivos")
+    return args
+
+
+# ---------------------------------------------------------------------------
+# Servidor local con Supabase falso
+# ---------------------------------------------------------------------------
+
+class _FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FakeQuery:
+    def __init__(self, store, table):
+        self._store = store
+        self._table = table
+        self._insert = None
+        self._order = None
+        self._desc = False
+        self._limit = None
+
+    def insert(self, row):
+        self._insert = row
+        return self
+
+    def select(self, *columns):
+        return self
+
+    def order(self, column, desc=False):
+        self._order = column
+        self._desc = desc
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def execute(self):
+        return self._store.execute(self)
+
+
+class FakeSupabaseClient:
+    """Cliente en memoria con la interfaz que usa el servidor y una latencia fija por llamada"""
+
+    def __init__(self, latency=0.0, max_rows=1000):
+        self.latency = latency
+        self._tables = {}
+        self._lock = threading.Lock()
+        self.max_rows = max_rows
+
+    def table(self, name):
+        return _FakeQuery(self, name)
+
+    def execute(self, query):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self._lock:
+            rows = self._tables.setdefault(query._table, deque(maxlen=self.max_rows))
+            if query._insert is not None:
+                row = dict(query._insert, id=len(rows) + 1)
+                rows.append(row)
+                return _FakeResult([row])
+            selected = list(rows)
+        if query._order:
+            selected.sort(key=lambda row: str(row.get(query._order)), reverse=query._desc)
+        if query._limit is not None:
+            selected = selected[:query._limit]
+        return _FakeResult(selected)
+
+
+def _serve(port, storage_latency, ready):
+    # Sin Supabase real ni logs por peticion: solo cuenta el servidor
+    os.environ.pop('SUPABASE_URL', None)
+    os.environ.pop('SUPABASE_ANON_KEY', None)
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('LOG_FILE', '')
+    sys.path.insert(0, ROOT)
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    import principal_code_simple
+    principal_code_simple.configure_storage(FakeSupabaseClient(storage_latency))
+    server = make_server('127.0.0.1', port, principal_code_simple.app, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(port, storage_latency):
+    port = port or _free_port()
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=_serve, args=(port, storage_latency, ready), daemon=True)
+    process.start()
+    if not ready.wait(60):
+        process.terminate()
+        raise RuntimeError("El servidor local no arranco")
+    return process, port
+
+
+# ---------------------------------------------------------------------------
+# Cliente HTTP minimo (asyncio, una conexion por peticion como el firmware)
+# ---------------------------------------------------------------------------
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    def report(self, duration):
+        latencies = sorted(self.latencies)
+        n = len(latencies)
+
+        def percentile(p):
+            return round(latencies[min(n - 1, int(p * n))] * 1000, 2) if n else None
+
+        return {
+            'requests': n + self.errors,
+            'errors': self.errors,
+            'throughput_rps': round((n + self.errors) / duration, 2),
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(latencies[-1] * 1000, 2) if n else None,
+        }
+
+
+class FleetClient:
+    def __init__(self, host, port, max_connections):
+        self.host = host
+        self.port = port
+        self.stats = {}
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def request(self, method, path, body=None):
+        """Devuelve el JSON de la respuesta (None si falla o no es 200)"""
+        name = f'{method} {path}'
+        stats = self.stats.setdefault(name, EndpointStats())
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = (f'{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+                f'Connection: close\r\nContent-Length: {len(payload)}\r\n')
+        if body is not None:
+            head += 'Content-Type: application/json\r\n'
+        async with self._slots:
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), HTTP_TIMEOUT)
+                try:
+                    writer.write(head.encode() + b'\r\n' + payload)
+                    await writer.drain()
+                    raw = await asyncio.wait_for(reader.read(), HTTP_TIMEOUT)
+                finally:
+                    writer.close()
+            except (OSError, asyncio.TimeoutError):
+                stats.errors += 1
+                return None
+            elapsed = time.perf_counter() - start
+        header, _, content = raw.partition(b'\r\n\r\n')
+        try:
+            status = int(header.split(b' ', 2)[1])
+        except (IndexError, ValueError):
+            stats.errors += 1
+            return None
+        if status != 200:
+            stats.errors += 1
+            return None
+        stats.latencies.append(elapsed)
+        try:
+            return json.loads(content)
+        except ValueError:
+            return {}
+
+
+# ---------------------------------------------------------------------------
+# Flota y dashboard
+# ---------------------------------------------------------------------------
+
+class CommandTracker:
+    """Comandos encolados por el dashboard y su entrega a algun dispositivo"""
+
+    def __init__(self, delivery_window):
+        # El servidor guarda un solo booleano por tipo: una entrega atiende a
+        # todos los comandos encolados antes que ella
+        self.delivery_window = delivery_window
+        self.pending = {'test_request': [], 'data_request': []}
+        self.delays = {'test_request': [], 'data_request': []}
+        self.sent = {'test_request': 0, 'data_request': 0}
+
+    def queued(self, kind):
+        self.sent[kind] += 1
+        self.pending[kind].append(time.perf_counter())
+
+    def delivered(self, kind):
+        now = time.perf_counter()
+        self.delays[kind].extend(now - queued_at for queued_at in self.pending[kind])
+        self.pending[kind].clear()
+
+    def report(self):
+        now = time.perf_counter()
+        result = {}
+        for kind, delays in self.delays.items():
+            delays = sorted(delays)
+            n = len(delays)
+            # Los encolados hace menos de `delivery_window` pueden seguir en camino
+            in_flight = sum(1 for queued_at in self.pending[kind] if now - queued_at < self.delivery_window)
+            result[kind] = {
+                'queued': self.sent[kind],
+                'delivered': n,
+                'in_flight_at_end': in_flight,
+                'lost': len(self.pending[kind]) - in_flight,
+                'p50_delay_s': round(delays[n // 2], 3) if n else None,
+                'max_delay_s': round(delays[-1], 3) if n else None,
+            }
+        return result
+
+
+def sensor_reading(rng, device_id):
+    data = {
+        "temperature1": round(23.5 + rng.uniform(0, 5), 1),
+        "humidity1": round(60 + rng.uniform(0, 30), 1),
+        "temperature2": round(24.0 + rng.uniform(0, 5), 1),
+        "humidity2": round(58 + rng.uniform(0, 35), 1),
+        "soil_moisture1": round(40 + rng.uniform(0, 40), 1),
+        "soil_moisture2": round(45 + rng.uniform(0, 35), 1),
+        "uv_index": round(2.0 + rng.uniform(0, 8), 1),
+    }
+    if device_id is not None:
+        data["device_id"] = device_id
+    return data
+
+
+async def _every(interval, offset, deadline, action):
+    """
+    Llama a `action` cada `interval` segundos desde `offset` hasta `deadline`
+
+    Como el firmware (`last = currentTime`), el siguiente turno se cuenta desde
+    que empezo el anterior: si el servidor se atrasa no se acumulan turnos.
+    Si el siguiente turno cae despues de `deadline` termina sin esperarlo, asi
+    la prueba dura `--duration` y no hasta un intervalo de envio mas.
+    """
+    next_run = time.perf_counter() + offset
+    while next_run < deadline:
+        delay = next_run - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        started = time.perf_counter()
+        if started >= deadline:
+            return
+        await action()
+        next_run = started + interval
+
+
+async def simulate_device(client, index, args, scenario, deadline, commands):
+    rng = random.Random(args.seed * 100003 + index)
+    device_id = None if args.no_device_id else f'sim-{index:05d}'
+    scale = args.time_scale
+    send_interval = DATA_SEND_INTERVAL / scale
+    check_interval = CONNECTION_CHECK_INTERVAL / scale
+    command_interval = COMMAND_CHECK_INTERVAL / scale
+    send_offset = 0.0 if scenario['synchronized'] else rng.uniform(0, send_interval)
+
+    async def send_data():
+        await client.request('POST', '/data', sensor_reading(rng, device_id))
+
+    async def check_connection():
+        await client.request('GET', '/connection-status')
+
+    async def check_commands():
+        response = await client.request('GET', '/communication-test')
+        if response and response.get('test_request'):
+            confirmation = {'response': 'conectado', 'timestamp': int(time.perf_counter() * 1000)}
+            if device_id is not None:
+                confirmation['device_id'] = device_id
+            if await client.request('POST', '/communication-test', confirmation) is not None:
+                commands.delivered('test_request')
+        response = await client.request('GET', '/data-request')
+        if response and response.get('data_request'):
+            if await client.request('POST', '/data', sensor_reading(rng, device_id)) is not None:
+                commands.delivered('data_request')
+
+    await asyncio.gather(
+        _every(send_interval, send_offset, deadline, send_data),
+        _every(check_interval, rng.uniform(0, check_interval), deadline, check_connection),
+        _every(command_interval, rng.uniform(0, command_interval), deadline, check_commands),
+    )
+
+
+async def dashboard(client, args, deadline, commands):
+    kinds = ('test_request', 'data_request')
+    turn = 0
+
+    async def queue_command():
+        nonlocal turn
+        kind = kinds[turn % 2]
+        turn += 1
+        if kind == 'test_request':
+            ok = await client.request('POST', '/communication-test', {})
+        else:
+            ok = await client.request('POST', '/request-data', {'request': True})
+        if ok is not None:
+            commands.queued(kind)
+
+    await _every(args.command_interval, args.command_interval, deadline, queue_command)
+
+
+async def run_fleet(host, port, args):
+    scenario = SCENARIOS[args.scenario]
+    client = FleetClient(host, port, args.max_connections)
+    # Un comando deberia llegar en un turno de consulta (mas el timeout HTTP)
+    commands = CommandTracker(COMMAND_CHECK_INTERVAL / args.time_scale + 2 * HTTP_TIMEOUT)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    tasks = [simulate_device(client, i, args, scenario, deadline, commands) for i in range(args.devices)]
+    if scenario['commands']:
+        tasks.append(dashboard(client, args, deadline, commands))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    endpoints = {name: stats.report(elapsed) for name, stats in sorted(client.stats.items())}
+    total = sum(e['requests'] for e in endpoints.values())
+    errors = sum(e['errors'] for e in endpoints.values())
+    report = {
+        'scenario': args.scenario,
+        'devices': args.devices,
+        'time_scale': args.time_scale,
+        'duration_s': round(elapsed, 2),
+        # Tiempo real que representa la prueba a la cadencia del firmware
+        'simulated_s': round(elapsed * args.time_scale, 1),
+        'requests': total,
+        'errors': errors,
+        'throughput_rps': round(total / elapsed, 2),
+        'endpoints': endpoints,
+    }
+    if scenario['commands']:
+        report['commands'] = commands.report()
+    return report
+
+
+def print_report(report):
+    print(f"\n=== Prueba de carga: {report['scenario']} ===")
+    print(f"Dispositivos: {report['devices']} | duracion: {report['duration_s']} s "
+          f"(~{report['simulated_s']} s simulados, escala x{report['time_scale']})")
+    print(f"Peticiones: {report['requests']} | errores: {report['errors']} | "
+          f"{report['throughput_rps']} peticiones/s")
+    print(f"\n{'endpoint':32s} {'req':>7s} {'err':>5s} {'req/s':>8s} {'p50 ms':>8s} {'p90 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}")
+    for name, e in report['endpoints'].items():
+        values = [e[key] if e[key] is not None else '-' for key in ('p50_ms', 'p90_ms', 'p99_ms', 'max_ms')]
+        print(f"{name:32s} {e['requests']:>7d} {e['errors']:>5d} {e['throughput_rps']:>8.2f} "
+              + ' '.join(f"{v:>8}" for v in values))
+    if 'commands' in report:
+        print("\nComandos del dashboard:")
+        for kind, c in report['commands'].items():
+            print(f"  {kind:13s} encolados={c['queued']} entregados={c['delivered']} en_camino={c['in_flight_at_end']} "
+                  f"perdidos={c['lost']} retraso p50={c['p50_delay_s']} s max={c['max_delay_s']} s")
+
+
+def main():
+    args = parse_args()
+    process = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        process, port = start_local_server(args.port, args.storage_latency)
+        host = '127.0.0.1'
+        print(f"Servidor local en http://{host}:{port} (Supabase falso, latencia {args.storage_latency} s)")
+    try:
+        report = asyncio.run(run_fleet(host, port, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nReporte guardado en: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Pruebas del estado de conexión por dispositivo (device_liveness.py)
+
+Uso:
+    python -m pytest test_scripts/test_device_liveness.py
+"""
+
+import pytest
+
+from device_liveness import WARMUP_INTERVALS, DeviceLivenessTracker
+
+
+def test_reintento_durante_el_calentamiento_no_cambia_el_intervalo():
+    tracker = DeviceLivenessTracker(expected_interval=300)
+    for t in (0, 60, 120):
+        tracker.record('esp32', now=t)
+    # Reintento del mismo envío 3 s después, aún dentro del calentamiento
+    tracker.record('esp32', now=123)
+    tracker.record('esp32', now=180)
+
+    status = tracker.status('esp32', now=180)
+    assert status['expected_interval'] == pytest.approx(59.0)
+    assert status['received'] == 5
+    assert status['missed'] == 0
+
+
+def test_calentamiento_reemplaza_el_intervalo_asumido():
+    tracker = DeviceLivenessTracker(expected_interval=300)
+    for k in range(WARMUP_INTERVALS + 1):
+        tracker.record('esp32', now=60 * k)
+
+    assert tracker.status('esp32', now=60 * WARMUP_INTERVALS)['expected_interval'] == pytest.approx(60.0)
+
+
+def test_reintento_tras_el_calentamiento_se_ignora():
+    tracker = DeviceLivenessTracker(expected_interval=300)
+    for k in range(WARMUP_INTERVALS + 1):
+        tracker.record('esp32', now=60 * k)
+    last = 60 * WARMUP_INTERVALS
+    tracker.record('esp32', now=last + 2)
+
+    assert tracker.status('esp32', now=last + 2)['expected_interval'] == pytest.approx(60.0)
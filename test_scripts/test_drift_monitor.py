@@ -0,0 +1,74 @@
+"""
+Pruebas del monitor de deriva (drift_monitor.py)
+
+Uso:
+    python -m pytest test_scripts/test_drift_monitor.py
+"""
+
+import math
+from statistics import NormalDist
+
+import pytest
+
+from drift_monitor import DriftMonitor, ks_statistic, population_stability_index
+
+BINS = 10
+# Referencia: N(0, 1) con cortes en los deciles, 10% de las filas por bin
+EDGES = [NormalDist().inv_cdf(k / BINS) for k in range(1, BINS)]
+REFERENCE = {'soil_moisture1': {'edges': EDGES, 'proportions': [1 / BINS] * BINS}}
+
+
+def normal_sample(mu, n):
+    """n valores en los cuantiles de N(mu, 1) (muestra determinista)"""
+    dist = NormalDist(mu, 1.0)
+    return [dist.inv_cdf((i + 0.5) / n) for i in range(n)]
+
+
+def test_psi_y_ks_conocidos():
+    assert population_stability_index([0.5, 0.5], [0.5, 0.5]) == 0.0
+    assert ks_statistic([0.5, 0.5], [0.5, 0.5]) == 0.0
+    # (0.25 - 0.5)·ln(0.5) + (0.75 - 0.5)·ln(1.5) = 0.25·ln(3)
+    assert population_stability_index([0.5, 0.5], [0.25, 0.75]) == pytest.approx(0.25 * math.log(3))
+    assert ks_statistic([0.5, 0.5], [0.25, 0.75]) == pytest.approx(0.25)
+    assert ks_statistic([0.2, 0.3, 0.5], [0.5, 0.3, 0.2]) == pytest.approx(0.3)
+
+
+def test_misma_distribucion_es_estable():
+    monitor = DriftMonitor(REFERENCE, window=500)
+    for value in normal_sample(0.0, 500):
+        monitor.update('dev', {'soil_moisture1': value})
+
+    scores = monitor.scores('dev')
+    assert scores['samples'] == 500
+    assert scores['features']['soil_moisture1']['psi'] < 0.01
+    assert scores['features']['soil_moisture1']['ks'] < 0.01
+    assert scores['status'] == 'stable'
+
+
+def test_desplazamiento_de_una_desviacion_es_deriva():
+    shifted = NormalDist(1.0, 1.0)
+    cdf = [shifted.cdf(edge) for edge in EDGES]
+    actual = [b - a for a, b in zip([0.0] + cdf, cdf + [1.0])]
+    expected_psi = population_stability_index([1 / BINS] * BINS, actual)
+    expected_ks = max(abs(c - k / BINS) for k, c in enumerate(cdf, 1))
+
+    monitor = DriftMonitor(REFERENCE, window=1000)
+    for value in normal_sample(1.0, 1000):
+        monitor.update('dev', {'soil_moisture1': value})
+
+    feature = monitor.scores('dev')['features']['soil_moisture1']
+    assert feature['psi'] == pytest.approx(expected_psi, abs=0.01)
+    assert feature['ks'] == pytest.approx(expected_ks, abs=0.01)
+    assert feature['ks'] == pytest.approx(0.383, abs=0.01)
+    assert feature['status'] == 'drift'
+
+
+def test_la_ventana_olvida_lecturas_viejas():
+    monitor = DriftMonitor(REFERENCE, window=200)
+    for value in normal_sample(3.0, 200) + normal_sample(0.0, 200):
+        monitor.update('dev', {'soil_moisture1': value})
+
+    scores = monitor.scores('dev')
+    assert scores['samples'] == 200
+    assert scores['status'] == 'stable'
+    assert monitor.scores('otro') is None
@@ -0,0 +1,50 @@
+"""
+Pruebas del pronostico de secado (dryout_forecast.py)
+
+Uso:
+    python -m pytest test_scripts/test_dryout_forecast.py
+"""
+
+import pytest
+
+from dryout_forecast import HoltForecaster
+
+
+def test_tendencia_lineal():
+    model = HoltForecaster()
+    for i in range(50):
+        model.update(i * 300.0, 80.0 - 0.5 * i)   # -0.1 %/minuto
+
+    assert model.trend == pytest.approx(-0.1, rel=1e-3)
+    result = model.forecast(30.0)
+    assert result['status'] == 'drying'
+    assert result['minutes_to_threshold'] == pytest.approx((model.level - 30.0) / 0.1, rel=1e-3)
+
+
+def test_lecturas_casi_simultaneas_no_disparan_la_tendencia():
+    model = HoltForecaster()
+    for i in range(10):
+        model.update(i * 300.0, 60.0 - 0.5 * i)
+    trend = model.trend
+
+    # Lectura pedida desde /request-data y envio regular 0.2 s despues
+    t = 9 * 300.0 + 0.2
+    model.update(t, 52.0)
+
+    assert model.trend == pytest.approx(trend)
+    assert model.forecast(30.0)['minutes_to_threshold'] > 60
+
+    # La siguiente lectura espaciada si actualiza la tendencia, con un dt razonable
+    model.update(10 * 300.0, 55.0)
+    assert -1.0 < model.trend < 0
+
+
+def test_riego_reinicia_la_tendencia():
+    model = HoltForecaster()
+    for i in range(10):
+        model.update(i * 300.0, 50.0 - i)
+    model.update(3000.0, 90.0)
+
+    assert model.level == 90.0
+    assert model.trend == 0.0
+    assert model.forecast(30.0)['status'] == 'stable'
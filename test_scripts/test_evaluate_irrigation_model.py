@@ -0,0 +1,38 @@
+"""
+Pruebas de la evaluacion continua (evaluate_irrigation_model.py)
+
+Uso:
+    python -m pytest test_scripts/test_evaluate_irrigation_model.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from evaluate_irrigation_model import EvaluationAccumulator, day_numbers
+
+
+def test_un_timestamp_invalido_no_inventa_fechas():
+    timestamps = pd.Series([
+        "2024-03-01 10:00:00", "2024-03-01 23:55:00", "no es fecha", "2024-03-02 00:05:00",
+    ])
+    scores = np.array([0.9, 0.1, 0.9, 0.2])
+    y = np.array([1.0, 0.0, 0.0, 1.0])
+
+    accumulator = EvaluationAccumulator(threshold=0.5, n_bins=10)
+    accumulator.update(scores, y, day_numbers(timestamps))
+    report = accumulator.report()
+
+    assert report["rows"] == 4
+    assert report["per_day"] == [
+        {"date": "2024-03-01", "rows": 2, "accuracy": 1.0},
+        {"date": "2024-03-02", "rows": 1, "accuracy": 0.0},
+    ]
+
+
+def test_sin_timestamps_validos_no_hay_reporte_por_dia():
+    accumulator = EvaluationAccumulator(threshold=0.5, n_bins=10)
+    accumulator.update(np.array([0.7]), np.array([1.0]), day_numbers(pd.Series([None])))
+
+    report = accumulator.report()
+    assert report["rows"] == 1
+    assert report["per_day"] == []
@@ -0,0 +1,212 @@
+"""
+Pruebas del entrenamiento (linear_regression_sensor_data.py)
+
+Uso:
+    python -m pytest test_scripts/test_linear_regression_sensor_data.py
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import supabase_utils
+
+from benchmarks.benchmark_labels import legacy_ensure_labels, make_frame
+from linear_regression_sensor_data import (
+    DEFAULT_FEATURES,
+    DEVICE_COLUMN,
+    PREDICTION_COLUMN,
+    TIMESTAMP_COLUMN,
+    _temporal_order,
+    add_temporal_features,
+    build_pipeline,
+    ensure_labels,
+    holdout_mask,
+    iter_supabase_chunks,
+    load_dataset,
+    load_source_dataset,
+    parse_args,
+    prepare_training_data,
+    raw_coefficients,
+    run_streaming,
+    train_group_models,
+    validate_features,
+)
+from temporal_features import TEMPORAL_FEATURES
+
+
+def make_args(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["linear_regression_sensor_data.py", *argv])
+    return parse_args()
+
+
+def fake_supabase(monkeypatch, rows):
+    """Supabase en memoria: `rows` son las filas de sensor_data como llegan en JSON"""
+    monkeypatch.setattr(supabase_utils, "create_supabase_client", lambda: None)
+    monkeypatch.setattr(supabase_utils, "get_max_id", lambda client: max(row["id"] for row in rows))
+
+    def fetch_id_range(client, start_id, end_id, columns):
+        return [{col: row.get(col) for col in columns} for row in rows if start_id <= row["id"] < end_id]
+
+    monkeypatch.setattr(supabase_utils, "fetch_id_range", fetch_id_range)
+
+
+def test_paginas_en_cache_y_nuevas_dan_el_mismo_device_id(monkeypatch, tmp_path):
+    rows = [
+        {
+            "id": i, "timestamp": f"2024-01-01 00:{i:02d}:00", "device_id": ["1001", "007", None][i % 3],
+            "soil_moisture1": 50.0 + i, "soil_moisture2": 40.0, "uv_index": 1.0,
+            "temperature2": 20.0, "humidity2": 60.0,
+        }
+        for i in range(1, 21)
+    ]
+    options = ("--source", "supabase", "--temporal-features", "--page-size", "5", "--fetch-workers", "2")
+
+    # Primera ejecución con 10 filas: quedan en caché las dos primeras páginas
+    fake_supabase(monkeypatch, rows[:10])
+    list(iter_supabase_chunks(make_args(monkeypatch, *options, "--cache-dir", str(tmp_path / "warm"))))
+    # Segunda: dos páginas desde la caché y dos nuevas
+    fake_supabase(monkeypatch, rows)
+    warm = pd.concat(
+        iter_supabase_chunks(make_args(monkeypatch, *options, "--cache-dir", str(tmp_path / "warm"))),
+        ignore_index=True,
+    )
+    fresh = pd.concat(
+        iter_supabase_chunks(make_args(monkeypatch, *options, "--cache-dir", str(tmp_path / "cold"))),
+        ignore_index=True,
+    )
+
+    pd.testing.assert_frame_equal(warm, fresh)
+    assert set(warm[DEVICE_COLUMN].dropna()) == {"1001", "007"}
+
+
+def test_load_dataset_con_y_sin_cache_da_el_mismo_dataframe(tmp_path):
+    csv_path = tmp_path / "sensor_data.csv"
+    csv_path.write_text(
+        "timestamp,device_id,prediccion,soil_moisture1,soil_moisture2,uv_index,temperature2,humidity2,extra\n"
+        "2024-01-01 00:00:00,007,Regar,50,40,1.5,20,60,x\n"
+        "no-es-fecha,1001,,51,,2,21,61,y\n"
+        ",,No regar,52,42,2.5,22,62,z\n"
+        "2024-01-01 00:02:00,007,Regar,53,43,3,23,63,w\n",
+        encoding="utf-8",
+    )
+    columns = [TIMESTAMP_COLUMN, DEVICE_COLUMN, PREDICTION_COLUMN, *DEFAULT_FEATURES]
+    cache_dir = tmp_path / "cache"
+
+    plain = load_dataset(csv_path, columns)
+    first = load_dataset(csv_path, columns, cache_dir=cache_dir)
+    cached = load_dataset(csv_path, columns, cache_dir=cache_dir)
+
+    assert len(list(cache_dir.glob("*.npy"))) == 1
+    pd.testing.assert_frame_equal(first, plain)
+    pd.testing.assert_frame_equal(cached, plain)
+    assert cached[DEVICE_COLUMN].iloc[0] == "007"
+    assert cached[TIMESTAMP_COLUMN].iloc[1] == "no-es-fecha"
+
+
+@pytest.mark.parametrize("temporal", [False, True])
+def test_streaming_por_bloques_da_los_coeficientes_del_ajuste_en_memoria(monkeypatch, tmp_path, temporal):
+    rng = np.random.default_rng(5)
+    df = make_frame(1_200, n_devices=4, seed=5)
+    df["uv_index"] = rng.uniform(0, 11, len(df)).round(1)
+    df["temperature2"] = rng.uniform(10, 35, len(df)).round(1)
+    df["humidity2"] = rng.uniform(20, 90, len(df)).round(1)
+    csv_path = tmp_path / "sensor_data.csv"
+    df.to_csv(csv_path, index=False)
+    options = ["--csv-path", str(csv_path), "--no-dataset-cache"]
+    if temporal:
+        options.append("--temporal-features")
+
+    # Streaming con bloques que no dividen el archivo en partes iguales
+    model_path = tmp_path / "modelo.json"
+    run_streaming(make_args(monkeypatch, *options, "--streaming", "--chunk-size", "97",
+                            "--save-model", str(model_path)))
+    artifact = json.loads(model_path.read_text(encoding="utf-8"))
+
+    # Mismo pipeline que main() en memoria, sobre las mismas filas de entrenamiento
+    args = make_args(monkeypatch, *options)
+    data = ensure_labels(load_source_dataset(args), args.prediction_column)
+    features = list(args.features)
+    if temporal:
+        data = add_temporal_features(data)
+        features += list(TEMPORAL_FEATURES)
+    X, y, subset = prepare_training_data(data, validate_features(data, features), args.prediction_column)
+    train = ~holdout_mask(subset.index.to_numpy(), args.test_size, args.random_state)
+    model = build_pipeline()
+    model.fit(X[train], y[train])
+    coef, intercept = raw_coefficients(model)
+
+    assert artifact["features"] == features
+    assert np.allclose([artifact["coefficients"][f] for f in features], coef)
+    assert np.isclose(artifact["intercept"], intercept)
+
+
+def test_ensure_labels_igual_a_la_version_anterior_por_dispositivo():
+    df = make_frame(3_000, n_devices=7, seed=3)
+    # Una lectura con 100 al inicio de cada dispositivo: no marca al dispositivo anterior
+    df.loc[df.groupby(DEVICE_COLUMN).head(1).index, "soil_moisture2"] = 100.0
+    shuffled = df.sample(frac=1.0, random_state=0).reset_index(drop=True)
+
+    labels = ensure_labels(shuffled, PREDICTION_COLUMN)
+
+    assert list(labels.columns[:-1]) == list(shuffled.columns)
+    assert (labels[DEVICE_COLUMN] == shuffled[DEVICE_COLUMN]).all()
+    for device, rows in labels.groupby(DEVICE_COLUMN):
+        ordered = rows.sort_values("timestamp")
+        expected = legacy_ensure_labels(
+            ordered.drop(columns=[PREDICTION_COLUMN]).reset_index(drop=True), PREDICTION_COLUMN
+        )
+        assert list(ordered[PREDICTION_COLUMN]) == list(expected[PREDICTION_COLUMN]), device
+    assert (labels[PREDICTION_COLUMN] == "Regar").any()
+
+
+def test_ensure_labels_un_dispositivo_sin_columna_device_id():
+    df = make_frame(500, n_devices=1, seed=4).drop(columns=[DEVICE_COLUMN])
+
+    labels = ensure_labels(df, PREDICTION_COLUMN)
+
+    assert list(labels[PREDICTION_COLUMN]) == list(legacy_ensure_labels(df, PREDICTION_COLUMN)[PREDICTION_COLUMN])
+
+
+def test_train_group_models_ignora_grupos_nan(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 60
+    X = rng.normal(size=(n, 2))
+    y = (X[:, 0] > 0).astype(float)
+    df = pd.DataFrame({
+        "a": X[:, 0],
+        "b": X[:, 1],
+        DEVICE_COLUMN: ["dev1"] * 30 + [None] * 30,
+    })
+    args = argparse.Namespace(
+        group_column=DEVICE_COLUMN, per_device_models=tmp_path, min_group_rows=10,
+        model_workers=1, threshold=0.5,
+    )
+
+    train_group_models(df, df, X, y, ["a", "b"], args)
+
+    saved = sorted(path.name for path in tmp_path.iterdir())
+    assert saved == ["dev1.json"]
+    assert json.loads((tmp_path / "dev1.json").read_text())["n_rows"] == 30
+
+
+def test_lecturas_sin_dispositivo_usan_el_dispositivo_por_defecto():
+    df = pd.DataFrame({
+        DEVICE_COLUMN: [None, "esp32", "dev2", np.nan],
+        "timestamp": ["2024-01-01 00:00:00", "2024-01-01 00:05:00", "2024-01-01 00:00:00", "2024-01-01 00:10:00"],
+        "soil_moisture1": [50.0, 49.0, 70.0, 48.0],
+        "soil_moisture2": [50.0, 49.0, 70.0, 48.0],
+    })
+
+    order, codes, _ = _temporal_order(df)
+
+    assert codes.min() >= 0
+    assert codes[0] == codes[1] == codes[3] != codes[2]
+    assert list(order) == [0, 1, 3, 2]
+    # La ventana del dispositivo por defecto sigue siendo una sola
+    features = add_temporal_features(df)
+    assert features.loc[3, "soil_moisture1_max"] == 50.0
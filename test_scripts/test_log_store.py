@@ -0,0 +1,72 @@
+"""
+Pruebas del buffer de logs (log_store.py)
+
+Uso:
+    python -m pytest test_scripts/test_log_store.py
+"""
+
+from log_store import LogStore
+
+
+def read_all(store, limit, **filters):
+    """Recorre el buffer pagina por pagina con el cursor"""
+    messages = []
+    cursor = 0
+    while True:
+        entries, cursor, has_more = store.query(cursor=cursor, limit=limit, **filters)
+        messages.extend(entry['message'] for entry in entries)
+        if not has_more:
+            return messages, cursor
+
+
+def test_paginar_con_cursor_devuelve_todo_una_vez():
+    store = LogStore(capacity=100)
+    for i in range(10):
+        store.log('INFO', f'm{i}')
+
+    messages, cursor = read_all(store, limit=3)
+
+    assert messages == [f'm{i}' for i in range(10)]
+    assert cursor == 10
+    # Sin entradas nuevas el cursor no avanza; las nuevas aparecen en la siguiente pagina
+    assert store.query(cursor=cursor, limit=3) == ([], 10, False)
+    store.log('ERROR', 'nueva')
+    entries, cursor, _ = store.query(cursor=cursor, limit=3)
+    assert [entry['message'] for entry in entries] == ['nueva']
+    assert cursor == 11
+
+
+def test_paginar_con_filtros():
+    store = LogStore(capacity=100)
+    for i in range(20):
+        store.log('ERROR' if i % 3 == 0 else 'INFO', f'm{i}', device_id='a' if i % 2 else 'b')
+
+    errors, _ = read_all(store, limit=2, level='ERROR')
+    assert errors == [f'm{i}' for i in range(0, 20, 3)]
+    device_a, _ = read_all(store, limit=4, device_id='a')
+    assert device_a == [f'm{i}' for i in range(1, 20, 2)]
+
+
+def test_cursor_anterior_al_buffer_empieza_en_la_mas_antigua():
+    store = LogStore(capacity=5)
+    for i in range(12):
+        store.log('INFO', f'm{i}')
+
+    assert len(store) == 5
+    assert store.total() == 12
+    messages, cursor = read_all(store, limit=2)
+    assert messages == [f'm{i}' for i in range(7, 12)]
+    assert cursor == 12
+
+
+def test_sin_cursor_devuelve_las_ultimas():
+    store = LogStore(capacity=100)
+    for i in range(10):
+        store.log('INFO', f'm{i}')
+
+    entries, cursor, has_more = store.query(limit=3)
+
+    assert [entry['message'] for entry in entries] == ['m7', 'm8', 'm9']
+    assert cursor == 10
+    assert has_more is False
+    assert store.counts()['INFO'] == 10
@@ -0,0 +1,59 @@
+"""
+Pruebas del modelo en linea (online_irrigation_learner.py)
+
+Uso:
+    python -m pytest test_scripts/test_online_irrigation_learner.py
+"""
+
+import random
+
+import pytest
+
+from irrigation_predictor import IrrigationPredictor
+from online_irrigation_learner import OnlineIrrigationLearner, RecursiveLeastSquares
+
+
+def test_rls_converge_a_los_coeficientes_reales():
+    rng = random.Random(0)
+    true_weights = [0.5, -0.2, 0.03, 0.8]
+    rls = RecursiveLeastSquares([0.0, 0.0, 0.0, 0.0], forgetting=1.0, initial_covariance=1000.0,
+                                max_covariance=1e6)
+    for _ in range(2000):
+        x = [rng.uniform(-1, 1), rng.uniform(0, 100), rng.uniform(-5, 5)]
+        y = true_weights[0] + sum(w * v for w, v in zip(true_weights[1:], x)) + rng.gauss(0, 0.01)
+        rls.update(x, y)
+
+    assert rls.weights == pytest.approx(true_weights, abs=0.01)
+    assert rls.n_updates == 2000
+
+
+def test_rls_acota_la_covarianza_con_una_caracteristica_constante():
+    rng = random.Random(1)
+    rls = RecursiveLeastSquares([0.0, 0.0, 0.0], forgetting=0.95, max_covariance=50.0)
+    for _ in range(5000):
+        # La segunda caracteristica nunca varia (p. ej. temperature2 = 0)
+        x = [rng.uniform(0, 1), 0.0]
+        rls.update(x, 2.0 * x[0])
+
+    P = rls.covariance
+    assert all(P[i][i] <= 50.0 + 1e-9 for i in range(len(P)))
+    assert all(P[i][j] == pytest.approx(P[j][i]) for i in range(len(P)) for j in range(len(P)))
+    assert rls.weights[1] == pytest.approx(2.0, abs=0.05)
+
+
+def test_arranque_incluye_coeficientes_temporales():
+    base = IrrigationPredictor(
+        coefficients={'soil_moisture1': 0.01, 'soil_moisture1_slope': -0.5},
+        intercept=0.1, version='batch',
+    )
+    learner = OnlineIrrigationLearner(base, publish_every=1)
+    assert learner.feature_names[-1] == 'soil_moisture1_slope'
+    assert learner.rls.weights[-1] == -0.5
+
+    learner.observe('dev', {'soil_moisture1': 40.0}, {'soil_moisture1_slope': -1.0})
+    learner.observe('dev', {'soil_moisture1': 100.0}, {'soil_moisture1_slope': 20.0})
+
+    # Antes de actualizar ambos modelos dieron el mismo score
+    stats = learner.stats()
+    assert stats['comparison']['online'] == stats['comparison']['batch']
+    assert learner.published.temporal_coefficients.keys() == {'soil_moisture1_slope'}
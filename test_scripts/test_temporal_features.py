@@ -0,0 +1,71 @@
+"""
+Pruebas de las caracteristicas temporales (temporal_features.py)
+
+Uso:
+    python -m pytest test_scripts/test_temporal_features.py
+"""
+
+import random
+
+import pytest
+
+from temporal_features import MIN_TIME_VARIANCE, DeviceWindow, TemporalFeatureTracker
+
+
+def brute_force_features(history, now, window_size, window_seconds, alpha, columns):
+    """Mismas caracteristicas recalculadas desde cero sobre toda la historia"""
+    window = [(t, r) for t, r in history[-window_size:] if t >= now - window_seconds]
+    result = {}
+    n = len(window)
+    times = [t / 60.0 for t, _ in window]
+    mean_t = sum(times) / n
+    var_t = sum((t - mean_t) ** 2 for t in times)
+    for col in columns:
+        values = [r[col] for _, r in window]
+        mean_y = sum(values) / n
+        if n > 1 and var_t > n * MIN_TIME_VARIANCE:
+            slope = sum((t - mean_t) * (y - mean_y) for t, y in zip(times, values)) / var_t
+        else:
+            slope = 0.0
+        ewma = None
+        for _, r in history:
+            ewma = r[col] if ewma is None else alpha * r[col] + (1.0 - alpha) * ewma
+        result[f'{col}_slope'] = slope
+        result[f'{col}_ewma'] = ewma
+        result[f'{col}_min'] = min(values)
+        result[f'{col}_max'] = max(values)
+    return result
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_ventana_incremental_igual_a_fuerza_bruta(seed):
+    rng = random.Random(seed)
+    window = DeviceWindow(window_size=12, window_seconds=3600.0, ewma_alpha=0.3)
+    history = []
+    now = 1_700_000_000.0
+    for step in range(500):
+        # Intervalos irregulares, con huecos que vacian la ventana por antiguedad
+        now += rng.choice([300.0, 300.0, 290.0, 5.0, 0.5, 4000.0])
+        reading = {
+            'soil_moisture1': round(rng.uniform(20, 100), 1),
+            'soil_moisture2': rng.choice([55.0, 55.0, rng.uniform(20, 100)]),
+        }
+        if step % 37 == 0:
+            # Lectura con un sensor nulo: se ignora
+            assert window.update(now, {'soil_moisture1': None, 'soil_moisture2': 50.0}) is False
+            continue
+        assert window.update(now, reading)
+        history.append((now, reading))
+
+        expected = brute_force_features(history, now, 12, 3600.0, 0.3, window.columns)
+        assert window.features() == pytest.approx(expected, rel=1e-5, abs=1e-5)
+
+
+def test_tracker_acota_dispositivos():
+    tracker = TemporalFeatureTracker(max_devices=2)
+    for i, device in enumerate(['a', 'b', 'a', 'c']):
+        tracker.update(device, 1000.0 + i, {'soil_moisture1': 50.0, 'soil_moisture2': 50.0})
+
+    assert sorted(tracker.devices()) == ['a', 'c']
+    assert tracker.features('b') is None
+    assert tracker.evictions == 1
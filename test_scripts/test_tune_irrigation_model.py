@@ -0,0 +1,65 @@
+"""
+Pruebas de la búsqueda de umbral (tune_irrigation_model.py)
+
+Uso:
+    python -m pytest test_scripts/test_tune_irrigation_model.py
+"""
+
+import numpy as np
+import pytest
+
+from tune_irrigation_model import sweep_thresholds
+
+
+def metric_value(scores, y, threshold, metric):
+    predicted = scores >= threshold
+    tp = int(np.sum(predicted & (y == 1)))
+    fp = int(np.sum(predicted & (y == 0)))
+    fn = int(np.sum(~predicted & (y == 1)))
+    if metric == "accuracy":
+        return float(np.mean(predicted == (y == 1)))
+    return 2 * tp / (2 * tp + fp + fn) if (2 * tp + fp + fn) > 0 else 0.0
+
+
+def brute_force_best(scores, y, metric):
+    """Prueba como umbral cada score distinto y uno por encima del máximo"""
+    candidates = list(np.unique(scores)) + [np.nextafter(scores.max(), np.inf)]
+    return max(metric_value(scores, y, t, metric) for t in candidates)
+
+
+@pytest.mark.parametrize("metric", ["accuracy", "f1"])
+@pytest.mark.parametrize("seed", range(20))
+def test_sweep_igual_a_fuerza_bruta_con_empates(metric, seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 30))
+    # Redondear a un decimal deja muchos scores repetidos
+    scores = np.round(rng.normal(0.5, 0.3, n), 1)
+    y = (rng.random(n) < 0.4).astype(int)
+
+    threshold, value = sweep_thresholds(scores, y, metric)
+
+    assert value == pytest.approx(brute_force_best(scores, y, metric))
+    # El umbral devuelto reproduce la métrica que informa
+    assert metric_value(scores, y, threshold, metric) == pytest.approx(value)
+
+
+def test_nunca_regar_con_scores_grandes():
+    scores = np.array([1e12, 1e12, 5e11])
+    y = np.array([0, 0, 0])
+
+    threshold, value = sweep_thresholds(scores, y, "accuracy")
+
+    assert threshold > scores.max()
+    assert value == 1.0
+
+
+def test_scores_contiguos_no_se_mezclan():
+    high = 1e12
+    low = np.nextafter(high, -np.inf)
+    scores = np.array([high, low])
+    y = np.array([1, 0])
+
+    threshold, value = sweep_thresholds(scores, y, "accuracy")
+
+    assert value == 1.0
+    assert low < threshold <= high
@@ -0,0 +1,261 @@
+"""
+Validación cruzada temporal y búsqueda de umbral para el modelo de riego.
+
+Evalúa combinaciones de conjuntos de características y fuerzas de
+regularización (Ridge; alpha 0 = regresión lineal) con k-fold respetando el
+orden temporal (cada fold valida sobre datos posteriores a los de
+entrenamiento). Las combinaciones se reparten en un pool de procesos.
+
+El umbral de decisión se elige con un barrido vectorizado sobre los scores
+ordenados (una sola pasada con sumas acumuladas), en lugar de evaluar cada
+umbral por separado.
+
+Salida:
+    - artefacto del mejor modelo (JSON que lee `irrigation_predictor`)
+    - reporte de métricas de todas las combinaciones
+
+Uso:
+    python tune_irrigation_model.py --csv-path sensor_data_rows.csv --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from sklearn.model_selection import TimeSeriesSplit
+
+from irrigation_predictor import save_model_artifact
+from linear_regression_sensor_data import (
+    DEFAULT_FEATURES,
+    PREDICTION_COLUMN,
+    TEMPORAL_FEATURES,
+    _timestamp_seconds,
+    add_temporal_features,
+    build_pipeline,
+    ensure_labels,
+    load_source_dataset,
+    prepare_training_data,
+    raw_coefficients,
+    reference_histograms,
+    validate_features,
+)
+
+DEFAULT_ALPHAS = (0.0, 0.1, 1.0, 10.0, 100.0)
+METRICS = ("f1", "accuracy")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Validación cruzada temporal y búsqueda de umbral para el modelo de riego."
+    )
+    parser.add_argument("--source", choices=("csv", "supabase"), default="csv",
+                        help="Origen de los datos (default: csv).")
+    parser.add_argument("--csv-path", type=Path, default=Path("sensor_data_rows.csv"),
+                        help="Ruta al CSV con los datos del sensor (default: sensor_data_rows.csv).")
+    parser.add_argument("--page-size", type=int, default=1000,
+                        help="Ids por página al leer de Supabase (default: 1000).")
+    parser.add_argument("--fetch-workers", type=int, default=4,
+                        help="Páginas de Supabase descargadas en paralelo (default: 4).")
+    parser.add_argument("--cache-dir", type=Path, default=Path(".supabase_cache"),
+                        help="Caché local de páginas de Supabase (default: .supabase_cache).")
+    parser.add_argument("--dataset-cache-dir", type=Path, default=Path(".dataset_cache"),
+                        help="Caché del CSV ya parseado (default: .dataset_cache).")
+    parser.add_argument("--no-dataset-cache", action="store_true",
+                        help="Parsea siempre el CSV sin usar ni escribir la caché.")
+    parser.add_argument("--prediction-column", default=PREDICTION_COLUMN,
+                        help="Columna con etiquetas `Regar`/`No regar` (default: prediccion).")
+    parser.add_argument(
+        "--feature-sets",
+        nargs="+",
+        default=None,
+        help=(
+            "Conjuntos de características a evaluar, cada uno separado por comas. "
+            "Default: las cinco características, cada subconjunto sin una de ellas y, "
+            "con --temporal-features, las cinco más las temporales."
+        ),
+    )
+    parser.add_argument("--temporal-features", action="store_true",
+                        help="Calcula las características temporales y las incluye como candidato.")
+    parser.add_argument("--alphas", type=float, nargs="+", default=list(DEFAULT_ALPHAS),
+                        help="Fuerzas de regularización Ridge a evaluar (0 = sin regularizar).")
+    parser.add_argument("--folds", type=int, default=5,
+                        help="Número de folds temporales (default: 5).")
+    parser.add_argument("--metric", choices=METRICS, default="f1",
+                        help="Métrica a maximizar al elegir umbral y modelo (default: f1).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos del pool (default: número de CPUs).")
+    parser.add_argument("--output", type=Path, default=Path("irrigation_model.json"),
+                        help="Artefacto del mejor modelo (default: irrigation_model.json).")
+    parser.add_argument("--report", type=Path, default=Path("tuning_report.json"),
+                        help="Reporte de métricas (default: tuning_report.json).")
+    return parser.parse_args()
+
+
+def default_feature_sets(temporal: bool) -> List[List[str]]:
+    base = list(DEFAULT_FEATURES)
+    sets = [base] + [[f for f in base if f != dropped] for dropped in base]
+    if temporal:
+        sets.append(base + list(TEMPORAL_FEATURES))
+    return sets
+
+
+def sweep_thresholds(scores: np.ndarray, y: np.ndarray, metric: str) -> tuple[float, float]:
+    """
+    Mejor umbral para `score >= umbral -> Regar` en una sola pasada
+
+    Ordena los scores de mayor a menor; con sumas acumuladas se obtienen los
+    verdaderos/falsos positivos de cortar en cada posición. Solo se consideran
+    cortes entre scores distintos, y el umbral queda en el punto medio.
+
+    Returns:
+        (umbral, valor de la métrica)
+    """
+    n = len(scores)
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    sorted_y = y[order]
+
+    tp = np.cumsum(sorted_y)
+    fp = np.arange(1, n + 1) - tp
+    positives = tp[-1]
+    negatives = n - positives
+
+    # Último índice de cada grupo de scores iguales
+    boundary = np.ones(n, dtype=bool)
+    boundary[:-1] = sorted_scores[:-1] != sorted_scores[1:]
+    idx = np.flatnonzero(boundary)
+    tp, fp = tp[idx], fp[idx]
+    fn = positives - tp
+    tn = negatives - fp
+
+    if metric == "accuracy":
+        values = (tp + tn) / n
+        none_value = negatives / n
+    else:
+        values = np.divide(2 * tp, 2 * tp + fp + fn, out=np.zeros(len(idx)), where=(2 * tp + fp + fn) > 0)
+        none_value = 0.0
+
+    best = int(np.argmax(values))
+    if values[best] < none_value:
+        # Ningún corte supera a "nunca regar": el siguiente float sobre el máximo
+        return float(np.nextafter(sorted_scores[0], np.inf)), float(none_value)
+
+    cut = idx[best]
+    if cut + 1 < n:
+        below = sorted_scores[cut + 1]
+        threshold = sorted_scores[cut] / 2.0 + below / 2.0
+        if threshold <= below:
+            # Scores contiguos: el punto medio redondea al de abajo
+            threshold = np.nextafter(below, np.inf)
+    else:
+        threshold = sorted_scores[cut]
+    return float(threshold), float(values[best])
+
+
+# Datos compartidos por los procesos del pool (se envían una vez por proceso)
+_WORKER_DATA: dict = {}
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, columns: List[str], splits: list, metric: str) -> None:
+    _WORKER_DATA.update(X=X, y=y, columns=columns, splits=splits, metric=metric)
+
+
+def evaluate_candidate(features: List[str], alpha: float) -> dict:
+    """Validación cruzada de un candidato; los scores fuera de fold definen el umbral"""
+    X, y = _WORKER_DATA["X"], _WORKER_DATA["y"]
+    cols = [_WORKER_DATA["columns"].index(f) for f in features]
+    Xf = X[:, cols]
+
+    oof_scores, oof_y, fold_mse = [], [], []
+    for train_idx, val_idx in _WORKER_DATA["splits"]:
+        model = build_pipeline(alpha)
+        model.fit(Xf[train_idx], y[train_idx])
+        scores = model.predict(Xf[val_idx])
+        fold_mse.append(float(np.mean((scores - y[val_idx]) ** 2)))
+        oof_scores.append(scores)
+        oof_y.append(y[val_idx])
+
+    scores = np.concatenate(oof_scores)
+    labels = np.concatenate(oof_y)
+    threshold, value = sweep_thresholds(scores, labels, _WORKER_DATA["metric"])
+    predicted = scores >= threshold
+    return {
+        "features": features,
+        "alpha": alpha,
+        "threshold": threshold,
+        _WORKER_DATA["metric"]: value,
+        "accuracy": float(np.mean(predicted == (labels == 1.0))),
+        "mse": float(np.mean(fold_mse)),
+        "mse_per_fold": fold_mse,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    feature_sets = (
+        [fs.split(",") for fs in args.feature_sets]
+        if args.feature_sets else default_feature_sets(args.temporal_features)
+    )
+    # load_source_dataset lee `features` para elegir qué columnas cargar
+    args.features = list(dict.fromkeys(f for fs in feature_sets for f in fs))
+
+    try:
+        df = load_source_dataset(args)
+        if args.prediction_column not in df.columns:
+            df = ensure_labels(df, args.prediction_column)
+        if args.temporal_features:
+            df = add_temporal_features(df)
+
+        columns = validate_features(df, sorted({f for fs in feature_sets for f in fs}))
+
+        # Orden temporal global para que cada fold valide sobre el futuro
+        df = df.iloc[np.argsort(_timestamp_seconds(df), kind="stable")].reset_index(drop=True)
+        X, y, _ = prepare_training_data(df, columns, args.prediction_column)
+        splits = list(TimeSeriesSplit(n_splits=args.folds).split(X))
+
+        candidates = [(fs, alpha) for fs in feature_sets for alpha in args.alphas]
+        print(f"Evaluando {len(candidates)} candidatos con {args.folds} folds temporales...")
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(X, y, columns, splits, args.metric),
+        ) as executor:
+            results = list(executor.map(evaluate_candidate, *zip(*candidates)))
+
+        best = max(results, key=lambda r: (r[args.metric], -r["mse"]))
+
+        # Reentrenar el mejor candidato con todos los datos
+        cols = [columns.index(f) for f in best["features"]]
+        model = build_pipeline(best["alpha"])
+        model.fit(X[:, cols], y)
+        coef, intercept = raw_coefficients(model)
+    except Exception as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    metrics = {key: best[key] for key in (args.metric, "accuracy", "mse")}
+    save_model_artifact(
+        args.output, best["features"], coef, intercept, best["threshold"],
+        metrics=metrics, alpha=best["alpha"], folds=args.folds, n_rows=int(len(y)),
+        reference=reference_histograms(X[:, cols], best["features"]),
+    )
+    with args.report.open("w", encoding="utf-8") as fh:
+        json.dump({"metric": args.metric, "best": best, "candidates": results}, fh, indent=2, ensure_ascii=False)
+
+    print("=== Mejor modelo ===")
+    print(f"Características: {', '.join(best['features'])}")
+    print(f"Alpha: {best['alpha']}")
+    print(f"Umbral: {best['threshold']:.4f}")
+    print(f"{args.metric}: {best[args.metric]:.4f} | exactitud: {best['accuracy']:.4f} | MSE: {best['mse']:.4f}")
+    print(f"Artefacto guardado en: {args.output}")
+    print(f"Reporte guardado en: {args.report}")
+
+
+if __name__ == "__main__":
+    main()